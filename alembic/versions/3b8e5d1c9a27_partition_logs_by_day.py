@@ -0,0 +1,86 @@
+"""partition logs by day
+
+Revision ID: 3b8e5d1c9a27
+Revises: db3bf33f5aa6
+Create Date: 2026-10-17 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e5d1c9a27'
+down_revision: Union[str, Sequence[str], None] = 'db3bf33f5aa6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE logs RENAME TO logs_unpartitioned")
+    op.execute("ALTER INDEX ix_logs_id RENAME TO ix_logs_unpartitioned_id")
+    op.execute("ALTER TABLE logs_unpartitioned RENAME CONSTRAINT logs_pkey TO logs_unpartitioned_pkey")
+    op.execute("""
+        CREATE TABLE logs (
+            id UUID NOT NULL,
+            source VARCHAR(100) NOT NULL,
+            message TEXT NOT NULL,
+            level loglevel NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.create_index(op.f('ix_logs_id'), 'logs', ['id'], unique=False)
+    op.execute("CREATE TABLE logs_default PARTITION OF logs DEFAULT")
+
+    # One partition per day that already has logs plus the next few days,
+    # the scheduler keeps creating partitions ahead from here on
+    op.execute("""
+        DO $$
+        DECLARE
+            day DATE;
+        BEGIN
+            FOR day IN
+                SELECT DISTINCT (created_at AT TIME ZONE 'UTC')::date FROM logs_unpartitioned WHERE created_at IS NOT NULL
+                UNION
+                SELECT generate_series((now() AT TIME ZONE 'UTC')::date, (now() AT TIME ZONE 'UTC')::date + 3, interval '1 day')::date
+            LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF logs FOR VALUES FROM (%L) TO (%L)',
+                    'logs_' || to_char(day, 'YYYYMMDD'),
+                    day::text || ' 00:00:00+00',
+                    (day + 1)::text || ' 00:00:00+00'
+                );
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO logs (id, source, message, level, created_at)
+        SELECT id, source, message, level, COALESCE(created_at, now()) FROM logs_unpartitioned
+    """)
+    op.execute("DROP TABLE logs_unpartitioned")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE logs RENAME TO logs_partitioned")
+    op.execute("ALTER INDEX ix_logs_id RENAME TO ix_logs_partitioned_id")
+    op.execute("ALTER TABLE logs_partitioned RENAME CONSTRAINT logs_pkey TO logs_partitioned_pkey")
+    op.create_table('logs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('source', sa.String(length=100), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('level', postgresql.ENUM('INFO', 'WARNING', 'ERROR', name='loglevel', create_type=False), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_logs_id'), 'logs', ['id'], unique=False)
+    op.execute("""
+        INSERT INTO logs (id, source, message, level, created_at)
+        SELECT id, source, message, level, created_at FROM logs_partitioned
+    """)
+    op.execute("DROP TABLE logs_partitioned")
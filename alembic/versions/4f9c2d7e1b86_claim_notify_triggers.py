@@ -0,0 +1,47 @@
+"""claim notify triggers
+
+Revision ID: 4f9c2d7e1b86
+Revises: e2f49b07d8a1
+Create Date: 2026-10-17 14:02:31.508214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f9c2d7e1b86'
+down_revision: Union[str, Sequence[str], None] = 'e2f49b07d8a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_streamclips_claim() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('streamclips_claim', TG_ARGV[0]);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER streamers_notify_claim
+        AFTER INSERT OR UPDATE OF is_active, url ON streamers
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_streamclips_claim('streamer')
+    """)
+    op.execute("""
+        CREATE TRIGGER stream_clips_processes_notify_claim
+        AFTER DELETE ON stream_clips_processes
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_streamclips_claim('process_exit')
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS stream_clips_processes_notify_claim ON stream_clips_processes")
+    op.execute("DROP TRIGGER IF EXISTS streamers_notify_claim ON streamers")
+    op.execute("DROP FUNCTION IF EXISTS notify_streamclips_claim()")
@@ -0,0 +1,30 @@
+"""streamer cost positive
+
+Revision ID: 5b7a0c3e9f12
+Revises: 9d41b6e2f0a7
+Create Date: 2026-10-18 10:12:44.381027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7a0c3e9f12'
+down_revision: Union[str, Sequence[str], None] = '9d41b6e2f0a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A cost of zero or less can't be divided by in the claim query, such rows fall back to the default of 1
+    op.execute("UPDATE streamers SET cost = NULL WHERE cost <= 0")
+    op.create_check_constraint('ck_streamers_cost_positive', 'streamers', 'cost IS NULL OR cost > 0')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('ck_streamers_cost_positive', 'streamers', type_='check')
@@ -0,0 +1,32 @@
+"""log query indexes
+
+Revision ID: 8d21f0a6c4e3
+Revises: 3b8e5d1c9a27
+Create Date: 2026-10-17 11:03:18.550912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d21f0a6c4e3'
+down_revision: Union[str, Sequence[str], None] = '3b8e5d1c9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_logs_source_created_at', 'logs', ['source', 'created_at'], unique=False)
+    op.create_index('ix_logs_level_created_at', 'logs', ['level', 'created_at'], unique=False)
+    op.create_index('ix_logs_created_at', 'logs', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_logs_created_at', table_name='logs')
+    op.drop_index('ix_logs_level_created_at', table_name='logs')
+    op.drop_index('ix_logs_source_created_at', table_name='logs')
@@ -0,0 +1,38 @@
+"""atomic claims
+
+Revision ID: 9a4e6b2f0c35
+Revises: 4f9c2d7e1b86
+Create Date: 2026-10-17 15:21:44.036915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e6b2f0c35'
+down_revision: Union[str, Sequence[str], None] = '4f9c2d7e1b86'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep the newest process of any streamer that somehow ended up with several
+    op.execute("""
+        DELETE FROM stream_clips_processes p
+        USING stream_clips_processes newer
+        WHERE newer.streamer_id = p.streamer_id
+          AND (newer.created_at, newer.id) > (p.created_at, p.id)
+    """)
+    op.create_unique_constraint('uq_stream_clips_processes_streamer_id', 'stream_clips_processes', ['streamer_id'])
+    op.alter_column('stream_clips_processes', 'pid', existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM stream_clips_processes WHERE pid IS NULL")
+    op.alter_column('stream_clips_processes', 'pid', existing_type=sa.Integer(), nullable=False)
+    op.drop_constraint('uq_stream_clips_processes_streamer_id', 'stream_clips_processes', type_='unique')
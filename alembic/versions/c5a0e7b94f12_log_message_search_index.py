@@ -0,0 +1,34 @@
+"""log message search index
+
+Revision ID: c5a0e7b94f12
+Revises: 8d21f0a6c4e3
+Create Date: 2026-10-17 11:48:05.117364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a0e7b94f12'
+down_revision: Union[str, Sequence[str], None] = '8d21f0a6c4e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_logs_message_tsv',
+        'logs',
+        [sa.text("to_tsvector('simple'::regconfig, message)")],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_logs_message_tsv', table_name='logs')
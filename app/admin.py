@@ -1,18 +1,35 @@
 import os
+import uuid
+import anyio
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 from markupsafe import Markup
 from sqladmin import Admin, ModelView, BaseView, expose, action
+from sqladmin.pagination import Pagination, PageControl
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
-from app.core import instances
+from wtforms.validators import ValidationError
+from app.core import backoff, instances, logs, rollout, telemetry
+from app.core.log_limits import limiter as log_limiter
+from app.core.log_writer import writer as log_writer
 from .database import models, connection
 from .admin_auth import AdminAuth
 from .database.connection import get_db
 
+def positive(form, field):
+    if field.data is not None and field.data <= 0:
+        raise ValidationError("Must be greater than 0")
+
 class StreamerAdmin(ModelView, model=models.Streamer):
-    column_list = [models.Streamer.name, models.Streamer.url, models.Streamer.is_active, "processed_by"]
-    form_excluded_columns = [models.Streamer.stream_clips_process, models.Streamer.last_processed_at]
+    column_list = [models.Streamer.name, models.Streamer.url, models.Streamer.is_active, models.Streamer.is_live,
+                   models.Streamer.cost, "processed_by", "restarts", models.Streamer.last_exit_reason,
+                   models.Streamer.next_start_at]
+    form_excluded_columns = [models.Streamer.stream_clips_process, models.Streamer.last_processed_at,
+                             models.Streamer.consecutive_failures, models.Streamer.last_exit_reason,
+                             models.Streamer.last_uptime_seconds, models.Streamer.next_start_at,
+                             models.Streamer.quarantined, models.Streamer.is_live, models.Streamer.live_checked_at]
+    # Empty counts as 1, zero would make the claim query divide by zero
+    form_args = {"cost": {"validators": [positive]}}
 
     def list_query(self, request: Request):
         return select(models.Streamer).options(
@@ -25,15 +42,96 @@ class StreamerAdmin(ModelView, model=models.Streamer):
         if hasattr(obj, 'stream_clips_process') and obj.stream_clips_process:
             return obj.stream_clips_process.instance_hostname
         return "Not running"
+
+    def restarts(self, obj):
+        """Crash-loop state of the streamer"""
+        if obj.quarantined:
+            return f"Quarantined after {obj.consecutive_failures} failures"
+        if obj.consecutive_failures:
+            return f"{obj.consecutive_failures} failures, backing off"
+        return "Healthy"
     
     column_formatters = {
         models.Streamer.url: lambda m, a: Markup(f"<a target=\"_blank\" href=\"{getattr(m, a)}\">{getattr(m, a)}</a>"),
-        "processed_by": lambda m, a: StreamerAdmin.processed_by(None, m)
+        "processed_by": lambda m, a: StreamerAdmin.processed_by(None, m),
+        "restarts": lambda m, a: StreamerAdmin.restarts(None, m)
     }
 
+    @action(
+        name="release_quarantine",
+        label="Release quarantine",
+        add_in_detail=True,
+        add_in_list=True
+    )
+    async def release_quarantine(self, request):
+        db = next(get_db())
+        try:
+            pks = [uuid.UUID(pk) for pk in request.query_params.get("pks", "").split(",") if pk]
+            backoff.release(db, pks)
+            return RedirectResponse(url=request.url_for("admin:list", identity="streamer"), status_code=302)
+        finally:
+            db.close()
+
+class KeysetPagination(Pagination):
+    """Pagination driven by a logs cursor instead of page numbers and a total count"""
+
+    def __init__(self, rows, page_size, base_url, after=None, next_cursor=None):
+        super().__init__(rows=rows, page=1, page_size=page_size, count=len(rows))
+        self.base_url = base_url
+        self.after = after
+        self.next_cursor = next_cursor
+
+    @property
+    def has_previous(self) -> bool:
+        return self.after is not None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def previous_page(self) -> PageControl:
+        # Keyset pages only go forward, "prev" jumps back to the newest logs
+        return PageControl(number=0, url=str(self.base_url.remove_query_params("after")))
+
+    @property
+    def next_page(self) -> PageControl:
+        return PageControl(number=2, url=str(self.base_url.include_query_params(after=self.next_cursor)))
+
+    def add_pagination_urls(self, base_url) -> None:
+        pass
+
 class LogAdmin(ModelView, model=models.Log):
     column_list = [models.Log.created_at, models.Log.source, models.Log.level, models.Log.message]
     column_default_sort = (models.Log.created_at, True)
+    column_searchable_list = [models.Log.message]
+
+    def search_query(self, stmt, term):
+        """Use the full-text index instead of sqladmin's ILIKE scan"""
+        db = next(get_db())
+        try:
+            return logs.search_filter(db, stmt, term)
+        finally:
+            db.close()
+
+    async def list(self, request: Request) -> Pagination:
+        """Page through logs with the same keyset query as the /logs API"""
+        if request.query_params.get("sortBy") or request.query_params.get("search"):
+            return await super().list(request)
+
+        page_size = self.validate_page_number(request.query_params.get("pageSize"), 0)
+        page_size = min(page_size or self.page_size, max(self.page_size_options))
+        after = request.query_params.get("after")
+
+        def fetch():
+            db = next(get_db())
+            try:
+                return logs.list(db, source=None, level=None, after=after, limit=page_size)
+            finally:
+                db.close()
+
+        rows, next_cursor = await anyio.to_thread.run_sync(fetch)
+        return KeysetPagination(rows, page_size, request.url, after=after, next_cursor=next_cursor)
     
     @action(
         name="delete_all",
@@ -43,12 +141,21 @@ class LogAdmin(ModelView, model=models.Log):
     async def delete_all_logs(self, request):
         db = next(get_db())
         try:
-            db.query(models.Log).delete()
-            db.commit()
+            logs.purge(db)
             return RedirectResponse(url=request.url_for("admin:list", identity="log"), status_code=302)
         finally:
             db.close()
 
+class StreamEventAdmin(ModelView, model=models.StreamEvent):
+    column_list = [models.StreamEvent.created_at, models.StreamEvent.streamer, models.StreamEvent.event_type, models.StreamEvent.value]
+    column_default_sort = (models.StreamEvent.created_at, True)
+    can_create = False
+    can_edit = False
+
+    column_formatters = {
+        models.StreamEvent.streamer: lambda m, a: m.streamer.name if m.streamer else ""
+    }
+
 class StreamConfigAdmin(ModelView, model=models.StreamConfig):
     name_plural = "Stream Config"
     column_list = [
@@ -57,42 +164,84 @@ class StreamConfigAdmin(ModelView, model=models.StreamConfig):
         models.StreamConfig.sample_interval,
         models.StreamConfig.baseline_duration,
         models.StreamConfig.surge_threshold,
+        models.StreamConfig.version,
+        "rollout",
         models.StreamConfig.updated_at
     ]
     column_default_sort = (models.StreamConfig.updated_at, True)
+    form_excluded_columns = [models.StreamConfig.version]
     
     # Only allow editing the first (and only) record
     can_create = False
     can_delete = False
 
+    async def list(self, request: Request) -> Pagination:
+        pagination = await super().list(request)
+        # One progress query for the page, the formatter only reads it
+        if pagination.rows:
+            progress = await anyio.to_thread.run_sync(self._progress, max(config.version for config in pagination.rows))
+            for config in pagination.rows:
+                config.rollout_progress = progress
+        return pagination
+
+    @staticmethod
+    def _progress(version: int) -> dict:
+        db = next(get_db())
+        try:
+            return rollout.progress(db, version)
+        finally:
+            db.close()
+
+    def rollout(self, obj):
+        """Show how many running processes are on the current version and where the rollout halted"""
+        progress = getattr(obj, "rollout_progress", None)
+        if progress is None:
+            return ""
+        if not progress["stale"]:
+            return f"{progress['running']}/{progress['running']} on v{progress['version']}"
+        pending = ", ".join(f"{hostname}: {count}" for hostname, count in sorted(progress["stale_by_instance"].items()))
+        state = f"halted on {', '.join(progress['halted'])}, restarting {pending}" if progress["halted"] else f"restarting {pending}"
+        return f"{progress['running'] - progress['stale']}/{progress['running']} on v{progress['version']} ({state})"
+
+    column_formatters = {
+        "rollout": lambda m, a: StreamConfigAdmin.rollout(None, m)
+    }
+
 class InstanceAdmin(ModelView, model=models.Instance):
     column_list = [
         models.Instance.hostname,
         models.Instance.max_processes,
+        models.Instance.autoscale,
+        models.Instance.tuned_max_processes,
         "current_load",
+        models.Instance.cpu_percent,
+        models.Instance.memory_percent,
         models.Instance.created_at,
         models.Instance.last_heartbeat
     ]
     column_default_sort = (models.Instance.last_heartbeat, True)
-    form_columns = [models.Instance.max_processes]
+    form_columns = [models.Instance.max_processes, models.Instance.autoscale]
     
     def list_query(self, request: Request):
         return select(models.Instance).options(
-            selectinload(models.Instance.processes)
+            selectinload(models.Instance.processes).selectinload(models.StreamClipsProcess.streamer)
         )
     
     def current_load(self, obj):
-        """Show current load in format 'current/max'"""
-        # Now this should work because processes relationship is eagerly loaded
-        current = len(obj.processes) if hasattr(obj, 'processes') and obj.processes else 0
-        return f"{current}/{obj.max_processes}"
+        """Show current load in format 'current/max', in cost units like the claim query counts them"""
+        # Now this should work because processes and their streamers are eagerly loaded
+        processes = obj.processes if hasattr(obj, 'processes') and obj.processes else []
+        current = sum(process.streamer.cost or 1.0 for process in processes)
+        return f"{current:g}/{obj.effective_max_processes}"
     
     # Read-only - instances are managed automatically
     can_create = False
     can_delete = False
     
     column_formatters = {
-        "current_load": lambda m, a: InstanceAdmin.current_load(None, m)
+        "current_load": lambda m, a: InstanceAdmin.current_load(None, m),
+        models.Instance.cpu_percent: lambda m, a: f"{getattr(m, a):.0f}%" if getattr(m, a) is not None else "",
+        models.Instance.memory_percent: lambda m, a: f"{getattr(m, a):.0f}%" if getattr(m, a) is not None else ""
     }
 
 class FileBrowserView(BaseView):
@@ -106,11 +255,102 @@ class FileBrowserView(BaseView):
     async def redirect(self, request):
         return RedirectResponse(url=f"https://{os.getenv('STORAGE_SERVER_HOST')}")
 
+class LogLimitsView(BaseView):
+    name = "Log Limits"
+    icon = "fa-solid fa-gauge"
+
+    @expose("/log-limits", methods=["GET"])
+    async def log_limits(self, request):
+        return await self.templates.TemplateResponse(request, "log_limits.html", context={
+            "status": log_limiter.status(),
+            "writer_stats": log_writer.stats(),
+        })
+
+class TelemetryView(BaseView):
+    name = "Telemetry"
+    icon = "fa-solid fa-chart-line"
+
+    CHART_WIDTH = 800
+    CHART_HEIGHT = 160
+    RANGES = [1, 6, 24, 24 * 7, 24 * 30]
+
+    @staticmethod
+    def parse_hours(value, default: int = 6) -> int:
+        """Requested range in hours, within what the hourly rollups keep"""
+        try:
+            hours = int(value)
+        except (TypeError, ValueError):
+            return default
+        return max(1, min(hours, telemetry.TELEMETRY_HOUR_RETENTION_DAYS * 24))
+
+    @expose("/telemetry", methods=["GET"])
+    async def telemetry(self, request):
+        streamer_id = request.query_params.get("streamer")
+        hours = self.parse_hours(request.query_params.get("hours"))
+        resolution, rows, streamers = await anyio.to_thread.run_sync(self._load, streamer_id, hours)
+
+        charts = []
+        if rows:
+            for title, attrs, scale, unit in [
+                ("CPU", ["cpu_percent", "cpu_percent_max"], 1, "%"),
+                ("Memory (RSS)", ["rss", "rss_max"], 1 / (1024 * 1024), "MB"),
+                ("Open files", ["num_fds"], 1, ""),
+                ("Processes in tree", ["processes"], 1, ""),
+            ]:
+                series = [[(getattr(row, attr) or 0) * scale for row in rows] for attr in attrs]
+                top = max(max(values) for values in series) or 1
+                charts.append({
+                    "title": title,
+                    "unit": unit,
+                    "top": top,
+                    "latest": series[0][-1],
+                    "lines": [self._points(values, top) for values in series],
+                })
+
+        return await self.templates.TemplateResponse(request, "telemetry.html", context={
+            "streamers": streamers,
+            "streamer_id": streamer_id,
+            "hours": hours,
+            "ranges": self.RANGES,
+            "resolution": resolution,
+            "rows": rows,
+            "charts": charts,
+            "width": self.CHART_WIDTH,
+            "height": self.CHART_HEIGHT,
+        })
+
+    def _load(self, streamer_id, hours):
+        db = next(get_db())
+        try:
+            streamers = db.query(models.Streamer).order_by(models.Streamer.name).all()
+            try:
+                streamer_uuid = uuid.UUID(streamer_id)
+            except (TypeError, ValueError):
+                return telemetry.resolution_for(hours), [], streamers
+            resolution, rows = telemetry.series(db, streamer_uuid, hours)
+            return resolution, rows, streamers
+        finally:
+            db.close()
+
+    def _points(self, values, top):
+        step = self.CHART_WIDTH / max(len(values) - 1, 1)
+        return " ".join(
+            f"{i * step:.1f},{self.CHART_HEIGHT - value / top * self.CHART_HEIGHT:.1f}" for i, value in enumerate(values)
+        )
+
 def init(app):
     authentication_backend = AdminAuth(secret_key=os.getenv("SECRET_KEY"))
-    app.admin = Admin(app, connection.engine, authentication_backend=authentication_backend)
+    app.admin = Admin(
+        app,
+        connection.engine,
+        authentication_backend=authentication_backend,
+        templates_dir=os.path.join(os.path.dirname(__file__), "templates")
+    )
     app.admin.add_view(InstanceAdmin)
     app.admin.add_view(StreamerAdmin)
     app.admin.add_view(StreamConfigAdmin)
+    app.admin.add_view(StreamEventAdmin)
     app.admin.add_view(LogAdmin)
+    app.admin.add_view(LogLimitsView)
+    app.admin.add_view(TelemetryView)
     app.admin.add_view(FileBrowserView)
\ No newline at end of file
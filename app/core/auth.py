@@ -52,6 +52,11 @@ def get_current_user(
         raise credentials_exception
     return user
 
+def get_current_admin(user: models.User = Depends(get_current_user)) -> models.User:
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return user
+
 
 def login(db: Session, user: schemas.UserLogin) -> dict:
     db_user = db.query(models.User).filter(models.User.username == user.username).first()
@@ -0,0 +1,114 @@
+import math
+import os
+from typing import Iterable, Optional
+import psutil
+from sqlalchemy.orm import Session, selectinload
+from app.core.resources import ProcessTreeSampler
+from app.database import models
+
+AUTOSCALE_INTERVAL_SECONDS = int(os.getenv("AUTOSCALE_INTERVAL_SECONDS", "30"))
+# Capacity is tuned in streamer cost units like the claim query counts it, a streamer without a cost is 1 unit,
+# so with no costs set the bounds below are process counts
+AUTOSCALE_MIN_PROCESSES = int(os.getenv("AUTOSCALE_MIN_PROCESSES", "1"))
+AUTOSCALE_MAX_PROCESSES = int(os.getenv("AUTOSCALE_MAX_PROCESSES", "100"))
+AUTOSCALE_TARGET_CPU_PERCENT = float(os.getenv("AUTOSCALE_TARGET_CPU_PERCENT", "75"))
+AUTOSCALE_TARGET_MEMORY_PERCENT = float(os.getenv("AUTOSCALE_TARGET_MEMORY_PERCENT", "80"))
+# Capacity only moves once the smoothed estimate is this many processes away from it
+AUTOSCALE_HYSTERESIS = int(os.getenv("AUTOSCALE_HYSTERESIS", "2"))
+AUTOSCALE_MAX_STEP_UP = int(os.getenv("AUTOSCALE_MAX_STEP_UP", "2"))
+AUTOSCALE_SMOOTHING = float(os.getenv("AUTOSCALE_SMOOTHING", "0.3"))
+
+
+class CapacityTuner:
+    """Estimates how many cost units the host can run from measured usage and moves the capacity with hysteresis"""
+
+    def __init__(self, min_processes: int = AUTOSCALE_MIN_PROCESSES, max_processes: int = AUTOSCALE_MAX_PROCESSES,
+                 target_cpu: float = AUTOSCALE_TARGET_CPU_PERCENT, target_memory: float = AUTOSCALE_TARGET_MEMORY_PERCENT,
+                 hysteresis: int = AUTOSCALE_HYSTERESIS, max_step_up: int = AUTOSCALE_MAX_STEP_UP,
+                 smoothing: float = AUTOSCALE_SMOOTHING):
+        self.min_processes = min_processes
+        self.max_processes = max_processes
+        self.target_cpu = target_cpu
+        self.target_memory = target_memory
+        self.hysteresis = hysteresis
+        self.max_step_up = max_step_up
+        self.smoothing = smoothing
+        self._smoothed: Optional[float] = None
+
+    def estimate(self, host_cpu: float, host_memory: float, cpu_count: int, total_memory: int,
+                 children: Iterable[dict], units: float = None) -> Optional[float]:
+        """Cost units that fit under the CPU and memory targets, None without a usable measurement of running children,
+        units is the total cost of the measured children, their count when not given"""
+        children = list(children)
+        if not children:
+            return None
+        count = units or len(children)
+        # Average footprint of one cost unit as a percentage of the whole host
+        child_cpu = sum(child["cpu_percent"] for child in children) / count / cpu_count
+        child_memory = sum(child["rss"] for child in children) / count / total_memory * 100
+
+        if child_cpu <= 0 or child_memory <= 0:
+            # Running children always use some, zero means the sample measured nothing (e.g. a first sample)
+            return None
+        cpu_baseline = max(0.0, host_cpu - count * child_cpu)
+        memory_baseline = max(0.0, host_memory - count * child_memory)
+        return max(0.0, min((self.target_cpu - cpu_baseline) / child_cpu,
+                            (self.target_memory - memory_baseline) / child_memory))
+
+    def update(self, current: int, estimate: Optional[float]) -> int:
+        """Next capacity, growing a few units at a time and shrinking at once"""
+        current = self._clamp(current)
+        if estimate is None:
+            return current
+        self._smoothed = estimate if self._smoothed is None else \
+            self.smoothing * estimate + (1 - self.smoothing) * self._smoothed
+
+        target = self._clamp(int(self._smoothed))
+        if target >= current + self.hysteresis:
+            return min(target, current + self.max_step_up)
+        if target <= current - self.hysteresis:
+            # An overloaded host drops frames, don't wait to stop taking streamers
+            return target
+        return current
+
+    def _clamp(self, value: int) -> int:
+        return max(self.min_processes, min(self.max_processes, value))
+
+
+def tune(db: Session, hostname: str) -> Optional[int]:
+    """Re-tune the capacity of an autoscaled instance, returns the new value when it changed"""
+    instance = db.query(models.Instance).filter(models.Instance.hostname == hostname).first()
+    if not instance or not instance.autoscale or instance.cpu_percent is None:
+        return None
+
+    processes = db.query(models.StreamClipsProcess).options(
+        selectinload(models.StreamClipsProcess.streamer)
+    ).filter(models.StreamClipsProcess.instance_hostname == hostname).all()
+    costs = {process.pid: process.streamer.cost or 1.0 for process in processes if process.pid}
+    load = sum(process.streamer.cost or 1.0 for process in processes)
+    usage = sampler.sample(list(costs))
+    estimate = tuner.estimate(
+        host_cpu=instance.cpu_percent,
+        host_memory=instance.memory_percent,
+        cpu_count=psutil.cpu_count() or 1,
+        total_memory=psutil.virtual_memory().total,
+        children=usage.values(),
+        units=sum(costs[pid] for pid in usage),
+    )
+    current = instance.tuned_max_processes or instance.max_processes
+    tuned = tuner.update(current, estimate)
+    if tuned < current:
+        # Never below what already runs, the capacity follows the load down as processes exit
+        tuned = max(tuned, min(current, math.ceil(load)))
+    if tuned == instance.tuned_max_processes:
+        return None
+
+    instance.tuned_max_processes = tuned
+    db.commit()
+    print(f"Tuned {hostname} capacity from {current} to {tuned}")
+    return tuned
+
+
+tuner = CapacityTuner()
+# Separate from the telemetry sampler, both would otherwise reset the other's CPU baseline
+sampler = ProcessTreeSampler()
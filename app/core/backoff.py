@@ -0,0 +1,61 @@
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.database import models
+
+# A process that ran at least this long counts as healthy and clears the failure count
+RESTART_HEALTHY_UPTIME_SECONDS = float(os.getenv("RESTART_HEALTHY_UPTIME_SECONDS", "300"))
+RESTART_BACKOFF_BASE_SECONDS = float(os.getenv("RESTART_BACKOFF_BASE_SECONDS", "60"))
+RESTART_BACKOFF_MAX_SECONDS = float(os.getenv("RESTART_BACKOFF_MAX_SECONDS", "3600"))
+# Consecutive quick failures after which the streamer is no longer started until an admin releases it
+RESTART_QUARANTINE_FAILURES = int(os.getenv("RESTART_QUARANTINE_FAILURES", "10"))
+
+
+def backoff_delay(failures: int, rng: random.Random = random) -> float:
+    """Exponential delay for the given failure count, with jitter over the upper half so crashes don't sync up"""
+    delay = min(RESTART_BACKOFF_BASE_SECONDS * 2 ** max(failures - 1, 0), RESTART_BACKOFF_MAX_SECONDS)
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+def record_exit(db: Session, streamer_id, reason: str, uptime: float, requested: bool,
+                now: datetime = None) -> Optional[float]:
+    """Update the streamer's restart bookkeeping after its process ended, returns the backoff delay if one was set"""
+    streamer = db.query(models.Streamer).filter(models.Streamer.id == streamer_id).with_for_update().first()
+    if streamer is None:
+        return None
+    delay = apply_exit(streamer, reason, uptime, requested, now)
+    db.commit()
+    return delay
+
+
+def apply_exit(streamer: models.Streamer, reason: str, uptime: float, requested: bool,
+               now: datetime = None) -> Optional[float]:
+    """record_exit on an already loaded streamer, left for the caller to commit"""
+    now = now or datetime.now(tz=timezone.utc)
+    streamer.last_exit_reason = reason
+    streamer.last_uptime_seconds = uptime
+    delay = None
+    if uptime >= RESTART_HEALTHY_UPTIME_SECONDS:
+        streamer.consecutive_failures = 0
+        streamer.next_start_at = None
+    elif not requested:
+        # Stopped by us (inactive, restarted, shut down) isn't a crash and leaves the count alone
+        streamer.consecutive_failures = (streamer.consecutive_failures or 0) + 1
+        delay = backoff_delay(streamer.consecutive_failures)
+        streamer.next_start_at = now + timedelta(seconds=delay)
+        if streamer.consecutive_failures >= RESTART_QUARANTINE_FAILURES:
+            streamer.quarantined = True
+            print(f"Quarantined {streamer.name} after {streamer.consecutive_failures} failed starts, last one {reason}")
+    return delay
+
+
+def release(db: Session, streamer_ids: List):
+    """Clear quarantine and backoff so the streamers are claimed again"""
+    db.query(models.Streamer).filter(models.Streamer.id.in_(streamer_ids)).update({
+        models.Streamer.quarantined: False,
+        models.Streamer.consecutive_failures: 0,
+        models.Streamer.next_start_at: None,
+    }, synchronize_session=False)
+    db.commit()
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import select
+import threading
+from typing import Awaitable, Callable, Optional
+from app.core.instances import CLAIM_COOLDOWN
+from app.database import connection
+
+# Changes arriving within this window are handled by one claim round
+CLAIM_DEBOUNCE_SECONDS = float(os.getenv("CLAIM_DEBOUNCE_SECONDS", "0.5"))
+# Channel the streamers / stream_clips_processes triggers notify on
+CLAIM_CHANNEL = "streamclips_claim"
+# Payload sent when a process row is deleted, the streamer becomes claimable once its cooldown passes
+PROCESS_EXIT = "process_exit"
+# Wake again just after the cooldown of an exited process so its streamer is picked up straight away
+EXIT_RECLAIM_DELAY_SECONDS = CLAIM_COOLDOWN.total_seconds() + 1
+
+
+class ClaimTrigger:
+    """Wakes the claim loop as soon as something changes, debouncing bursts into one round"""
+
+    def __init__(self, debounce: float = CLAIM_DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"notifications": 0, "rounds": 0}
+
+    def start(self, callback: Callable[[], Awaitable[None]]):
+        """Must be called from the event loop the callback runs on"""
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._task = self._loop.create_task(self._run(callback))
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        self._loop = self._event = self._task = None
+
+    def notify(self, delay: float = 0.0):
+        """Thread-safe, request a claim round now or after delay seconds"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            if delay > 0:
+                loop.call_soon_threadsafe(loop.call_later, delay, self._set)
+            else:
+                loop.call_soon_threadsafe(self._set)
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def stats(self) -> dict:
+        return dict(self._stats)
+
+    def _set(self):
+        if self._event is not None:
+            self._stats["notifications"] += 1
+            self._event.set()
+
+    async def _run(self, callback: Callable[[], Awaitable[None]]):
+        event = self._event
+        while True:
+            await event.wait()
+            # Let the rest of the burst arrive before claiming
+            await asyncio.sleep(self.debounce)
+            event.clear()
+            self._stats["rounds"] += 1
+            try:
+                await callback()
+            except Exception as e:
+                print(f"Error in triggered claim round: {e}")
+
+
+class ClaimListener:
+    """LISTENs for streamer and process changes made by any instance and forwards them to a ClaimTrigger"""
+
+    def __init__(self, trigger: ClaimTrigger, on_exit_delay: float = EXIT_RECLAIM_DELAY_SECONDS):
+        self.trigger = trigger
+        self.on_exit_delay = on_exit_delay
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if connection.engine.dialect.name != "postgresql":
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="claim-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception as e:
+                print(f"Claim listener error, reconnecting in {backoff:.0f}s: {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 60.0)
+
+    def _listen(self):
+        conn = connection.engine.raw_connection()
+        try:
+            dbapi_conn = conn.driver_connection
+            dbapi_conn.autocommit = True
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CLAIM_CHANNEL}")
+            # Anything may have changed while we were not listening
+            self.trigger.notify()
+
+            while not self._stop_event.is_set():
+                if select.select([dbapi_conn], [], [], 1.0)[0] == []:
+                    continue
+                dbapi_conn.poll()
+                payloads = set()
+                while dbapi_conn.notifies:
+                    payloads.add(dbapi_conn.notifies.pop(0).payload)
+                if payloads:
+                    self.trigger.notify()
+                if PROCESS_EXIT in payloads and self.on_exit_delay > 0:
+                    self.trigger.notify(delay=self.on_exit_delay)
+        finally:
+            # Don't hand a LISTENing connection back to the pool
+            conn.invalidate()
+
+
+trigger = ClaimTrigger()
+listener = ClaimListener(trigger)
@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+# How long a child gets to acknowledge a pushed config before the rolling restart takes over
+CONFIG_ACK_TIMEOUT_SECONDS = float(os.getenv("CONFIG_ACK_TIMEOUT_SECONDS", "10"))
+
+# Manager to child, one JSON object per line on the child's stdin:
+#   {"type": "config", "version": 3, "config": {"clip_duration": 60.0, ...}}
+# Child to manager, on stdout once the settings are applied, written as one whole line:
+#   {"type": "config_ack", "version": 3}
+# Children that don't implement this never ack and are restarted by app.core.rollout instead
+CONFIG_MESSAGE = "config"
+CONFIG_ACK_MESSAGE = "config_ack"
+
+# Settings a running child can change without a restart
+LIVE_SETTINGS = ("clip_duration", "window_timespan", "sample_interval", "baseline_duration", "surge_threshold")
+
+
+def config_message(config) -> dict:
+    return {
+        "type": CONFIG_MESSAGE,
+        "version": config.version,
+        "config": {name: getattr(config, name) for name in LIVE_SETTINGS},
+    }
+
+
+def parse_ack(line: str) -> Optional[int]:
+    """Config version acknowledged by a child output line, None for any other line"""
+    if not line.startswith("{") or CONFIG_ACK_MESSAGE not in line:
+        return None
+    try:
+        data = json.loads(line)
+        if data["type"] != CONFIG_ACK_MESSAGE:
+            return None
+        return int(data["version"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class ControlChannel:
+    """Line-delimited JSON pushed to the stdin of local children, with acknowledgements read back from their output"""
+
+    def __init__(self, ack_timeout: float = CONFIG_ACK_TIMEOUT_SECONDS):
+        self.ack_timeout = ack_timeout
+        self._lock = threading.Lock()
+        self._pipes = {}
+        # process id -> (version, deadline) of the push waiting for an ack
+        self._pending = {}
+        # process id -> latest version the child acknowledged
+        self._acked = {}
+
+    def register(self, process_id, proc: subprocess.Popen):
+        """Remember the stdin of a freshly spawned child"""
+        if proc.stdin is None:
+            return
+        # A child that never reads its stdin must not be able to block the manager
+        os.set_blocking(proc.stdin.fileno(), False)
+        with self._lock:
+            self._pipes[process_id] = proc.stdin
+
+    def forget(self, process_id):
+        """Drop a process that is no longer running"""
+        with self._lock:
+            pipe = self._pipes.pop(process_id, None)
+            self._pending.pop(process_id, None)
+            self._acked.pop(process_id, None)
+        if pipe is not None:
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def push(self, process_id, message: dict) -> bool:
+        """Write one message to a child, False if there is no open pipe to write to"""
+        data = (json.dumps(message) + "\n").encode()
+        with self._lock:
+            pipe = self._pipes.get(process_id)
+            if pipe is None:
+                return False
+            try:
+                written = os.write(pipe.fileno(), data)
+            except (BlockingIOError, BrokenPipeError, OSError, ValueError):
+                written = 0
+            if written != len(data):
+                # A partial line would corrupt the stream, stop using this pipe
+                self._pipes.pop(process_id, None)
+                return False
+            if message.get("type") == CONFIG_MESSAGE:
+                self._pending[process_id] = (message["version"], time.monotonic() + self.ack_timeout)
+        return True
+
+    def acknowledge(self, process_id, version: int):
+        """Record a config_ack read from the child's output"""
+        with self._lock:
+            if process_id not in self._pipes:
+                return
+            pending = self._pending.get(process_id)
+            if pending and pending[0] <= version:
+                self._pending.pop(process_id, None)
+            self._acked[process_id] = max(version, self._acked.get(process_id, 0))
+
+    def acked(self, version: int) -> List:
+        """Processes whose child confirmed running this version or a newer one"""
+        with self._lock:
+            return [process_id for process_id, acked in self._acked.items() if acked >= version]
+
+    def awaiting(self, process_id, version: int) -> bool:
+        """A push of this version is out and its ack may still arrive"""
+        with self._lock:
+            pending = self._pending.get(process_id)
+            return pending is not None and pending[0] == version and time.monotonic() < pending[1]
+
+    def pushed(self, process_id, version: int) -> bool:
+        """This version went out to the child already, acknowledged or not"""
+        with self._lock:
+            pending = self._pending.get(process_id)
+            return (pending is not None and pending[0] >= version) or self._acked.get(process_id, 0) >= version
+
+
+channel = ControlChannel()
@@ -0,0 +1,74 @@
+import json
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import models
+
+_NUMBER = r"(?P<value>\d+(?:\.\d+)?)"
+
+# Line formats printed by streamclips, matched from the start of the line only so chatter that merely
+# mentions an upload or a clip isn't taken for an event. value is the numeric payload stored with the event
+EVENT_PATTERNS: List[Tuple[models.StreamEventType, re.Pattern]] = [
+    (models.StreamEventType.SURGE_DETECTED, re.compile(rf"surge detected\b(?:.*?{_NUMBER}\s*x\b)?", re.IGNORECASE)),
+    (models.StreamEventType.CLIP_CREATED, re.compile(rf"clip created\b(?:.*?{_NUMBER}\s*s\b)?", re.IGNORECASE)),
+    (models.StreamEventType.UPLOAD_FAILED, re.compile(r"upload failed\b", re.IGNORECASE)),
+    (models.StreamEventType.UPLOAD_FINISHED, re.compile(
+        rf"upload (?:finished|completed?)\b(?:.*?{_NUMBER}\s*s\b)?", re.IGNORECASE)),
+]
+
+# Events that are problems are written to the logs as well, at this level
+LOGGED_EVENTS = {models.StreamEventType.UPLOAD_FAILED: models.LogLevel.WARNING}
+
+# Cheap pre-check so ordinary lines skip the regexes entirely
+_KEYWORDS = ("surge", "clip", "upload")
+
+
+def parse(line: str) -> Optional[Tuple[models.StreamEventType, Optional[float]]]:
+    """Recognise a known single-line streamclips record, returns (event type, value) or None"""
+    if "\n" in line:
+        return None  # A coalesced traceback or other multi-line record is log output, never an event
+    if line.startswith("{"):
+        return _parse_json(line)
+
+    lowered = line.lower()
+    if not any(keyword in lowered for keyword in _KEYWORDS):
+        return None
+
+    for event_type, pattern in EVENT_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            value = match.groupdict().get("value")
+            return event_type, float(value) if value is not None else None
+    return None
+
+
+def _parse_json(line: str) -> Optional[Tuple[models.StreamEventType, Optional[float]]]:
+    # streamclips may also print events as {"event": "clip_created", "value": 60}
+    try:
+        data = json.loads(line)
+        event_type = models.StreamEventType(str(data["event"]).upper())
+        value = data.get("value")
+        return event_type, float(value) if value is not None else None
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def stats(db: Session, streamer_id, since: datetime) -> List[dict]:
+    """Per event type count, sum, max and latest timestamp for one streamer"""
+    rows = db.query(
+        models.StreamEvent.event_type,
+        func.count(models.StreamEvent.id),
+        func.sum(models.StreamEvent.value),
+        func.max(models.StreamEvent.value),
+        func.max(models.StreamEvent.created_at),
+    ).filter(
+        models.StreamEvent.streamer_id == streamer_id,
+        models.StreamEvent.created_at >= since
+    ).group_by(models.StreamEvent.event_type).all()
+
+    return [
+        {"event_type": event_type, "count": count, "total": total, "max": max_value, "last_at": last_at}
+        for event_type, count, total, max_value, last_at in rows
+    ]
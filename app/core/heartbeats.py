@@ -0,0 +1,77 @@
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import DateTime, column, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Session
+from app.core.metrics import DB_COMMIT_SECONDS
+from app.database import models
+
+HEARTBEAT_FLUSH_SECONDS = int(os.getenv("HEARTBEAT_FLUSH_SECONDS", "5"))
+
+
+class HeartbeatAggregator:
+    """Keeps the latest activity timestamp per process in memory and flushes them in one bulk UPDATE"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._pending = {}
+
+    def beat(self, process_id, at: datetime = None):
+        """Record activity for a process"""
+        at = at or datetime.now(tz=timezone.utc)
+        with self._lock:
+            self._latest[process_id] = at
+            self._pending[process_id] = at
+
+    def last_activity(self, process_id) -> Optional[datetime]:
+        """Latest activity seen by this instance, None if the process never reported"""
+        with self._lock:
+            return self._latest.get(process_id)
+
+    def forget(self, process_id):
+        """Drop a process that is no longer running"""
+        with self._lock:
+            self._latest.pop(process_id, None)
+            self._pending.pop(process_id, None)
+
+    def flush(self, db: Session) -> int:
+        """Write all pending timestamps in a single statement, returns the number of processes updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                heartbeats = values(
+                    column("id", UUID(as_uuid=True)),
+                    column("last_activity", DateTime(timezone=True)),
+                    name="heartbeats"
+                ).data(list(pending.items()))
+                db.execute(
+                    update(models.StreamClipsProcess)
+                    .where(models.StreamClipsProcess.id == heartbeats.c.id)
+                    .values(last_activity=heartbeats.c.last_activity)
+                )
+            else:
+                db.execute(
+                    update(models.StreamClipsProcess),
+                    [{"id": process_id, "last_activity": at} for process_id, at in pending.items()]
+                )
+            with DB_COMMIT_SECONDS.time(writer="heartbeats"):
+                db.commit()
+        except Exception:
+            # Put the timestamps back unless a newer beat arrived meanwhile
+            with self._lock:
+                for process_id, at in pending.items():
+                    if process_id in self._latest:
+                        self._pending.setdefault(process_id, at)
+            raise
+
+        return len(pending)
+
+
+aggregator = HeartbeatAggregator()
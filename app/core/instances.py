@@ -2,11 +2,16 @@ import os
 import socket
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import exists
+from sqlalchemy import DateTime, Integer, case, cast, delete, exists, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased, selectinload
+from app.core import liveness, resources
+from app.core.metrics import CLAIMS_ATTEMPTED, CLAIMS_WON, PROCESS_EXITS
 from app.database import models
 from app.database.connection import get_db
 
+# A streamer whose process just stopped is left alone for this long
+CLAIM_COOLDOWN = timedelta(minutes=1)
 
 def get_current_hostname() -> str:
     """Get the current instance hostname"""
@@ -54,21 +59,26 @@ def update_heartbeat(db: Session, hostname: str = None):
     
     if instance:
         instance.last_heartbeat = datetime.now(tz=timezone.utc)
+        # Publish headroom for placement
+        for key, value in resources.sample_host().items():
+            setattr(instance, key, value)
         db.commit()
 
 
-def get_instance_load(db: Session, hostname: str = None) -> int:
-    """Get current process count for instance"""
+def get_instance_load(db: Session, hostname: str = None) -> float:
+    """Get current load for instance in cost units, a streamer without a cost counts as 1"""
     if hostname is None:
         hostname = get_current_hostname()
     
-    return db.query(models.StreamClipsProcess).filter(
+    return db.query(func.coalesce(func.sum(func.coalesce(models.Streamer.cost, 1.0)), 0.0)).select_from(
+        models.StreamClipsProcess
+    ).join(models.Streamer, models.StreamClipsProcess.streamer_id == models.Streamer.id).filter(
         models.StreamClipsProcess.instance_hostname == hostname
-    ).count()
+    ).scalar()
 
 
-def get_available_capacity(db: Session, hostname: str = None) -> int:
-    """Get available capacity for instance"""
+def get_available_capacity(db: Session, hostname: str = None) -> float:
+    """Get available capacity for instance in cost units"""
     if hostname is None:
         hostname = get_current_hostname()
     
@@ -80,33 +90,112 @@ def get_available_capacity(db: Session, hostname: str = None) -> int:
         return 0
     
     current_load = get_instance_load(db, hostname)
-    return max(0, instance.max_processes - current_load)
+    return max(0, instance.effective_max_processes - current_load)
 
 
-def claim_available_streamers(db: Session, hostname: str = None, max_count: int = None) -> List[models.Streamer]:
-    """Claim available streamers with database locking"""
+def claim_streamers(db: Session, hostname: str = None, max_count: int = None, max_cost: float = None) -> List[models.StreamClipsProcess]:
+    """Reserve streamers up to the instance's free capacity in one INSERT ... SELECT ... RETURNING, pids are filled in after spawning"""
     if hostname is None:
         hostname = get_current_hostname()
-    
-    if max_count is None:
-        max_count = get_available_capacity(db, hostname)
-    
-    if max_count <= 0:
-        return []
-    
-    # 1 minute cooldown period
-    cooldown_cutoff = datetime.now(timezone.utc) - timedelta(minutes=1)
-    
-    # Find streamers without processes and not recently processed
-    available_streamers = db.query(models.Streamer).filter(
+
+    SCP = models.StreamClipsProcess
+    # Capacity is counted in cost units, a streamer without a cost estimate counts as 1
+    running = aliased(models.Streamer)
+    used = select(func.coalesce(func.sum(func.coalesce(running.cost, 1.0)), 0.0)).select_from(SCP).join(
+        running, SCP.streamer_id == running.id
+    ).where(SCP.instance_hostname == hostname).scalar_subquery()
+    free = func.coalesce(select(models.Instance.effective_max_processes - used).where(
+        models.Instance.hostname == hostname
+    ).scalar_subquery(), 0.0)
+    # Capacity lowered below the running load leaves nothing free, not a negative LIMIT
+    free = case((free > 0, free), else_=0.0)
+    if max_cost is not None:
+        free = case((free < max_cost, free), else_=max_cost)
+
+    # Lock no more rows than could possibly fit, the cheapest claimable streamer bounds that. Rows locked but not
+    # claimed are skipped by concurrent claimers, so round down (a cast rounds to nearest on Postgres)
+    cheapest = aliased(models.Streamer)
+    lock_limit = cast(func.floor(free / select(func.nullif(func.min(func.coalesce(cheapest.cost, 1.0)), 0)).where(
+        cheapest.is_active == True
+    ).scalar_subquery()), Integer)
+    if max_count is not None:
+        lock_limit = case((lock_limit < max_count, lock_limit), else_=max_count)
+
+    now = datetime.now(tz=timezone.utc)
+    locked = select(
+        models.Streamer.id,
+        func.coalesce(models.Streamer.cost, 1.0).label("cost"),
+        models.Streamer.last_processed_at,
+    ).where(
+        *claimable_filter(now)
+    ).order_by(
+        models.Streamer.last_processed_at.asc().nulls_first(), models.Streamer.id
+    ).limit(lock_limit).with_for_update(skip_locked=True, of=models.Streamer).subquery()
+
+    # Take streamers in claim order for as long as their running cost still fits
+    ranked = select(
+        locked.c.id,
+        func.sum(locked.c.cost).over(
+            order_by=(locked.c.last_processed_at.asc().nulls_first(), locked.c.id)
+        ).label("total_cost"),
+    ).subquery()
+    candidates = select(
+        _new_uuid(db),
+        ranked.c.id,
+        literal(hostname),
+        literal(now, DateTime(timezone=True)),
+        literal(now, DateTime(timezone=True)),
+    ).where(ranked.c.total_cost <= free)
+
+    # Capacity is part of the statement and the unique streamer_id turns a lost race into a no-op
+    insert = (postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert)(SCP)
+    statement = insert.from_select(
+        ["id", "streamer_id", "instance_hostname", "created_at", "last_activity"], candidates
+    ).on_conflict_do_nothing(index_elements=["streamer_id"]).returning(SCP)
+
+    claimed = db.scalars(
+        select(SCP).from_statement(statement).options(selectinload(SCP.streamer)),
+        execution_options={"populate_existing": True}
+    ).all()
+    db.commit()
+    CLAIMS_ATTEMPTED.inc()
+    CLAIMS_WON.inc(len(claimed))
+    return claimed
+
+
+def claimable_filter(now: datetime = None) -> list:
+    """Conditions for a streamer that no instance runs, that is past its cooldown and restart backoff
+    and whose channel wasn't recently seen offline"""
+    now = now or datetime.now(tz=timezone.utc)
+    cooldown_cutoff = now - CLAIM_COOLDOWN
+    return [
         models.Streamer.is_active == True,
         ~exists().where(models.StreamClipsProcess.streamer_id == models.Streamer.id),
         # Exclude streamers processed within cooldown period
-        (models.Streamer.last_processed_at.is_(None)) | 
-        (models.Streamer.last_processed_at < cooldown_cutoff)
-    ).with_for_update(skip_locked=True).limit(max_count).all()
-    
-    return available_streamers
+        (models.Streamer.last_processed_at.is_(None)) |
+        (models.Streamer.last_processed_at < cooldown_cutoff),
+        # Crash-looping streamers wait out their backoff
+        models.Streamer.quarantined == False,
+        (models.Streamer.next_start_at.is_(None)) |
+        (models.Streamer.next_start_at <= now),
+        # Unknown or outdated liveness counts as live, the probe may be off or its leader gone
+        (models.Streamer.is_live.is_not(False)) |
+        (models.Streamer.live_checked_at < liveness.fresh_since(now)),
+    ]
+
+
+def claimable_cost(db: Session) -> float:
+    """Total cost of the streamers waiting to be claimed"""
+    return db.query(func.coalesce(func.sum(func.coalesce(models.Streamer.cost, 1.0)), 0.0)).filter(
+        *claimable_filter()
+    ).scalar()
+
+
+def _new_uuid(db: Session):
+    # Ids have to be generated per row inside the statement
+    if db.get_bind().dialect.name == "postgresql":
+        return func.gen_random_uuid()
+    return func.lower(func.hex(func.randomblob(16)))
 
 
 def get_instance_processes(db: Session, hostname: str = None) -> List[models.StreamClipsProcess]:
@@ -119,6 +208,15 @@ def get_instance_processes(db: Session, hostname: str = None) -> List[models.Str
     ).all()
 
 
+def get_live_instances(db: Session, timeout_minutes: int = 5) -> List[models.Instance]:
+    """Get instances that sent a heartbeat recently"""
+    cutoff_time = datetime.now(tz=timezone.utc) - timedelta(minutes=timeout_minutes)
+    
+    return db.query(models.Instance).filter(
+        models.Instance.last_heartbeat >= cutoff_time
+    ).all()
+
+
 def get_dead_instances(db: Session, timeout_minutes: int = 5) -> List[models.Instance]:
     """Get instances that haven't sent heartbeat recently"""
     cutoff_time = datetime.now(tz=timezone.utc) - timedelta(minutes=timeout_minutes)
@@ -128,20 +226,27 @@ def get_dead_instances(db: Session, timeout_minutes: int = 5) -> List[models.Ins
     ).all()
 
 
+def release_processes(db: Session, *criteria) -> List[tuple]:
+    """Stamp the streamers of the matching processes and delete the rows in two statements, returns (id, pid, instance_hostname) of each row, the caller commits"""
+    SCP = models.StreamClipsProcess
+    db.execute(
+        update(models.Streamer)
+        .where(models.Streamer.id == SCP.streamer_id, *criteria)
+        .values(last_processed_at=datetime.now(timezone.utc)),
+        execution_options={"synchronize_session": False}
+    )
+    return db.execute(
+        delete(SCP).where(*criteria).returning(SCP.id, SCP.pid, SCP.instance_hostname),
+        execution_options={"synchronize_session": False}
+    ).all()
+
+
 def cleanup_dead_instance_processes(db: Session, hostname: str):
     """Clean up processes from dead instance"""
-    processes = db.query(models.StreamClipsProcess).filter(
-        models.StreamClipsProcess.instance_hostname == hostname
-    ).all()
-    
-    for process in processes:
-        # Update streamer's last_processed_at timestamp
-        if process.streamer:
-            process.streamer.last_processed_at = datetime.now(timezone.utc)
-        db.delete(process)
-    
+    released = release_processes(db, models.StreamClipsProcess.instance_hostname == hostname)
     db.commit()
-    return len(processes)
+    PROCESS_EXITS.inc(len(released), reason="instance_dead")
+    return len(released)
 
 
 def get_all_instances(db: Session) -> List[models.Instance]:
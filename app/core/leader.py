@@ -0,0 +1,63 @@
+import threading
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from app.database import connection
+
+# Session-level advisory lock held by the instance that runs cluster-wide jobs
+LEADER_LOCK_ID = 0x73636c64
+
+
+class LeaderElection:
+    """Holds a Postgres advisory lock on a dedicated connection, whoever holds it is the leader"""
+
+    def __init__(self, lock_id: int = LEADER_LOCK_ID):
+        self.lock_id = lock_id
+        self._lock = threading.Lock()
+        self._conn: Optional[Connection] = None
+        self._leader = False
+
+    def is_leader(self) -> bool:
+        """Try to become (or confirm still being) the leader, called before every cluster-wide job"""
+        if connection.engine.dialect.name != "postgresql":
+            return True  # Nothing to share a lock with, the single instance leads
+
+        with self._lock:
+            try:
+                if self._conn is None:
+                    self._conn = connection.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+                if self._leader:
+                    # The lock lives as long as the connection, make sure it is still there
+                    self._conn.execute(text("SELECT 1"))
+                else:
+                    self._leader = bool(self._conn.execute(
+                        text("SELECT pg_try_advisory_lock(:id)"), {"id": self.lock_id}
+                    ).scalar())
+                    if self._leader:
+                        print("Became cluster leader")
+            except Exception as e:
+                print(f"Lost leader connection: {e}")
+                self._reset()
+        return self._leader
+
+    def resign(self):
+        """Release leadership so another instance can take over straight away"""
+        with self._lock:
+            if self._conn is not None and self._leader:
+                try:
+                    self._conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": self.lock_id})
+                except Exception:
+                    pass
+            self._reset()
+
+    def _reset(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._leader = False
+
+
+election = LeaderElection()
@@ -0,0 +1,171 @@
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+import httpx
+from sqlalchemy.orm import Session
+from app.core.metrics import LIVENESS_PROBES
+from app.database import models
+
+LIVENESS_PROBE_ENABLED = os.getenv("LIVENESS_PROBE_ENABLED", "true").lower() in ("1", "true", "yes")
+LIVENESS_PROBE_INTERVAL_SECONDS = int(os.getenv("LIVENESS_PROBE_INTERVAL_SECONDS", "30"))
+# Connections shared by all probes of a round, the rest queue for a free one
+LIVENESS_PROBE_CONCURRENCY = int(os.getenv("LIVENESS_PROBE_CONCURRENCY", "20"))
+LIVENESS_PROBE_TIMEOUT_SECONDS = float(os.getenv("LIVENESS_PROBE_TIMEOUT_SECONDS", "10"))
+# An answer is reused for this long before the channel is asked again
+LIVENESS_CACHE_TTL_SECONDS = float(os.getenv("LIVENESS_CACHE_TTL_SECONDS", "60"))
+# Answers older than this, e.g. while no leader is probing, no longer keep a streamer from being claimed
+LIVENESS_STALE_SECONDS = float(os.getenv("LIVENESS_STALE_SECONDS", "300"))
+
+KICK_API_URL = os.getenv("KICK_API_URL", "https://kick.com")
+TWITCH_API_URL = os.getenv("TWITCH_API_URL", "https://api.twitch.tv")
+TWITCH_CLIENT_ID = os.getenv("TWITCH_CLIENT_ID")
+TWITCH_ACCESS_TOKEN = os.getenv("TWITCH_ACCESS_TOKEN")
+
+
+def channel_name(url: str) -> str:
+    """The channel slug of a stream url, https://kick.com/xqc -> xqc"""
+    return urlparse(url).path.strip("/").split("/")[0].lower()
+
+
+def fresh_since(now: datetime = None) -> datetime:
+    """Probe answers recorded before this are too old to act on"""
+    return (now or datetime.now(tz=timezone.utc)) - timedelta(seconds=LIVENESS_STALE_SECONDS)
+
+
+class LivenessBackend(ABC):
+    """Tells whether a channel of one platform is live, None when it can't say"""
+
+    @abstractmethod
+    async def is_live(self, client: httpx.AsyncClient, channel: str) -> Optional[bool]:
+        ...
+
+
+class KickBackend(LivenessBackend):
+    def __init__(self, api_url: str = KICK_API_URL):
+        self.api_url = api_url.rstrip("/")
+
+    async def is_live(self, client: httpx.AsyncClient, channel: str) -> Optional[bool]:
+        response = await client.get(f"{self.api_url}/api/v2/channels/{channel}")
+        if response.status_code == 404:
+            return False  # No such channel, nothing to clip
+        response.raise_for_status()
+        return response.json().get("livestream") is not None
+
+
+class TwitchBackend(LivenessBackend):
+    def __init__(self, api_url: str = TWITCH_API_URL, client_id: str = TWITCH_CLIENT_ID,
+                 access_token: str = TWITCH_ACCESS_TOKEN):
+        self.api_url = api_url.rstrip("/")
+        self.client_id = client_id
+        self.access_token = access_token
+
+    async def is_live(self, client: httpx.AsyncClient, channel: str) -> Optional[bool]:
+        if not (self.client_id and self.access_token):
+            return None  # Helix needs credentials, without them Twitch channels stay claimable
+        response = await client.get(
+            f"{self.api_url}/helix/streams",
+            params={"user_login": channel},
+            headers={"Client-Id": self.client_id, "Authorization": f"Bearer {self.access_token}"}
+        )
+        response.raise_for_status()
+        return bool(response.json().get("data"))
+
+
+class LivenessProber:
+    """Checks channels concurrently over one bounded connection pool and caches the answers for a TTL"""
+
+    def __init__(self, backends: Dict[str, LivenessBackend] = None, concurrency: int = LIVENESS_PROBE_CONCURRENCY,
+                 timeout: float = LIVENESS_PROBE_TIMEOUT_SECONDS, ttl: float = LIVENESS_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        if backends is None:
+            backends = {"kick.com": KickBackend(), "twitch.tv": TwitchBackend()}
+        self.backends = dict(backends)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.clock = clock
+        # url -> (live, expires at)
+        self._cache: Dict[str, Tuple[bool, float]] = {}
+
+    def register(self, host: str, backend: LivenessBackend):
+        """Probe urls on host, without its www. prefix, with backend"""
+        self.backends[host] = backend
+
+    def backend_for(self, url: str) -> Optional[LivenessBackend]:
+        host = (urlparse(url).hostname or "").lower()
+        return self.backends.get(host[4:] if host.startswith("www.") else host)
+
+    async def probe(self, urls: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """Live state of each url, from the cache while fresh, None where the platform couldn't tell"""
+        now = self.clock()
+        results, pending = {}, []
+        for url in set(urls):
+            cached = self._cache.get(url)
+            if cached and cached[1] > now:
+                results[url] = cached[0]
+            else:
+                pending.append(url)
+        if not pending:
+            return results
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        # Probes waiting for a free connection don't time out, only the request itself does
+        timeout = httpx.Timeout(self.timeout, pool=None)
+        async with httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True) as client:
+            answers = await asyncio.gather(*(self._check(client, url) for url in pending))
+
+        expires = self.clock() + self.ttl
+        for url, live in zip(pending, answers):
+            results[url] = live
+            if live is not None:
+                self._cache[url] = (live, expires)
+        return results
+
+    async def _check(self, client: httpx.AsyncClient, url: str) -> Optional[bool]:
+        backend = self.backend_for(url)
+        if backend is None:
+            LIVENESS_PROBES.inc(result="unsupported")
+            return None
+        try:
+            live = await backend.is_live(client, channel_name(url))
+        except Exception as e:
+            print(f"Liveness probe for {url} failed: {e!r}")
+            LIVENESS_PROBES.inc(result="error")
+            return None
+        LIVENESS_PROBES.inc(result="unknown" if live is None else "live" if live else "offline")
+        return live
+
+
+def refresh(db: Session, prober: "LivenessProber", now: datetime = None) -> Tuple[int, int]:
+    """Leader only, probe every active streamer and store the answers, returns how many went live and offline"""
+    streamers = db.query(models.Streamer.id, models.Streamer.url, models.Streamer.is_live).filter(
+        models.Streamer.is_active == True
+    ).all()
+    db.commit()  # Don't keep the transaction open over the network round
+
+    results = asyncio.run(prober.probe(url for _, url, _ in streamers))
+    now = now or datetime.now(tz=timezone.utc)
+    went_live, went_offline, unchanged = [], [], []
+    for streamer_id, url, was_live in streamers:
+        live = results.get(url)
+        if live is None:
+            continue  # Keep the last answer until it goes stale
+        (unchanged if live == was_live else went_live if live else went_offline).append(streamer_id)
+
+    # Only transitions write is_live, which wakes the claim loop of every instance
+    for ids, values in ((went_live, {models.Streamer.is_live: True}),
+                        (went_offline, {models.Streamer.is_live: False}),
+                        (unchanged, {})):
+        if ids:
+            db.query(models.Streamer).filter(models.Streamer.id.in_(ids)).update(
+                {**values, models.Streamer.live_checked_at: now}, synchronize_session=False
+            )
+    db.commit()
+    return len(went_live), len(went_offline)
+
+
+prober = LivenessProber()
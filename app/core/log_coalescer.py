@@ -0,0 +1,103 @@
+import os
+import re
+import time
+from typing import List, Optional
+
+# How long a record stays open waiting for continuation lines
+LOG_COALESCE_GAP_SECONDS = float(os.getenv("LOG_COALESCE_GAP_SECONDS", "0.2"))
+LOG_COALESCE_MAX_LINES = int(os.getenv("LOG_COALESCE_MAX_LINES", "200"))
+LOG_COALESCE_MAX_BYTES = int(os.getenv("LOG_COALESCE_MAX_BYTES", "16384"))
+
+TRACEBACK_HEADER = "Traceback (most recent call last):"
+# Lines Python prints between the tracebacks of chained exceptions
+TRACEBACK_CHAIN_MARKERS = (
+    "During handling of the above exception",
+    "The above exception was the direct cause",
+)
+# ffmpeg prefixes its diagnostics with the component, e.g. "[h264 @ 0x55d0c8a3e2c0]"
+FFMPEG_COMPONENT = re.compile(r"^\[[\w\-/]+ @ (?:0x)?[0-9a-fA-F]+\]")
+
+
+class LineCoalescer:
+    """Groups continuation lines of one stream (tracebacks, indented ffmpeg blocks, repeated ffmpeg diagnostics) into single records"""
+
+    def __init__(self, gap: float = LOG_COALESCE_GAP_SECONDS, max_lines: int = LOG_COALESCE_MAX_LINES,
+                 max_bytes: int = LOG_COALESCE_MAX_BYTES):
+        self.gap = gap
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self._lines: List[str] = []
+        self._size = 0
+        self._last_at = 0.0
+        self._traceback = False
+        self._in_traceback = False
+        self._component: Optional[str] = None
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """Monotonic time after which the open record should be flushed, None when nothing is open"""
+        return self._last_at + self.gap if self._lines else None
+
+    def feed(self, line: str, now: float = None) -> List[str]:
+        """Add one line, returns the records it completed"""
+        now = time.monotonic() if now is None else now
+        completed = []
+        if self._lines and (now - self._last_at > self.gap or not self._continues(line)):
+            completed.append(self.flush())
+        if self._lines and (len(self._lines) >= self.max_lines or self._size + len(line) + 1 > self.max_bytes):
+            # Keep records bounded, the rest of the block carries on as a new record
+            completed.append(self._take())
+
+        if not self._lines:
+            self._start(line)
+        self._append(line)
+        self._last_at = now
+        return completed
+
+    def flush(self) -> Optional[str]:
+        """Close the open record and return it"""
+        record = self._take()
+        self._traceback = self._in_traceback = False
+        self._component = None
+        return record
+
+    def flush_due(self, now: float = None) -> Optional[str]:
+        """Flush the open record if no continuation arrived within the gap"""
+        now = time.monotonic() if now is None else now
+        if self._lines and now >= self.deadline:
+            return self.flush()
+        return None
+
+    def _start(self, line: str):
+        if line.startswith(TRACEBACK_HEADER):
+            self._traceback = self._in_traceback = True
+        match = FFMPEG_COMPONENT.match(line)
+        self._component = match.group(0) if match else None
+
+    def _append(self, line: str):
+        if self._traceback and self._lines:
+            if line.startswith(TRACEBACK_HEADER):
+                self._in_traceback = True
+            elif not line[:1].isspace() and not line.startswith(TRACEBACK_CHAIN_MARKERS):
+                # The unindented line after the frames is the exception itself
+                self._in_traceback = False
+        self._lines.append(line)
+        self._size += len(line) + 1
+
+    def _continues(self, line: str) -> bool:
+        if line[:1].isspace():
+            return True
+        if self._traceback:
+            return self._in_traceback or line.startswith(TRACEBACK_CHAIN_MARKERS) or (
+                line.startswith(TRACEBACK_HEADER) and self._lines[-1].startswith(TRACEBACK_CHAIN_MARKERS))
+        if self._component:
+            return line.startswith(self._component)
+        return False
+
+    def _take(self) -> Optional[str]:
+        if not self._lines:
+            return None
+        record = "\n".join(self._lines).strip()
+        self._lines = []
+        self._size = 0
+        return record
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from typing import List, Tuple
+from app.database import models
+
+
+def _level_setting(name: str, level: models.LogLevel, default: str) -> float:
+    return float(os.getenv(f"{name}_{level.value}", default))
+
+# Lines per second and burst size per source, 0 disables the limit for that level
+LOG_RATE_LIMITS = {
+    level: (_level_setting("LOG_RATE_LIMIT", level, "20"), _level_setting("LOG_RATE_BURST", level, "100"))
+    for level in (models.LogLevel.INFO, models.LogLevel.WARNING)
+}
+# Every stderr line counts as ERROR, ffmpeg and Python logging write all their output there
+LOG_RATE_LIMITS[models.LogLevel.ERROR] = (
+    _level_setting("LOG_RATE_LIMIT", models.LogLevel.ERROR, "100"),
+    _level_setting("LOG_RATE_BURST", models.LogLevel.ERROR, "500"),
+)
+# Fraction of INFO lines that are kept before rate limiting, 1 keeps everything
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))
+LOG_SUPPRESSION_SUMMARY_SECONDS = int(os.getenv("LOG_SUPPRESSION_SUMMARY_SECONDS", "10"))
+# Shed everything but ERROR once the log writer queue is this full, and ERROR too past the second threshold
+LOG_BACKPRESSURE_THRESHOLD = float(os.getenv("LOG_BACKPRESSURE_THRESHOLD", "0.8"))
+LOG_ERROR_BACKPRESSURE_THRESHOLD = float(os.getenv("LOG_ERROR_BACKPRESSURE_THRESHOLD", "0.95"))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class LogLimiter:
+    """Per-source token buckets and INFO sampling for process output, ERROR lines get a larger bucket and are shed
+    last under backpressure"""
+
+    def __init__(self, limits: dict = None, info_sample_rate: float = LOG_INFO_SAMPLE_RATE,
+                 backpressure_threshold: float = LOG_BACKPRESSURE_THRESHOLD,
+                 error_backpressure_threshold: float = LOG_ERROR_BACKPRESSURE_THRESHOLD):
+        self.limits = LOG_RATE_LIMITS if limits is None else limits
+        self.info_sample_rate = info_sample_rate
+        self.backpressure_threshold = backpressure_threshold
+        self.error_backpressure_threshold = error_backpressure_threshold
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._sample_counters = {}
+        self._suppressed = {}
+        self._suppressed_total = {}
+        self._window_started = time.monotonic()
+
+    def allow(self, source: str, level: models.LogLevel, pressure: float = 0.0) -> bool:
+        """Decide whether a line should be stored, counting it as suppressed otherwise"""
+        error = level == models.LogLevel.ERROR
+        with self._lock:
+            allowed = pressure < (self.error_backpressure_threshold if error else self.backpressure_threshold)
+            if allowed and level == models.LogLevel.INFO and self.info_sample_rate < 1:
+                allowed = self._sample(source)
+            if allowed:
+                allowed = self._bucket(source, level).take()
+            if not allowed:
+                self._suppressed[source] = self._suppressed.get(source, 0) + 1
+                self._suppressed_total[source] = self._suppressed_total.get(source, 0) + 1
+            return allowed
+
+    def summaries(self) -> List[Tuple[str, int, float]]:
+        """Pop (source, suppressed lines, window seconds) for every source that lost lines"""
+        with self._lock:
+            now = time.monotonic()
+            window = now - self._window_started
+            suppressed, self._suppressed = self._suppressed, {}
+            self._window_started = now
+        return [(source, count, window) for source, count in suppressed.items()]
+
+    def status(self) -> dict:
+        """Configured limits and suppression counters for the admin"""
+        with self._lock:
+            return {
+                "limits": {level.value: {"rate": rate, "burst": burst} for level, (rate, burst) in self.limits.items()},
+                "info_sample_rate": self.info_sample_rate,
+                "backpressure_threshold": self.backpressure_threshold,
+                "error_backpressure_threshold": self.error_backpressure_threshold,
+                "suppressed_in_window": dict(self._suppressed),
+                "suppressed_total": dict(self._suppressed_total),
+            }
+
+    def _sample(self, source: str) -> bool:
+        # Deterministic 1-in-N sampling keeps the stored lines evenly spread
+        counter = self._sample_counters.get(source, 0) + 1
+        self._sample_counters[source] = counter
+        every = max(1, round(1 / self.info_sample_rate)) if self.info_sample_rate > 0 else 0
+        return every > 0 and counter % every == 0
+
+    def _bucket(self, source: str, level: models.LogLevel) -> TokenBucket:
+        key = (source, level)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self.limits.get(level, (0, 0))
+            bucket = self._buckets[key] = _Unlimited() if rate <= 0 else TokenBucket(rate, burst)
+        return bucket
+
+
+class _Unlimited:
+    def take(self) -> bool:
+        return True
+
+
+limiter = LogLimiter()
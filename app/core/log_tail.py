@@ -0,0 +1,98 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import List, Optional
+from app.database import models
+
+LOG_TAIL_BUFFER_LINES = int(os.getenv("LOG_TAIL_BUFFER_LINES", "500"))
+LOG_TAIL_SUBSCRIBER_QUEUE = int(os.getenv("LOG_TAIL_SUBSCRIBER_QUEUE", "1000"))
+
+
+class Subscription:
+    """A live tail of one source (or all of them when source is None), read from an asyncio loop"""
+
+    def __init__(self, source: Optional[str], backlog: List[dict], loop: asyncio.AbstractEventLoop):
+        self.source = source
+        self.backlog = backlog
+        self.dropped = 0
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=LOG_TAIL_SUBSCRIBER_QUEUE)
+
+    def matches(self, source: str) -> bool:
+        return self.source is None or self.source == source
+
+    def push(self, record: dict):
+        """Thread-safe, called from the output readers"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, record)
+        except RuntimeError:
+            pass  # Loop already closed, the subscriber is gone
+
+    async def get(self) -> dict:
+        return await self._queue.get()
+
+    def _put(self, record: dict):
+        # A slow client loses its oldest lines rather than blocking the publisher
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(record)
+
+
+class LogTail:
+    """Keeps the last lines of every source in memory and fans new lines out to live subscribers"""
+
+    def __init__(self, maxlen: int = LOG_TAIL_BUFFER_LINES):
+        self.maxlen = maxlen
+        self._lock = threading.Lock()
+        self._buffers = {}
+        self._subscribers = set()
+
+    def publish(self, source: str, message: str, level: models.LogLevel, created_at: datetime = None):
+        record = {
+            "source": source,
+            "level": level.value if isinstance(level, models.LogLevel) else level,
+            "message": message,
+            "created_at": (created_at or datetime.now(tz=timezone.utc)).isoformat(),
+        }
+        with self._lock:
+            buffer = self._buffers.get(source)
+            if buffer is None:
+                buffer = self._buffers[source] = deque(maxlen=self.maxlen)
+            buffer.append(record)
+            subscribers = [s for s in self._subscribers if s.matches(source)]
+
+        for subscriber in subscribers:
+            subscriber.push(record)
+
+    def backlog(self, source: Optional[str] = None) -> List[dict]:
+        """Buffered lines of one source, or of every source merged in time order"""
+        with self._lock:
+            return self._backlog(source)
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return sorted(self._buffers)
+
+    def subscribe(self, source: Optional[str] = None) -> Subscription:
+        """Must be called from the event loop that will read the subscription"""
+        with self._lock:
+            # Snapshot and register together so no line is missed or repeated
+            subscription = Subscription(source, self._backlog(source), asyncio.get_running_loop())
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _backlog(self, source: Optional[str]) -> List[dict]:
+        if source is not None:
+            return list(self._buffers.get(source, ()))
+        records = [record for buffer in self._buffers.values() for record in buffer]
+        return sorted(records, key=lambda record: record["created_at"])
+
+
+tail = LogTail()
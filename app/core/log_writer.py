@@ -0,0 +1,157 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import insert
+from app.core.metrics import DB_COMMIT_SECONDS, LOG_LINES_DROPPED, registry
+from app.database import models
+from app.database.connection import get_db
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_FLUSH_SIZE = int(os.getenv("LOG_FLUSH_SIZE", "500"))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "1.0"))
+
+
+class LogWriter:
+    """Buffers log and event rows on a bounded queue and bulk-inserts them from one flusher thread"""
+
+    def __init__(self, max_queue: int = LOG_QUEUE_SIZE, flush_size: int = LOG_FLUSH_SIZE,
+                 flush_interval: float = LOG_FLUSH_INTERVAL_SECONDS):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "flushes": 0,
+            "rows_written": 0,
+            "rows_dropped": 0,
+            "failed_flushes": 0,
+            "last_flush_size": 0,
+            "max_flush_size": 0,
+            "last_flush_seconds": 0.0,
+            "max_flush_seconds": 0.0,
+            "total_flush_seconds": 0.0,
+        }
+
+    def write(self, source: str, message: str, level: models.LogLevel, created_at: datetime = None) -> bool:
+        """Queue a log record, returns False if the queue is full and the record was dropped"""
+        return self._put(models.Log, {
+            "source": source,
+            "message": message,
+            "level": level,
+            "created_at": created_at or datetime.now(tz=timezone.utc),
+        })
+
+    def write_event(self, streamer_id, event_type: models.StreamEventType, value: Optional[float] = None,
+                    created_at: datetime = None) -> bool:
+        """Queue a structured stream event, flushed together with the logs"""
+        return self._put(models.StreamEvent, {
+            "streamer_id": streamer_id,
+            "event_type": event_type,
+            "value": value,
+            "created_at": created_at or datetime.now(tz=timezone.utc),
+        })
+
+    def _put(self, model, row: dict) -> bool:
+        try:
+            self._queue.put_nowait((model, row))
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self._stats["rows_dropped"] += 1
+            return False
+
+    def pressure(self) -> float:
+        """How full the queue is, from 0 to 1"""
+        return self._queue.qsize() / self._queue.maxsize if self._queue.maxsize else 0.0
+
+    def start(self):
+        """Start the flusher thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher thread after writing everything still queued"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        """Snapshot of flush sizes and latencies"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["avg_flush_size"] = stats["rows_written"] / stats["flushes"] if stats["flushes"] else 0
+        stats["avg_flush_seconds"] = stats["total_flush_seconds"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            try:
+                batch.append(self._queue.get(timeout=max(0.0, min(deadline - time.monotonic(), 0.5))))
+                # Drain whatever is already waiting without blocking
+                while len(batch) < self.flush_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.flush_size or time.monotonic() >= deadline or self._stop_event.is_set():
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch: list):
+        started = time.perf_counter()
+        rows_by_model = {}
+        for model, row in batch:
+            rows_by_model.setdefault(model, []).append(row)
+
+        written = 0
+        db = next(get_db())
+        try:
+            # A transaction per table, events of a streamer deleted meanwhile fail their foreign key without the logs
+            for model, rows in rows_by_model.items():
+                try:
+                    db.execute(insert(model), rows)
+                    with DB_COMMIT_SECONDS.time(writer="logs"):
+                        db.commit()
+                except Exception as e:
+                    print(f"Error writing {len(rows)} {model.__tablename__} rows: {e}")
+                    db.rollback()
+                    LOG_LINES_DROPPED.inc(len(rows), reason="flush_failed")
+                    with self._stats_lock:
+                        self._stats["failed_flushes"] += 1
+                        self._stats["rows_dropped"] += len(rows)
+                    continue
+                written += len(rows)
+        finally:
+            db.close()
+        if not written:
+            return
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._stats["flushes"] += 1
+            self._stats["rows_written"] += written
+            self._stats["last_flush_size"] = written
+            self._stats["max_flush_size"] = max(self._stats["max_flush_size"], written)
+            self._stats["last_flush_seconds"] = elapsed
+            self._stats["max_flush_seconds"] = max(self._stats["max_flush_seconds"], elapsed)
+            self._stats["total_flush_seconds"] += elapsed
+
+writer = LogWriter()
+registry.gauge("streamclips_log_queue_depth", "Rows waiting for the log writer", writer._queue.qsize)
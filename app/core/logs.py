@@ -1,32 +1,164 @@
-from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+import base64
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 from fastapi import HTTPException
-from sqlalchemy import asc
+from sqlalchemy import asc, func, literal, text, tuple_
 from sqlalchemy.orm import Session
 from app.database import models
 import app.schemas as schemas
 
-MAX_LOG_TIME_MINUTES = 1
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "7"))
+LOG_PARTITIONS_AHEAD_DAYS = int(os.getenv("LOG_PARTITIONS_AHEAD_DAYS", "3"))
 
-# def remove_old_logs(db: Session):
-#     cutoff = datetime.now(tz=timezone.utc) - timedelta(minutes=MAX_LOG_TIME_MINUTES)
-#     db.query(models.Log).filter(models.Log.created_at <= cutoff).delete(synchronize_session=False)
-#     db.commit()
+# Serializes partition DDL between instances
+PARTITION_LOCK_ID = 0x6c6f6773
 
 def create(db: Session, source: str, message: str, level: models.LogLevel) -> models.Streamer:
-
-    #remove_old_logs(db)
-
     log = models.Log(source=source, message=message, level=level)
     db.add(log)
     db.commit()
     db.refresh(log)
     return log
 
-def list(db: Session, source: Optional[str], level: Optional[models.LogLevel], offset: int = 0, limit: int = 100):
+def encode_cursor(log: models.Log) -> str:
+    """Opaque token pointing just past the given log in newest-first order"""
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def list(db: Session, source: Optional[str], level: Optional[models.LogLevel], after: Optional[str] = None, limit: int = 100) -> Tuple[List[models.Log], Optional[str]]:
+    """Newest-first page of logs and the cursor for the next page (None on the last page)"""
     query = db.query(models.Log)
     if source:
         query = query.filter_by(source=source)
     if level:
         query = query.filter_by(level=level)
-    return query.order_by(models.Log.created_at.desc()).offset(offset).limit(limit).all()
\ No newline at end of file
+    if after:
+        query = query.filter(tuple_(models.Log.created_at, models.Log.id) < decode_cursor(after))
+
+    # Fetch one extra row to know whether another page exists
+    items = query.order_by(models.Log.created_at.desc(), models.Log.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(items[limit - 1]) if len(items) > limit else None
+    return items[:limit], next_cursor
+
+def search(db: Session, q: str, source: Optional[str] = None, level: Optional[models.LogLevel] = None,
+           since: Optional[datetime] = None, until: Optional[datetime] = None, limit: int = 50) -> List[Tuple[models.Log, float]]:
+    """Ranked full-text search over log messages, source may end with * to match a prefix"""
+    query = search_filter(db, db.query(models.Log, search_rank(db, q).label("rank")), q)
+    if source:
+        if source.endswith("*"):
+            query = query.filter(models.Log.source.startswith(source[:-1], autoescape=True))
+        else:
+            query = query.filter(models.Log.source == source)
+    if level:
+        query = query.filter(models.Log.level == level)
+    # Time bounds also let Postgres skip whole partitions
+    if since:
+        query = query.filter(models.Log.created_at >= since)
+    if until:
+        query = query.filter(models.Log.created_at < until)
+    return [(log, rank) for log, rank in query.order_by(text("rank DESC"), models.Log.created_at.desc()).limit(limit).all()]
+
+def search_filter(db: Session, query, q: str):
+    """Restrict a logs query to messages matching q, backed by the ix_logs_message_tsv GIN index"""
+    if db.get_bind().dialect.name != "postgresql":
+        return query.filter(models.Log.message.icontains(q, autoescape=True))
+    return query.filter(_message_tsvector().op("@@")(func.websearch_to_tsquery(models.LOG_SEARCH_CONFIG, q)))
+
+def search_rank(db: Session, q: str):
+    if db.get_bind().dialect.name != "postgresql":
+        return literal(1.0)
+    return func.ts_rank(_message_tsvector(), func.websearch_to_tsquery(models.LOG_SEARCH_CONFIG, q))
+
+def _message_tsvector():
+    return func.to_tsvector(models.LOG_SEARCH_CONFIG, models.Log.message)
+
+def is_partitioned(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+def partition_name(day: date) -> str:
+    return f"logs_{day:%Y%m%d}"
+
+def list_partitions(db: Session) -> List[str]:
+    """Names of the daily partitions currently attached to logs"""
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'logs'"
+    )).scalars().all()
+    return sorted(name for name in rows if name != "logs_default")
+
+def create_partitions(db: Session, days_ahead: int = LOG_PARTITIONS_AHEAD_DAYS) -> List[str]:
+    """Create daily partitions from today up to days_ahead in the future"""
+    today = datetime.now(tz=timezone.utc).date()
+    existing = set(list_partitions(db))
+    created = []
+    for offset in range(days_ahead + 1):
+        day = today + timedelta(days=offset)
+        name = partition_name(day)
+        if name in existing:
+            continue
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF logs "
+            f"FOR VALUES FROM ('{day.isoformat()} 00:00:00+00') TO ('{(day + timedelta(days=1)).isoformat()} 00:00:00+00')"
+        ))
+        created.append(name)
+    return created
+
+def drop_expired_partitions(db: Session, retention_days: int = LOG_RETENTION_DAYS) -> List[str]:
+    """Drop daily partitions whose whole day is older than the retention window"""
+    cutoff = datetime.now(tz=timezone.utc).date() - timedelta(days=retention_days)
+    dropped = []
+    for name in list_partitions(db):
+        try:
+            day = datetime.strptime(name, "logs_%Y%m%d").date()
+        except ValueError:
+            continue
+        if day < cutoff:
+            db.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+
+    # Anything that fell into the default partition is expired row by row, it should stay tiny
+    db.execute(
+        text("DELETE FROM logs_default WHERE created_at < :cutoff"),
+        {"cutoff": datetime(cutoff.year, cutoff.month, cutoff.day, tzinfo=timezone.utc)}
+    )
+    return dropped
+
+def maintain_partitions(db: Session, retention_days: int = LOG_RETENTION_DAYS, days_ahead: int = LOG_PARTITIONS_AHEAD_DAYS):
+    """Create upcoming partitions and drop expired ones, returns (created, dropped)"""
+    if not is_partitioned(db):
+        cutoff = datetime.now(tz=timezone.utc) - timedelta(days=retention_days)
+        db.query(models.Log).filter(models.Log.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return [], []
+
+    try:
+        if not db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": PARTITION_LOCK_ID}).scalar():
+            # Another instance is maintaining partitions right now
+            db.rollback()
+            return [], []
+        created = create_partitions(db, days_ahead)
+        dropped = drop_expired_partitions(db, retention_days)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return created, dropped
+
+def purge(db: Session):
+    """Remove every log, truncating all partitions instead of deleting row by row"""
+    if is_partitioned(db):
+        db.execute(text("TRUNCATE TABLE logs"))
+    else:
+        db.query(models.Log).delete()
+    db.commit()
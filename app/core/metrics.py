@@ -0,0 +1,221 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Sharded:
+    """Each thread updates its own shard without locking, readers merge the shards"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Tuple[threading.Thread, dict]] = []
+        # Values of threads that have exited, so short-lived threads don't pile up shards
+        self._retired: dict = {}
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _snapshots(self) -> List[dict]:
+        with self._lock:
+            alive = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    alive.append((thread, shard))
+                else:
+                    self._merge(self._retired, dict(shard))
+            self._shards = alive
+            return [dict(self._retired)] + [dict(shard) for _, shard in alive]
+
+    def _merge(self, into: dict, shard: dict):
+        for key, value in shard.items():
+            into[key] = into.get(key, 0) + value
+
+
+class Counter(_Sharded):
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self) -> Dict[tuple, float]:
+        totals = {}
+        for snapshot in self._snapshots():
+            self._merge(totals, snapshot)
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Sharded):
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        shard = self._shard()
+        # Per bucket counts followed by the sum and the count
+        stats = shard.get(key)
+        if stats is None:
+            stats = shard[key] = [0] * (len(self.buckets) + 3)
+        stats[bisect.bisect_left(self.buckets, value)] += 1
+        stats[-2] += value
+        stats[-1] += 1
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the elapsed seconds"""
+        return _Timer(self, labels)
+
+    def _merge(self, into: dict, shard: dict):
+        for key, stats in shard.items():
+            merged = into.setdefault(key, [0] * len(stats))
+            for i, value in enumerate(list(stats)):
+                merged[i] += value
+
+    def collect(self) -> Dict[tuple, list]:
+        totals = {}
+        for snapshot in self._snapshots():
+            self._merge(totals, snapshot)
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, stats in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), stats):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(stats[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {stats[-1]}")
+        return lines
+
+
+class Gauge:
+    """Read from a callback at scrape time, returning a number or a {label values: number} dict"""
+
+    def __init__(self, name: str, help: str, callback: Callable, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        values = value if isinstance(value, dict) else {(): value}
+        for key, number in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(number)}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, callback, labelnames))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+
+def _labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+registry = Registry()
+
+LOG_LINES = registry.counter("streamclips_log_lines_total", "Lines read from child processes", ["stream"])
+LOG_LINES_DROPPED = registry.counter("streamclips_log_lines_dropped_total", "Lines not stored", ["reason"])
+DB_COMMIT_SECONDS = registry.histogram("streamclips_db_commit_seconds", "Latency of background writer commits", ["writer"])
+JOB_SECONDS = registry.histogram("streamclips_scheduler_job_seconds", "Duration of scheduler jobs", ["job"])
+JOB_OUTCOMES = registry.counter("streamclips_scheduler_job_runs_total", "Scheduler job runs by outcome", ["job", "outcome"])
+CLAIMS_ATTEMPTED = registry.counter("streamclips_claims_attempted_total", "Claim statements run")
+CLAIMS_WON = registry.counter("streamclips_claims_won_total", "Streamers claimed by this instance")
+SPAWN_SECONDS = registry.histogram("streamclips_spawn_seconds", "Time to spawn a streamclips process")
+SPAWN_FAILURES = registry.counter("streamclips_spawn_failures_total", "Processes that failed to spawn")
+PROCESS_EXITS = registry.counter("streamclips_process_exits_total", "Stopped processes by reason", ["reason"])
+CHILD_EXITS = registry.counter("streamclips_child_exits_total", "Reaped children by how they ended", ["how"])
+LIVENESS_PROBES = registry.counter("streamclips_liveness_probes_total", "Channel liveness probes by answer", ["result"])
+POOL_CHECKOUTS = registry.counter("streamclips_db_pool_checkouts_total", "Connections checked out of the pool")
+
+
+def instrument_pool(engine):
+    """Count pool checkouts and expose the pool state"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(*args):
+        POOL_CHECKOUTS.inc()
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        registry.gauge("streamclips_db_pool_checked_out", "Connections currently checked out", pool.checkedout)
@@ -0,0 +1,220 @@
+import os
+import selectors
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from app.core.log_coalescer import LineCoalescer
+
+MAX_LINE_BYTES = int(os.getenv("MAX_LINE_BYTES", "65536"))
+READ_CHUNK_BYTES = 65536
+# Threads running the close callbacks, which touch the database and mustn't hold up reading the other pipes
+OUTPUT_CLOSE_WORKERS = int(os.getenv("OUTPUT_CLOSE_WORKERS", "4"))
+
+
+class _Stream:
+    def __init__(self, file, name: str, watch: "_Watch"):
+        self.file = file
+        self.fd = file.fileno()
+        self.name = name
+        self.watch = watch
+        self.buffer = b""
+        self.coalescer = LineCoalescer()
+
+
+class _Watch:
+    def __init__(self, proc: subprocess.Popen, key, on_line: Callable, on_close: Callable):
+        self.proc = proc
+        self.key = key
+        self.on_line = on_line
+        self.on_close = on_close
+        self.open_streams = 0
+
+
+class OutputMultiplexer:
+    """Tails the stdout/stderr pipes of every child process from a single selector thread, close callbacks run on
+    a small pool so the selector thread only does I/O"""
+
+    def __init__(self, close_workers: int = OUTPUT_CLOSE_WORKERS):
+        self.close_workers = close_workers
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = []
+        # Streams with a coalesced record waiting for continuation lines
+        self._open_records = set()
+        self._wakeup_r = self._wakeup_w = None
+
+    def start(self):
+        """Start the selector thread"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._selector = selectors.DefaultSelector()
+            self._wakeup_r, self._wakeup_w = os.pipe()
+            os.set_blocking(self._wakeup_r, False)
+            self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+            self._executor = ThreadPoolExecutor(max_workers=self.close_workers, thread_name_prefix="output-close")
+            self._thread = threading.Thread(target=self._run, name="output-multiplexer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the selector thread, close every watched pipe and wait for the close callbacks already handed off"""
+        self._stop_event.set()
+        self._wakeup()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def watch(self, proc: subprocess.Popen, key, on_line: Callable[[object, str, str], None],
+              on_close: Callable[[object], None]):
+        """Tail proc's pipes, on_line(key, stream_name, record) per coalesced record and on_close(key) once all pipes hit EOF"""
+        self.start()
+        watch = _Watch(proc, key, on_line, on_close)
+        streams = []
+        for stream_name, stream in [("stdout", proc.stdout), ("stderr", proc.stderr)]:
+            if stream is None:
+                continue
+            os.set_blocking(stream.fileno(), False)
+            streams.append(_Stream(stream, stream_name, watch))
+        watch.open_streams = len(streams)
+
+        with self._lock:
+            self._pending.extend(streams)
+        self._wakeup()
+
+    def watched_count(self) -> int:
+        """Number of pipes currently registered"""
+        if not self._selector:
+            return 0
+        return len(self._selector.get_map()) - 1
+
+    def _wakeup(self):
+        if self._wakeup_w is None:
+            return
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                for key, _ in self._selector.select(timeout=self._select_timeout()):
+                    if key.data is None:
+                        self._drain_wakeup()
+                    else:
+                        self._read(key.data)
+                self._flush_due_records()
+        finally:
+            for key in list(self._selector.get_map().values()):
+                if key.data is not None:
+                    self._close(key.data, notify=False)
+            self._selector.close()
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            self._wakeup_r = self._wakeup_w = None
+
+    def _select_timeout(self) -> float:
+        if not self._open_records:
+            return 1.0
+        deadline = min(stream.coalescer.deadline for stream in self._open_records)
+        return min(1.0, max(0.0, deadline - time.monotonic()))
+
+    def _flush_due_records(self):
+        now = time.monotonic()
+        for stream in list(self._open_records):
+            record = stream.coalescer.flush_due(now)
+            if record is not None:
+                self._open_records.discard(stream)
+                self._deliver(stream, record)
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for stream in pending:
+            self._selector.register(stream.fd, selectors.EVENT_READ, stream)
+
+    def _read(self, stream: _Stream):
+        try:
+            data = os.read(stream.fd, READ_CHUNK_BYTES)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+
+        if not data:  # EOF
+            if stream.buffer:
+                self._emit(stream, stream.buffer)
+                stream.buffer = b""
+            self._close(stream)
+            return
+
+        lines = (stream.buffer + data).split(b"\n")
+        stream.buffer = lines.pop()
+        for line in lines:
+            self._emit(stream, line)
+
+        # Don't let a child that never prints a newline grow the buffer forever
+        if len(stream.buffer) >= MAX_LINE_BYTES:
+            self._emit(stream, stream.buffer)
+            stream.buffer = b""
+
+    def _emit(self, stream: _Stream, raw: bytes):
+        # Leading whitespace is kept, the coalescer uses indentation to find continuation lines
+        line = raw.decode("utf-8", errors="replace").rstrip()
+        if not line.strip():
+            return
+        for record in stream.coalescer.feed(line):
+            self._deliver(stream, record)
+        self._open_records.add(stream)
+
+    def _deliver(self, stream: _Stream, record: str):
+        try:
+            stream.watch.on_line(stream.watch.key, stream.name, record)
+        except Exception as e:
+            print(f"Error handling output line: {e}")
+
+    def _close(self, stream: _Stream, notify: bool = True):
+        self._open_records.discard(stream)
+        record = stream.coalescer.flush()
+        if record is not None:
+            self._deliver(stream, record)
+        try:
+            self._selector.unregister(stream.fd)
+        except (KeyError, ValueError):
+            pass
+        try:
+            stream.file.close()
+        except OSError:
+            pass
+
+        watch = stream.watch
+        watch.open_streams -= 1
+        if notify and watch.open_streams == 0:
+            try:
+                self._executor.submit(self._closed, watch)
+            except RuntimeError:
+                pass  # Shutting down
+
+    def _closed(self, watch: _Watch):
+        try:
+            watch.on_close(watch.key)
+        except Exception as e:
+            print(f"Error handling process output close: {e}")
+
+
+multiplexer = OutputMultiplexer()
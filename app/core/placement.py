@@ -0,0 +1,49 @@
+import os
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core import instances
+from app.database import models
+
+# An instance above either limit takes no new streamers
+PLACEMENT_MAX_CPU_PERCENT = float(os.getenv("PLACEMENT_MAX_CPU_PERCENT", "85"))
+PLACEMENT_MAX_MEMORY_PERCENT = float(os.getenv("PLACEMENT_MAX_MEMORY_PERCENT", "90"))
+# The busiest instance waits this long before claiming, the idlest one claims straight away
+PLACEMENT_MAX_DELAY_SECONDS = float(os.getenv("PLACEMENT_MAX_DELAY_SECONDS", "2.0"))
+
+
+def headroom(instance: models.Instance) -> float:
+    """Free fraction of the host, the tighter of CPU and memory, 1 until the instance has reported"""
+    if instance.cpu_percent is None or instance.memory_percent is None:
+        return 1.0
+    return max(0.0, 1.0 - max(instance.cpu_percent, instance.memory_percent) / 100.0)
+
+
+def is_saturated(instance: models.Instance) -> bool:
+    return (instance.cpu_percent or 0) >= PLACEMENT_MAX_CPU_PERCENT or \
+        (instance.memory_percent or 0) >= PLACEMENT_MAX_MEMORY_PERCENT
+
+
+def plan(db: Session, hostname: str) -> Tuple[float, Optional[float]]:
+    """How long this instance should wait before claiming and how much cost it may claim (None is unlimited)"""
+    live = instances.get_live_instances(db)
+    current = next((instance for instance in live if instance.hostname == hostname), None)
+    if current is None:
+        return 0.0, None
+    if is_saturated(current):
+        return 0.0, 0.0
+
+    pending = instances.claimable_cost(db)
+    if pending <= 0:
+        return 0.0, 0.0
+
+    candidates: List[models.Instance] = sorted(
+        (instance for instance in live if not is_saturated(instance)),
+        key=lambda instance: (-headroom(instance), instance.hostname)
+    )
+    rank = candidates.index(current)
+    delay = PLACEMENT_MAX_DELAY_SECONDS * rank / (len(candidates) - 1) if len(candidates) > 1 else 0.0
+
+    # Share the waiting work by headroom, always allowing at least one streamer
+    total_headroom = sum(headroom(instance) for instance in candidates)
+    share = pending * headroom(current) / total_headroom if total_headroom > 0 else pending / len(candidates)
+    return delay, max(share, 1.0)
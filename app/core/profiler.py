@@ -0,0 +1,156 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.01"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+SLOW_TICK_SECONDS = float(os.getenv("SLOW_TICK_SECONDS", "5"))
+SLOW_TICK_HISTORY = int(os.getenv("SLOW_TICK_HISTORY", "50"))
+
+
+def frame_name(code) -> str:
+    """One flamegraph frame, the function and where it is defined"""
+    path = code.co_filename
+    marker = path.rfind("site-packages" + os.sep)
+    if marker >= 0:
+        path = path[marker + len("site-packages") + 1:]
+    elif path.startswith(os.getcwd() + os.sep):
+        path = path[len(os.getcwd()) + 1:]
+    return f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ":")
+
+
+def stack_of(frame, thread_name: str) -> str:
+    """Collapsed stack of a frame, outermost call first and the thread name as the root"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    names.append(thread_name.replace(";", ":").replace(" ", "_"))
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Statistical profiler that periodically snapshots the stacks of all threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float = PROFILE_INTERVAL_SECONDS) -> Optional[Dict[str, int]]:
+        """Sample every thread for a while and count identical stacks, None if a profile is already running"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = min(max(seconds, interval), PROFILE_MAX_SECONDS)
+            own = threading.get_ident()
+            counts: Dict[str, int] = {}
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                frames = sys._current_frames()
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    stack = stack_of(frame, names.get(ident, f"thread-{ident}"))
+                    counts[stack] = counts.get(stack, 0) + 1
+                # Holding on to frames keeps their locals alive
+                frames = frame = None
+                time.sleep(interval)
+            return counts
+        finally:
+            self._lock.release()
+
+
+def collapse(counts: Dict[str, int]) -> str:
+    """Collapsed stack format read by flamegraph.pl, speedscope and friends"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(counts.items()))
+
+
+class SlowTickRecorder:
+    """Watches scheduler job runs and snapshots the stack of any run that is still going past the threshold"""
+
+    def __init__(self, threshold: float = SLOW_TICK_SECONDS, history: int = SLOW_TICK_HISTORY):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._running = {}
+        self._captures = deque(maxlen=history)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def watch(self, name: str):
+        """Mark the calling thread as running a job for the duration of the block"""
+        run = {"name": name, "ident": threading.get_ident(), "started": time.monotonic(), "capture": None}
+        key = object()
+        with self._lock:
+            self._running[key] = run
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - run["started"]
+            with self._lock:
+                self._running.pop(key, None)
+                if run["capture"] is not None:
+                    run["capture"]["seconds"] = round(elapsed, 3)
+                    run["capture"]["finished"] = True
+
+    def captures(self) -> List[dict]:
+        """Recorded slow runs, newest first"""
+        with self._lock:
+            return [dict(capture) for capture in reversed(self._captures)]
+
+    def start(self):
+        """Start the watchdog thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="slow-tick-recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(1)
+            self._thread = None
+
+    def check(self):
+        """Snapshot the runs that just went past the threshold, each run is captured once"""
+        now = time.monotonic()
+        with self._lock:
+            slow = [run for run in self._running.values()
+                    if run["capture"] is None and now - run["started"] >= self.threshold]
+        if not slow:
+            return
+        frames = sys._current_frames()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for run in slow:
+            frame = frames.get(run["ident"])
+            if frame is None:
+                continue
+            capture = {
+                "job": run["name"],
+                "at": datetime.now(tz=timezone.utc).isoformat(),
+                "seconds": round(now - run["started"], 3),
+                "finished": False,
+                "stack": stack_of(frame, names.get(run["ident"], f"thread-{run['ident']}")),
+            }
+            with self._lock:
+                run["capture"] = capture
+                self._captures.append(capture)
+            print(f"Slow {run['name']} run, {capture['seconds']:.1f}s so far")
+
+    def _run(self):
+        # Checking a few times per threshold keeps the snapshot close to the moment it got slow
+        while not self._stop_event.wait(max(self.threshold / 4, 0.05)):
+            self.check()
+
+
+profiler = SamplingProfiler()
+slow_ticks = SlowTickRecorder()
@@ -0,0 +1,76 @@
+import threading
+from typing import Dict, Iterable
+import psutil
+
+
+def sample_host() -> dict:
+    """CPU and memory use of this host in percent, CPU is measured since the previous call"""
+    return {
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory_percent": psutil.virtual_memory().percent,
+    }
+
+
+class ProcessTreeSampler:
+    """Samples the resource use of whole process trees, CPU is measured between consecutive samples of a pid,
+    so every periodic consumer needs its own sampler or it reads the CPU used since another one's sample"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes: Dict[int, psutil.Process] = {}
+
+    def sample(self, pids: Iterable[int]) -> Dict[int, dict]:
+        """Usage of each pid summed over it and all of its descendants, pids that are gone are left out"""
+        with self._lock:
+            samples = {}
+            seen = set()
+            for pid in pids:
+                try:
+                    root = self._process(pid)
+                    tree = [root] + [self._process(child.pid) for child in root.children(recursive=True)]
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+                samples[pid] = self._sum(tree)
+                seen.update(process.pid for process in tree)
+
+            # Forget processes that exited so their cached CPU counters don't leak
+            for pid in set(self._processes) - seen:
+                del self._processes[pid]
+            return samples
+
+    def _process(self, pid: int) -> psutil.Process:
+        process = self._processes.get(pid)
+        if process is None or not process.is_running():
+            process = self._processes[pid] = psutil.Process(pid)
+            process.cpu_percent(interval=None)  # First call only primes the counter
+        return process
+
+    def _sum(self, tree: list) -> dict:
+        usage = {"cpu_percent": 0.0, "rss": 0, "processes": 0, "num_fds": None, "read_bytes": None, "write_bytes": None}
+        for process in tree:
+            try:
+                with process.oneshot():
+                    usage["cpu_percent"] += process.cpu_percent(interval=None)
+                    usage["rss"] += process.memory_info().rss
+                    self._add(usage, "num_fds", _optional(process, "num_fds"))
+                    io = _optional(process, "io_counters")
+                    if io is not None:
+                        self._add(usage, "read_bytes", io.read_bytes)
+                        self._add(usage, "write_bytes", io.write_bytes)
+                usage["processes"] += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return usage
+
+    def _add(self, usage: dict, key: str, value):
+        if value is not None:
+            usage[key] = (usage[key] or 0) + value
+
+
+def _optional(process: psutil.Process, name: str):
+    # Not every platform (or permission level) exposes fds and I/O counters
+    try:
+        return getattr(process, name)()
+    except (AttributeError, NotImplementedError, psutil.AccessDenied):
+        return None
+
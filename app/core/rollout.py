@@ -0,0 +1,142 @@
+import os
+import threading
+from typing import List
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+from app.core import configs, control, stream_clips_processes
+from app.core.control import channel as control_channel
+from app.database import models
+
+# Most processes one instance restarts in a wave, waves start at one process and double up to this
+ROLLING_RESTART_BATCH_SIZE = int(os.getenv("ROLLING_RESTART_BATCH_SIZE", "5"))
+ROLLING_RESTART_INTERVAL_SECONDS = int(os.getenv("ROLLING_RESTART_INTERVAL_SECONDS", "20"))
+
+
+def stale_filter(version: int) -> list:
+    """Running processes started on an older config"""
+    return [
+        models.StreamClipsProcess.pid.isnot(None),
+        or_(models.StreamClipsProcess.config_version.is_(None), models.StreamClipsProcess.config_version < version),
+    ]
+
+
+def progress(db: Session, version: int = None) -> dict:
+    """How far the fleet got with a config version, the latest by default, counted per instance in one query"""
+    if version is None:
+        version = configs.get_stream_config(db).version
+    SCP = models.StreamClipsProcess
+    rows = db.query(
+        models.Instance.hostname,
+        models.Instance.rollout_halted_version,
+        func.count(SCP.pid),
+        func.coalesce(func.sum(case((and_(*stale_filter(version)), 1), else_=0)), 0),
+    ).outerjoin(SCP, SCP.instance_hostname == models.Instance.hostname).group_by(
+        models.Instance.hostname, models.Instance.rollout_halted_version
+    ).all()
+    stale = {hostname: count for hostname, _, _, count in rows if count}
+    return {
+        "version": version,
+        "running": sum(running for _, _, running, _ in rows),
+        "stale": sum(stale.values()),
+        "stale_by_instance": stale,
+        "halted": sorted(hostname for hostname, halted, _, _ in rows if halted == version and hostname in stale),
+    }
+
+
+class RollingRestart:
+    """Brings this instance's processes onto the latest config, live over the control channel where the child
+    acknowledges it and otherwise by restarting them in growing waves, one wave per scheduler run"""
+
+    def __init__(self, batch_size: int = ROLLING_RESTART_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, version):
+        self.version = version
+        self.wave_size = 1
+        self.waves = 0
+        self.applied = 0
+        self.restarted = 0
+        self.failed = 0
+        self.halted = False
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "wave_size": self.wave_size,
+                "waves": self.waves,
+                "applied": self.applied,
+                "restarted": self.restarted,
+                "failed": self.failed,
+                "halted": self.halted,
+            }
+
+    def run_wave(self, db: Session, hostname: str) -> List[models.StreamClipsProcess]:
+        """Push the latest config to stale local processes and restart the next wave of those that can't take it live,
+        returns the replacements that started"""
+        config = configs.get_stream_config(db)
+        version = config.version
+        with self._lock:
+            if version != self.version:
+                self._reset(version)
+            halted = self.halted
+            wave_size = self.wave_size
+
+        stale = db.query(models.StreamClipsProcess).filter(
+            models.StreamClipsProcess.instance_hostname == hostname,
+            *stale_filter(version)
+        ).order_by(models.StreamClipsProcess.created_at).all()
+        if not stale:
+            return []
+
+        message = control.config_message(config)
+        acked = set(control_channel.acked(version))
+        applied = 0
+        candidates = []
+        for process in stale:
+            if process.id in acked:
+                # The child acknowledged the push, it already runs on the new settings
+                process.config_version = version
+                applied += 1
+                continue
+            if not control_channel.pushed(process.id, version):
+                control_channel.push(process.id, message)
+            if not control_channel.awaiting(process.id, version):
+                candidates.append(process)
+        # An ack can land between a push and the check above, those children are applied next wave instead
+        acked = set(control_channel.acked(version))
+        candidates = [process for process in candidates if process.id not in acked]
+        if applied:
+            with self._lock:
+                self.applied += applied
+            print(f"Applied config version {version} live to {applied} processes")
+        if halted or not candidates:
+            db.commit()
+            return []
+
+        # The restart commits the live updates above together with the replacements
+        wave = candidates[:wave_size]
+        started = stream_clips_processes.restart_processes(db, wave)
+        with self._lock:
+            self.waves += 1
+            self.restarted += len(started)
+            self.failed += len(wave) - len(started)
+            if not started:
+                # Nothing came up on the new settings, keep the remaining processes on the old ones
+                self.halted = True
+            else:
+                self.wave_size = min(self.wave_size * 2, self.batch_size)
+        if not started:
+            # Recorded for the admin, which can't see this coordinator, a newer version starts over
+            db.query(models.Instance).filter(models.Instance.hostname == hostname).update(
+                {models.Instance.rollout_halted_version: version}, synchronize_session=False
+            )
+            db.commit()
+        print(f"Restarted {len(started)}/{len(wave)} processes on config version {version}"
+              + (", rollout halted" if not started else ""))
+        return started
+
+
+coordinator = RollingRestart()
@@ -6,14 +6,25 @@ import psutil
 import os
 import signal
 import subprocess
-import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
-from app.core import configs, logs
+from app.core import backoff, configs, events, instances, liveness
+from app.core.control import channel as control_channel, parse_ack
+from app.core.claim_trigger import trigger as claim_trigger, EXIT_RECLAIM_DELAY_SECONDS
+from app.core.heartbeats import aggregator as heartbeats
+from app.core.log_limits import limiter as log_limiter
+from app.core.log_tail import tail as log_tail
+from app.core.log_writer import writer as log_writer
+from app.core.metrics import LOG_LINES, LOG_LINES_DROPPED, PROCESS_EXITS, SPAWN_FAILURES, SPAWN_SECONDS
+from app.core.output_reader import multiplexer
+from app.core.supervisor import ChildExit, describe_exit, supervisor
 from app.database import models
 from app.database.connection import get_db
 
+SPAWN_WORKERS = int(os.getenv("SPAWN_WORKERS", "8"))
+
 
 def get(db: Session, id: str) -> Optional[models.StreamClipsProcess]:
     """Get a process by ID"""
@@ -35,10 +46,7 @@ def delete(db: Session, process_id: str):
     db.delete(process)
     db.commit()
 
-def start_process(db: Session, streamer: models.Streamer, instance_hostname: str):
-    # Get configuration
-    config = configs.get_stream_config(db)
-    
+def build_command(streamer: models.Streamer, config: models.StreamConfig) -> List[str]:
     # Build command with configuration
     cmd = [
         "python", "-u", "streamclips",
@@ -62,57 +70,194 @@ def start_process(db: Session, streamer: models.Streamer, instance_hostname: str
             cmd.extend(["--storage-password", storage_password])
         if storage_path:
             cmd.extend(["--storage-path", storage_path])
-    
-    # Start new process
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1, text=True,
-    start_new_session=True)
-    
-    # Save to database
-    new_process = models.StreamClipsProcess(
-        streamer_id=streamer.id,
-        instance_hostname=instance_hostname,
-        pid=proc.pid
-    )
-    db.add(new_process)
-    db.commit()
-    db.refresh(new_process)
-    monitor_process_output(proc, new_process, streamer)
-    return new_process
+    return cmd
 
-def heartbeat_process(db: Session, db_proc_id: int):
-    process = db.query(models.StreamClipsProcess).filter(
-        models.StreamClipsProcess.id == db_proc_id
-    ).first()
-    if process:
-        process.last_activity = datetime.utcnow()
-        db.commit()
 
-def monitor_process_output(proc: subprocess.Popen, process: models.StreamClipsProcess, streamer: models.Streamer):
-    source_name = streamer.name
-    db_proc_id = process.id
-    for stream_name, stream in [("stdout", proc.stdout), ("stderr", proc.stderr)]:
-        if stream is None:
+def spawn(cmd: List[str]) -> subprocess.Popen:
+    with SPAWN_SECONDS.time():
+        # stdin carries live config updates, see app.core.control
+        return subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0,
+        start_new_session=True)
+
+
+def start_processes(db: Session, processes: List[models.StreamClipsProcess]) -> List[models.StreamClipsProcess]:
+    """Spawn claimed processes concurrently and record all their pids in one transaction"""
+    if not processes:
+        return []
+
+    # Resolve everything the spawns need up front, the pool threads don't touch the session
+    config = configs.get_stream_config(db)
+    commands = [build_command(process.streamer, config) for process in processes]
+    with ThreadPoolExecutor(max_workers=min(SPAWN_WORKERS, len(processes))) as pool:
+        futures = [pool.submit(spawn, cmd) for cmd in commands]
+
+    started, delays = [], []
+    now = datetime.now(tz=timezone.utc)
+    for process, future in zip(processes, futures):
+        streamer = process.streamer
+        key = (process.id, streamer.id, streamer.name)
+        try:
+            proc = future.result()
+        except Exception as e:
+            print(f"Failed to start process for {streamer.name}: {e}")
+            SPAWN_FAILURES.inc()
+            proc = None
+            error = e
+
+        # A savepoint per item, one bad row doesn't take the rest of the batch with it
+        try:
+            with db.begin_nested():
+                if proc is None:
+                    # Give the claim back after the cooldown, a command that can't even start is a crash too,
+                    # or the streamer is retried every round and never quarantined
+                    db.delete(process)
+                    streamer.last_processed_at = now
+                    delays.append(backoff.apply_exit(streamer, f"failed to start: {error}", 0.0, False, now))
+                else:
+                    process.pid = proc.pid
+                    process.config_version = config.version
+                    process.last_activity = now
+        except Exception as e:
+            print(f"Failed to record process for {streamer.name}: {e}")
+            if proc is not None:
+                discard(proc)
             continue
-        def reader(s, name, db_proc_id, source_name):
-            db = next(get_db())
-            try:
-                for line in iter(s.readline, ''):
-                    if not line: #EOF
-                        break
-                    if line.strip():
-                        level = models.LogLevel.INFO if name == "stdout" else models.LogLevel.ERROR
-                        logs.create(db, source=f"streamclips-{source_name}", message=line.strip(), level=level)
-                        heartbeat_process(db, db_proc_id)
-                # cleanup
-                stop_process(db, db_proc_id)
-            except Exception as e:
-                print(f"Error logging output: {e}")
-                db.rollback()
-            finally:
-                db.close()
-        threading.Thread(target=reader, args=(stream,stream_name, db_proc_id, source_name), daemon=True).start()
-
-def kill_process(pid: int):
+        if proc is not None:
+            started.append((process, proc, key))
+
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        for _, proc, _ in started:
+            discard(proc)
+        raise
+
+    for _, proc, key in started:
+        heartbeats.beat(key[0])
+        control_channel.register(key[0], proc)
+        supervisor.track(proc, key, handle_process_exit)
+        monitor_process_output(proc, key)
+    for delay in delays:
+        if delay:
+            claim_trigger.notify(delay=delay)
+    return [process for process, _, _ in started]
+
+
+def restart_processes(db: Session, processes: List[models.StreamClipsProcess]) -> List[models.StreamClipsProcess]:
+    """Replace running processes with fresh ones on the current config, their streamers stay claimed by this instance"""
+    if not processes:
+        return []
+
+    stopped = [(process.id, process.pid) for process in processes]
+    replacements = [
+        models.StreamClipsProcess(streamer_id=process.streamer_id, instance_hostname=process.instance_hostname)
+        for process in processes
+    ]
+    # New rows get new ids, so the exit handler of an old process finds nothing left to clean up
+    for process in processes:
+        db.delete(process)
+    db.flush()
+    db.add_all(replacements)
+    db.commit()
+
+    for process_id, pid in stopped:
+        heartbeats.forget(process_id)
+        control_channel.forget(process_id)
+        try:
+            kill_process(pid)
+        except Exception as e:
+            print(f"Error stopping process {pid}: {e}")
+    PROCESS_EXITS.inc(len(stopped), reason="restarted")
+    return start_processes(db, replacements)
+
+
+def handle_output_line(key: tuple, stream_name: str, line: str):
+    """Route one line of child output to the log and heartbeat pipelines"""
+    db_proc_id, streamer_id, source_name = key
+    source = f"streamclips-{source_name}"
+    level = models.LogLevel.INFO if stream_name == "stdout" else models.LogLevel.ERROR
+    created_at = datetime.now(tz=timezone.utc)
+    LOG_LINES.inc(stream=stream_name)
+    acked_version = parse_ack(line) if stream_name == "stdout" else None
+    if acked_version is not None:
+        control_channel.acknowledge(db_proc_id, acked_version)
+    # Only stdout carries events, errors and warnings always reach the logs
+    event = events.parse(line) if stream_name == "stdout" else None
+    logged = True
+    if event:
+        event_type, value = event
+        if not log_writer.write_event(streamer_id, event_type, value, created_at=created_at):
+            LOG_LINES_DROPPED.inc(reason="queue_full")
+        logged = event_type in events.LOGGED_EVENTS
+        level = events.LOGGED_EVENTS.get(event_type, level)
+    if logged:
+        if not log_limiter.allow(source, level, pressure=log_writer.pressure()):
+            LOG_LINES_DROPPED.inc(reason="rate_limited")
+        elif not log_writer.write(source=source, message=line, level=level, created_at=created_at):
+            LOG_LINES_DROPPED.inc(reason="queue_full")
+    log_tail.publish(source=source, message=line, level=level, created_at=created_at)
+    heartbeats.beat(db_proc_id, created_at)
+
+def handle_process_exit(key: tuple, exit: ChildExit):
+    """Record how a reaped child ended, back off crash-looping streamers and free the slot right away"""
+    db_proc_id, streamer_id, source_name = key
+    reason = describe_exit(exit.returncode)
+    log_writer.write(
+        source=f"streamclips-{source_name}",
+        message=f"Process {reason} after {exit.uptime:.0f}s",
+        level=models.LogLevel.INFO if exit.returncode == 0 or exit.requested else models.LogLevel.WARNING
+    )
+    db = next(get_db())
+    try:
+        delay = backoff.record_exit(db, streamer_id, reason, exit.uptime, exit.requested)
+        if delay:
+            # Try again locally once the backoff is over, the interval claim covers the other instances
+            claim_trigger.notify(delay=delay)
+    except Exception as e:
+        print(f"Error recording exit of {source_name}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+    handle_output_closed(key)
+
+def handle_output_closed(key: tuple):
+    """Clean up once the child exited or closed both of its pipes, whichever is noticed first"""
+    db_proc_id = key[0]
+    db = next(get_db())
+    try:
+        process = get(db, db_proc_id)
+        if process and process.pid and supervisor.running(process.pid):
+            # Closed its pipes but still runs, end it and keep the row until the supervisor reports the exit
+            print(f"Process {process.pid} closed its output, stopping it")
+            supervisor.terminate(process.pid, requested=False)
+            return
+        stop_process(db, db_proc_id, reason="exited")
+    except Exception as e:
+        print(f"Error stopping finished process: {e}")
+        db.rollback()
+    finally:
+        db.close()
+    # The freed slot can go to another streamer now, this one once its cooldown is over
+    claim_trigger.notify()
+    claim_trigger.notify(delay=EXIT_RECLAIM_DELAY_SECONDS)
+
+def monitor_process_output(proc: subprocess.Popen, key: tuple):
+    """Tail the output of a process, key is (process id, streamer id, streamer name)"""
+    multiplexer.watch(proc, key, handle_output_line, handle_output_closed)
+
+def discard(proc: subprocess.Popen):
+    """Kill and reap a child that was never handed to the supervisor"""
+    proc.kill()
+    proc.wait()
+
+def kill_process(pid: Optional[int]):
+    if pid is None:
+        return  # Claimed but never spawned
+    if supervisor.terminate(pid):
+        # Reaped as soon as it exits, SIGKILLed if it takes longer than the grace period
+        print(f"Killed process PID {pid}")
+        return
     try:
         os.kill(pid, signal.SIGTERM)
         print(f"Killed process PID {pid}")
@@ -121,14 +266,18 @@ def kill_process(pid: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to kill process: {e}")
 
-def stop_process(db: Session, id: str):
-    """Stop a process and delete the record"""
+def stop_process(db: Session, id: str, reason: str = "stopped"):
+    """Stop a process and delete the record, reason labels the exit in the metrics"""
     process = get(db, id)
     if not process:
         return
+    PROCESS_EXITS.inc(reason=reason)
     
-    # Kill the process
-    kill_process(process.pid)
+    # Kill the process, one that exited on its own is left alone so the supervisor reports it as a crash
+    if reason != "exited":
+        kill_process(process.pid)
+    heartbeats.forget(process.id)
+    control_channel.forget(process.id)
     
     # Update streamer's last_processed_at timestamp
     if process.streamer:
@@ -143,75 +292,73 @@ def stop_all_processes():
     """Stop all running processes"""
     db = next(get_db())
     try:
-        # Get all processes from database
-        all_processes = list_all(db)
-        
-        for process in all_processes:
-            try:
-                # Kill the process
-                os.kill(process.pid, signal.SIGTERM)
-                print(f"Stopped process PID {process.pid}")
-                
-                # Update streamer's last_processed_at timestamp
-                if process.streamer:
-                    process.streamer.last_processed_at = datetime.now(timezone.utc)
-                    
-            except ProcessLookupError:
-                # Process already dead, still update timestamp
-                if process.streamer:
-                    process.streamer.last_processed_at = datetime.now(timezone.utc)
-                pass
-            except Exception as e:
-                print(f"Error stopping process {process.pid}: {e}")
-        
-        # Clear all process records from database
-        db.query(models.StreamClipsProcess).delete()
+        released = instances.release_processes(db)
         db.commit()
+        PROCESS_EXITS.inc(len(released), reason="stop_all")
+        signal_released(released)
         print("All processes stopped and cleaned up")
-        
     except Exception as e:
         print(f"Error during cleanup: {e}")
         db.rollback()
     finally:
         db.close()
 
+def signal_released(released: List[tuple]):
+    """SIGTERM released processes that run on this host, pids of other instances mean nothing here"""
+    hostname = instances.get_current_hostname()
+    for process_id, pid, instance_hostname in released:
+        heartbeats.forget(process_id)
+        control_channel.forget(process_id)
+        if instance_hostname != hostname:
+            continue
+        try:
+            kill_process(pid)
+        except Exception as e:
+            print(f"Error stopping process {pid}: {e}")
+
 def stop_inactive_instance_processes(db: Session, instance_hostname: str):
     """Stop processes that haven't had any output for 60+ seconds"""
     cutoff_time = datetime.now(tz=timezone.utc) - timedelta(seconds=60)
     
-    # Find inactive processes for this instance
-    inactive_processes = db.query(models.StreamClipsProcess).filter(
-        models.StreamClipsProcess.instance_hostname == instance_hostname,
-        models.StreamClipsProcess.last_activity < cutoff_time
+    processes = db.query(models.StreamClipsProcess).filter(
+        models.StreamClipsProcess.instance_hostname == instance_hostname
     ).all()
 
+    # Local processes report activity to the in-memory aggregator, the row may lag behind it
+    inactive_processes = [
+        process for process in processes
+        if (heartbeats.last_activity(process.id) or process.last_activity or cutoff_time) < cutoff_time
+    ]
+
     for process in inactive_processes:
         print(f"Stopping inactive process {process.pid}")
-        stop_process(db, process.id)
+        stop_process(db, process.id, reason="inactive")
+
+def stop_offline_instance_processes(db: Session, instance_hostname: str) -> int:
+    """Stop processes whose channel the liveness probe recently found offline"""
+    processes = db.query(models.StreamClipsProcess).join(models.StreamClipsProcess.streamer).filter(
+        models.StreamClipsProcess.instance_hostname == instance_hostname,
+        models.Streamer.is_live == False,
+        models.Streamer.live_checked_at >= liveness.fresh_since()
+    ).all()
+
+    for process in processes:
+        print(f"Stopping process {process.pid}, {process.streamer.name} went offline")
+        stop_process(db, process.id, reason="offline")
+    return len(processes)
 
 def stop_instance_processes(instance_hostname: str):
     """Stop all processes for specific instance"""
     db = next(get_db())
     try:
-        processes = db.query(models.StreamClipsProcess).filter(
-            models.StreamClipsProcess.instance_hostname == instance_hostname
-        ).all()
-        
-        for process in processes:
-            try:
-                kill_process(process.pid)
-                
-                # Update streamer's last_processed_at timestamp
-                if process.streamer:
-                    process.streamer.last_processed_at = datetime.now(timezone.utc)
-                
-                db.delete(process)
-                print(f"Stopped process PID {process.pid} from instance {instance_hostname}")
-            except Exception as e:
-                print(f"Error stopping process {process.pid}: {e}")
-        
+        released = instances.release_processes(
+            db, models.StreamClipsProcess.instance_hostname == instance_hostname
+        )
         db.commit()
+        PROCESS_EXITS.inc(len(released), reason="shutdown")
+        signal_released(released)
+        print(f"Stopped {len(released)} processes from instance {instance_hostname}")
     except Exception:
         db.rollback()
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
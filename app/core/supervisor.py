@@ -0,0 +1,224 @@
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple, Optional
+from app.core.metrics import CHILD_EXITS
+
+# How long a child gets to exit after SIGTERM before its whole process group is killed
+KILL_GRACE_SECONDS = float(os.getenv("KILL_GRACE_SECONDS", "10"))
+# Exit checks for children without a pidfd, kernels before 5.3
+POLL_INTERVAL_SECONDS = 1.0
+# Recently reaped pids, a late kill for one of them must not hit whatever process reuses the number
+REAPED_HISTORY = 1024
+
+
+def describe_exit(returncode: int) -> str:
+    """Human readable exit status, negative return codes are the signal that ended the child"""
+    if returncode < 0:
+        try:
+            return f"killed by {signal.Signals(-returncode).name}"
+        except ValueError:
+            return f"killed by signal {-returncode}"
+    return f"exited with code {returncode}"
+
+
+class ChildExit(NamedTuple):
+    returncode: int
+    # Seconds between track() and the exit
+    uptime: float
+    # We asked the child to stop with terminate(), not a crash
+    requested: bool
+
+
+class _Child:
+    def __init__(self, proc: subprocess.Popen, key, on_exit: Callable):
+        self.proc = proc
+        self.key = key
+        self.on_exit = on_exit
+        self.started = time.monotonic()
+        self.pidfd: Optional[int] = None
+        # Set once SIGTERM was sent, SIGKILL follows at this time
+        self.kill_at: Optional[float] = None
+        self.escalated = False
+        # Stopped on purpose by the manager, its exit doesn't count as a failure
+        self.requested = False
+
+
+class ProcessSupervisor:
+    """Reaps every child as soon as it exits, using pidfds on one selector thread, and escalates SIGTERM to SIGKILL"""
+
+    def __init__(self, grace: float = KILL_GRACE_SECONDS):
+        self.grace = grace
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._children = {}
+        self._reaped = OrderedDict()
+        self._pending = []
+        self._wakeup_r = self._wakeup_w = None
+
+    def start(self):
+        """Start the supervisor thread"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._selector = selectors.DefaultSelector()
+            self._wakeup_r, self._wakeup_w = os.pipe()
+            os.set_blocking(self._wakeup_r, False)
+            self._selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+            self._thread = threading.Thread(target=self._run, name="process-supervisor", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the thread once the children that were sent SIGTERM are gone or killed"""
+        self._stop_event.set()
+        self._wakeup()
+        if self._thread:
+            self._thread.join(self.grace + 1 if timeout is None else timeout)
+            self._thread = None
+
+    def track(self, proc: subprocess.Popen, key, on_exit: Callable[[object, ChildExit], None]):
+        """Watch proc, on_exit(key, ChildExit) runs on the supervisor thread right after the child is reaped"""
+        self.start()
+        child = _Child(proc, key, on_exit)
+        try:
+            child.pidfd = os.pidfd_open(proc.pid)
+        except (AttributeError, OSError):
+            child.pidfd = None  # Polled instead
+        with self._lock:
+            self._children[proc.pid] = child
+            self._reaped.pop(proc.pid, None)
+            self._pending.append(child)
+        self._wakeup()
+
+    def terminate(self, pid: int, requested: bool = True) -> bool:
+        """SIGTERM a tracked child and SIGKILL its process group if it outlives the grace period,
+        False if the pid is not one of ours, requested=False still reports the exit as a failure"""
+        with self._lock:
+            if pid in self._reaped:
+                return True  # Already gone
+            child = self._children.get(pid)
+            if child is None:
+                return False
+            child.requested = child.requested or requested
+            if child.kill_at is None:
+                child.kill_at = time.monotonic() + self.grace
+        try:
+            child.proc.send_signal(signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self._wakeup()
+        return True
+
+    def running(self, pid: int) -> bool:
+        """Whether a tracked child is still alive, it may have exited without being reaped yet"""
+        with self._lock:
+            child = self._children.get(pid)
+            return child is not None and child.proc.poll() is None
+
+    def tracked_count(self) -> int:
+        with self._lock:
+            return len(self._children)
+
+    def _wakeup(self):
+        if self._wakeup_w is None:
+            return
+        try:
+            os.write(self._wakeup_w, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def _run(self):
+        try:
+            while not (self._stop_event.is_set() and not self._terminating()):
+                for key, _ in self._selector.select(timeout=self._select_timeout()):
+                    if key.data is None:
+                        self._drain_wakeup()
+                    else:
+                        self._reap(key.data)
+                self._poll_children()
+                self._escalate()
+        finally:
+            for key in list(self._selector.get_map().values()):
+                if key.data is not None:
+                    os.close(key.data.pidfd)
+            self._selector.close()
+            os.close(self._wakeup_r)
+            os.close(self._wakeup_w)
+            self._wakeup_r = self._wakeup_w = None
+
+    def _terminating(self) -> bool:
+        with self._lock:
+            return any(child.kill_at is not None for child in self._children.values())
+
+    def _select_timeout(self) -> float:
+        with self._lock:
+            children = list(self._children.values())
+        timeout = POLL_INTERVAL_SECONDS
+        deadlines = [child.kill_at for child in children if child.kill_at is not None and not child.escalated]
+        if deadlines:
+            timeout = min(timeout, max(0.0, min(deadlines) - time.monotonic()))
+        return timeout
+
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for child in pending:
+            if child.pidfd is not None:
+                self._selector.register(child.pidfd, selectors.EVENT_READ, child)
+
+    def _poll_children(self):
+        with self._lock:
+            polled = [child for child in self._children.values() if child.pidfd is None]
+        for child in polled:
+            if child.proc.poll() is not None:
+                self._reap(child)
+
+    def _escalate(self):
+        now = time.monotonic()
+        with self._lock:
+            due = [child for child in self._children.values()
+                   if child.kill_at is not None and not child.escalated and child.kill_at <= now]
+        for child in due:
+            child.escalated = True
+            print(f"Process {child.proc.pid} ignored SIGTERM for {self.grace:.0f}s, killing it")
+            try:
+                # The child leads its own session, this takes its ffmpeg and other helpers with it
+                os.killpg(child.proc.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                try:
+                    child.proc.kill()
+                except ProcessLookupError:
+                    pass
+
+    def _reap(self, child: _Child):
+        returncode = child.proc.wait()
+        if child.pidfd is not None:
+            self._selector.unregister(child.pidfd)
+            os.close(child.pidfd)
+        with self._lock:
+            self._children.pop(child.proc.pid, None)
+            self._reaped[child.proc.pid] = returncode
+            if len(self._reaped) > REAPED_HISTORY:
+                self._reaped.popitem(last=False)
+        CHILD_EXITS.inc(how="killed" if child.escalated else "signal" if returncode < 0 else
+                        "clean" if returncode == 0 else "error")
+        try:
+            child.on_exit(child.key, ChildExit(returncode, time.monotonic() - child.started, child.requested))
+        except Exception as e:
+            print(f"Error handling exit of process {child.proc.pid}: {e}")
+
+
+supervisor = ProcessSupervisor()
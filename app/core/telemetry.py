@@ -0,0 +1,153 @@
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core import instances
+from app.core.resources import ProcessTreeSampler
+from app.database import models
+
+TELEMETRY_INTERVAL_SECONDS = int(os.getenv("TELEMETRY_INTERVAL_SECONDS", "15"))
+TELEMETRY_ROLLUP_SECONDS = int(os.getenv("TELEMETRY_ROLLUP_SECONDS", "60"))
+TELEMETRY_RAW_RETENTION_HOURS = int(os.getenv("TELEMETRY_RAW_RETENTION_HOURS", "6"))
+TELEMETRY_MINUTE_RETENTION_DAYS = int(os.getenv("TELEMETRY_MINUTE_RETENTION_DAYS", "7"))
+TELEMETRY_HOUR_RETENTION_DAYS = int(os.getenv("TELEMETRY_HOUR_RETENTION_DAYS", "90"))
+
+RAW, MINUTE, HOUR = 0, 60, 3600
+
+# (source resolution, target resolution, how far back every run recomputes the target buckets)
+ROLLUPS = [
+    (RAW, MINUTE, timedelta(minutes=15)),
+    (MINUTE, HOUR, timedelta(hours=3)),
+]
+
+
+def collect(db: Session, hostname: str, now: datetime = None) -> int:
+    """Sample the process tree of every local process and store one raw row per streamer"""
+    now = now or datetime.now(tz=timezone.utc)
+    processes = [process for process in instances.get_instance_processes(db, hostname) if process.pid]
+    usage = sampler.sample(process.pid for process in processes)
+
+    rows = []
+    for process in processes:
+        tree = usage.get(process.pid)
+        if tree is None:
+            continue
+        rows.append({
+            "streamer_id": process.streamer_id,
+            "resolution": RAW,
+            "bucket": now,
+            "instance_hostname": hostname,
+            "samples": 1,
+            "cpu_percent": tree["cpu_percent"],
+            "cpu_percent_max": tree["cpu_percent"],
+            "rss": tree["rss"],
+            "rss_max": tree["rss"],
+            "processes": tree["processes"],
+            "num_fds": tree["num_fds"],
+            "read_bytes": tree["read_bytes"],
+            "write_bytes": tree["write_bytes"],
+        })
+    if rows:
+        _upsert(db, rows)
+    db.commit()
+    return len(rows)
+
+
+def rollup(db: Session, now: datetime = None) -> dict:
+    """Aggregate finished buckets into 1-minute and 1-hour rows and drop data past its retention"""
+    now = now or datetime.now(tz=timezone.utc)
+    written = {}
+    for source, target, lookback in ROLLUPS:
+        start = floor(now - lookback, target)
+        end = floor(now, target)  # Only buckets that are over
+        rows = db.query(models.ProcessSample).filter(
+            models.ProcessSample.resolution == source,
+            models.ProcessSample.bucket >= start,
+            models.ProcessSample.bucket < end,
+        ).order_by(models.ProcessSample.bucket).all()
+
+        groups = {}
+        for row in rows:
+            groups.setdefault((row.streamer_id, floor(row.bucket, target)), []).append(row)
+        aggregated = [aggregate(streamer_id, target, bucket, group) for (streamer_id, bucket), group in groups.items()]
+        if aggregated:
+            _upsert(db, aggregated)
+        written[target] = len(aggregated)
+
+    for resolution, retention in [
+        (RAW, timedelta(hours=TELEMETRY_RAW_RETENTION_HOURS)),
+        (MINUTE, timedelta(days=TELEMETRY_MINUTE_RETENTION_DAYS)),
+        (HOUR, timedelta(days=TELEMETRY_HOUR_RETENTION_DAYS)),
+    ]:
+        db.query(models.ProcessSample).filter(
+            models.ProcessSample.resolution == resolution,
+            models.ProcessSample.bucket < now - retention,
+        ).delete(synchronize_session=False)
+    db.commit()
+    return written
+
+
+def aggregate(streamer_id, resolution: int, bucket: datetime, rows: List[models.ProcessSample]) -> dict:
+    """One row summarising rows of a finer resolution, averages are weighted by their sample counts"""
+    samples = sum(row.samples for row in rows)
+    return {
+        "streamer_id": streamer_id,
+        "resolution": resolution,
+        "bucket": bucket,
+        "instance_hostname": rows[-1].instance_hostname,
+        "samples": samples,
+        "cpu_percent": sum(row.cpu_percent * row.samples for row in rows) / samples,
+        "cpu_percent_max": max(row.cpu_percent_max for row in rows),
+        "rss": int(sum(row.rss * row.samples for row in rows) / samples),
+        "rss_max": max(row.rss_max for row in rows),
+        "processes": max(row.processes for row in rows),
+        "num_fds": _max(row.num_fds for row in rows),
+        "read_bytes": _max(row.read_bytes for row in rows),
+        "write_bytes": _max(row.write_bytes for row in rows),
+    }
+
+
+def resolution_for(hours: int) -> int:
+    """Finest resolution still kept for the whole range"""
+    if hours <= TELEMETRY_RAW_RETENTION_HOURS:
+        return RAW
+    if hours <= TELEMETRY_MINUTE_RETENTION_DAYS * 24:
+        return MINUTE
+    return HOUR
+
+
+def series(db: Session, streamer_id, hours: int) -> Tuple[int, List[models.ProcessSample]]:
+    """Samples of one streamer over the last hours at the finest resolution available for that range"""
+    resolution = resolution_for(hours)
+    since = datetime.now(tz=timezone.utc) - timedelta(hours=hours)
+    rows = db.query(models.ProcessSample).filter(
+        models.ProcessSample.streamer_id == streamer_id,
+        models.ProcessSample.resolution == resolution,
+        models.ProcessSample.bucket >= since,
+    ).order_by(models.ProcessSample.bucket).all()
+    return resolution, rows
+
+
+def floor(moment: datetime, seconds: int) -> datetime:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return datetime.fromtimestamp(moment.timestamp() // seconds * seconds, tz=timezone.utc)
+
+
+def _max(values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _upsert(db: Session, rows: List[dict]):
+    insert = (postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert)(models.ProcessSample)
+    columns = [key for key in rows[0] if key not in ("streamer_id", "resolution", "bucket")]
+    db.execute(insert.on_conflict_do_update(
+        index_elements=["streamer_id", "resolution", "bucket"],
+        set_={column: insert.excluded[column] for column in columns}
+    ), rows)
+
+
+# Separate from the autoscaler's sampler, both would otherwise reset the other's CPU baseline
+sampler = ProcessTreeSampler()
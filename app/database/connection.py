@@ -1,10 +1,12 @@
 from os import getenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.core.metrics import instrument_pool
 
 DATABASE_URL = getenv("DATABASE_URL")
 
 engine = create_engine(DATABASE_URL)
+instrument_pool(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
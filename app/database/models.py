@@ -2,8 +2,9 @@ import enum
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, Enum, String, Boolean, Text, Integer, DateTime, ForeignKey, event, Float, inspect
+from sqlalchemy import BigInteger, CheckConstraint, Column, Enum, String, Boolean, Text, Integer, DateTime, ForeignKey, Index, event, Float, UniqueConstraint, and_, case, func, inspect, literal_column
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 
 
@@ -25,23 +26,50 @@ class Instance(Base):
     max_processes = Column(Integer, nullable=False, default=5)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
     last_heartbeat = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+    # Host resource use published with every heartbeat, used for placement
+    cpu_percent = Column(Float, nullable=True)
+    memory_percent = Column(Float, nullable=True)
+    # With autoscale on, the capacity tuned from measured usage replaces max_processes
+    autoscale = Column(Boolean, nullable=False, default=False)
+    tuned_max_processes = Column(Integer, nullable=True)
+    # Config version whose rolling restart stopped here because nothing came up on it
+    rollout_halted_version = Column(Integer, nullable=True)
     
     # Relationship to StreamClipsProcess
     processes = relationship("StreamClipsProcess", back_populates="instance")
 
+    @hybrid_property
+    def effective_max_processes(self) -> int:
+        if self.autoscale and self.tuned_max_processes is not None:
+            return self.tuned_max_processes
+        return self.max_processes
+
+    @effective_max_processes.expression
+    def effective_max_processes(cls):
+        return case(
+            (and_(cls.autoscale == True, cls.tuned_max_processes.isnot(None)), cls.tuned_max_processes),
+            else_=cls.max_processes
+        )
+
 class StreamClipsProcess(Base):
     __tablename__ = "stream_clips_processes"
 
     __mapper_args__ = {
         "confirm_deleted_rows": False
     }
+    __table_args__ = (
+        UniqueConstraint("streamer_id", name="uq_stream_clips_processes_streamer_id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     streamer_id = Column(UUID(as_uuid=True), ForeignKey("streamers.id"), nullable=False)
     instance_hostname = Column(String, ForeignKey("instances.hostname"), nullable=False)
-    pid = Column(Integer, nullable=False)
-    created_at = Column(DateTime(timezone=True), default=datetime.now(tz=timezone.utc))
-    last_activity = Column(DateTime(timezone=True), default=datetime.now(tz=timezone.utc))
+    # Empty while the claimed process is still being spawned
+    pid = Column(Integer, nullable=True)
+    # StreamConfig.version the process was started with, older ones get a rolling restart
+    config_version = Column(Integer, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
+    last_activity = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
     
     # Relationships
     streamer = relationship("Streamer", back_populates="stream_clips_process")
@@ -49,16 +77,34 @@ class StreamClipsProcess(Base):
 
 class Streamer(Base):
     __tablename__ = "streamers"
+    __table_args__ = (
+        CheckConstraint("cost IS NULL OR cost > 0", name="ck_streamers_cost_positive"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     name = Column(String, nullable=False)
     url = Column(String, nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
     last_processed_at = Column(DateTime(timezone=True), nullable=True)
+    # Relative weight of this streamer's process in capacity units, empty counts as 1
+    cost = Column(Float, nullable=True)
+    # Crash-loop bookkeeping kept by app.core.backoff, next_start_at is checked by the claim query
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    last_exit_reason = Column(String, nullable=True)
+    last_uptime_seconds = Column(Float, nullable=True)
+    next_start_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    quarantined = Column(Boolean, nullable=False, default=False)
+    # Last answer of the liveness probe in app.core.liveness, empty while unknown
+    is_live = Column(Boolean, nullable=True)
+    live_checked_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationship to StreamClipsProcess (one-to-one)
     stream_clips_process = relationship("StreamClipsProcess", back_populates="streamer", uselist=False, cascade="all, delete-orphan")
 
+# Written when a process exits or the channel is probed, they must not stop the running process
+BOOKKEEPING_COLUMNS = {"consecutive_failures", "last_exit_reason", "last_uptime_seconds", "next_start_at", "quarantined",
+                       "is_live", "live_checked_at"}
+
 @event.listens_for(Streamer, "before_update")
 def on_streamer_update(mapper, connection, target: Streamer):
     from app.core import stream_clips_processes
@@ -68,10 +114,10 @@ def on_streamer_update(mapper, connection, target: Streamer):
     # Check if any field other than `last_processed_at` has changed
     dirty_keys = {attr.key for attr in state.attrs if attr.history.has_changes()}
     # Only stop if something other than 'last_processed_at' changed
-    if dirty_keys - {'last_processed_at'} and target.stream_clips_process:
+    if dirty_keys - {'last_processed_at', *BOOKKEEPING_COLUMNS} and target.stream_clips_process:
         db = next(get_db())
         try:
-            stream_clips_processes.stop_process(db, str(target.stream_clips_process.id))
+            stream_clips_processes.stop_process(db, str(target.stream_clips_process.id), reason="streamer_changed")
         except Exception as e:
             print(f"Error stopping process on streamer update: {e}")
             db.rollback()
@@ -86,7 +132,7 @@ def on_streamer_delete(mapper, connection, target: Streamer):
     if target.stream_clips_process:
         db = next(get_db())
         try:
-            stream_clips_processes.stop_process(db, str(target.stream_clips_process.id))
+            stream_clips_processes.stop_process(db, str(target.stream_clips_process.id), reason="streamer_changed")
         except Exception as e:
             print(f"Error stopping process on streamer delete: {e}")
         finally:
@@ -106,28 +152,89 @@ class StreamConfig(Base):
     sample_interval = Column(Integer, nullable=False, default=1)
     baseline_duration = Column(Integer, nullable=False, default=180)
     surge_threshold = Column(Float, nullable=False, default=2.0)
+    # Bumped on every change, running processes started with an older version are restarted in waves
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(tz=timezone.utc))
 
 @event.listens_for(StreamConfig, "before_update")
 def on_stream_config_update(mapper, connection, target: StreamConfig):
-    """Stop all processes when config is updated so they restart with new settings."""
-    from app.core import stream_clips_processes
-    from app.database.connection import get_db
-    
-    db = next(get_db())
-    try:
-        stream_clips_processes.stop_all_processes()
-    except Exception as e:
-        print(f"Error stopping all processes: {e}")
-    finally:
-        db.close()
+    """Bump the version so app.core.rollout restarts processes on the new settings once this commits."""
+    state = inspect(target)
+    dirty_keys = {attr.key for attr in state.attrs if attr.history.has_changes()}
+    if dirty_keys - {"version", "updated_at", "created_at"}:
+        # Incremented in the UPDATE itself, concurrent edits each get their own version
+        target.version = func.coalesce(StreamConfig.version, 1) + 1
+        target.updated_at = datetime.now(tz=timezone.utc)
 
 class Log(Base):
     __tablename__ = "logs"
+    # Daily range partitions are created and dropped by app.core.logs
+    __table_args__ = (
+        Index("ix_logs_source_created_at", "source", "created_at"),
+        Index("ix_logs_level_created_at", "level", "created_at"),
+        Index("ix_logs_created_at", "created_at"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     source = Column(String(100), nullable=False)
     message = Column(Text, nullable=False)
     level = Column(Enum(LogLevel), nullable=False)
-    created_at = Column(DateTime(timezone=True), default= lambda: datetime.now(tz=timezone.utc))
\ No newline at end of file
+    # Part of the primary key because Postgres requires the partition key in it
+    created_at = Column(DateTime(timezone=True), primary_key=True, default= lambda: datetime.now(tz=timezone.utc))
+
+# Full-text search index, app.core.logs.search must build the exact same expression
+LOG_SEARCH_CONFIG = literal_column("'simple'::regconfig")
+Index(
+    "ix_logs_message_tsv",
+    func.to_tsvector(LOG_SEARCH_CONFIG, Log.message),
+    postgresql_using="gin"
+).ddl_if(dialect="postgresql")
+
+class StreamEventType(str, enum.Enum):
+    CLIP_CREATED = "CLIP_CREATED"
+    SURGE_DETECTED = "SURGE_DETECTED"
+    UPLOAD_FINISHED = "UPLOAD_FINISHED"
+    UPLOAD_FAILED = "UPLOAD_FAILED"
+
+class StreamEvent(Base):
+    """Operational events parsed out of streamclips output, see app.core.events"""
+    __tablename__ = "stream_events"
+    __table_args__ = (
+        Index("ix_stream_events_streamer_id_created_at", "streamer_id", "created_at"),
+        Index("ix_stream_events_event_type_created_at", "event_type", "created_at"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    streamer_id = Column(UUID(as_uuid=True), ForeignKey("streamers.id", ondelete="CASCADE"), nullable=False)
+    event_type = Column(Enum(StreamEventType), nullable=False)
+    value = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(tz=timezone.utc))
+
+    streamer = relationship("Streamer")
+
+class ProcessSample(Base):
+    """Resource use of a streamer's process tree, raw samples and rolled up buckets share the table"""
+    __tablename__ = "process_samples"
+    __table_args__ = (
+        Index("ix_process_samples_resolution_bucket", "resolution", "bucket"),
+    )
+
+    streamer_id = Column(UUID(as_uuid=True), ForeignKey("streamers.id", ondelete="CASCADE"), primary_key=True)
+    # Seconds covered by one row, 0 for raw samples
+    resolution = Column(Integer, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    instance_hostname = Column(String, nullable=False)
+    samples = Column(Integer, nullable=False, default=1)
+    cpu_percent = Column(Float, nullable=False)
+    cpu_percent_max = Column(Float, nullable=False)
+    rss = Column(BigInteger, nullable=False)
+    rss_max = Column(BigInteger, nullable=False)
+    processes = Column(Integer, nullable=False)
+    num_fds = Column(Integer, nullable=True)
+    # Cumulative counters of the tree, rollups keep the latest value
+    read_bytes = Column(BigInteger, nullable=True)
+    write_bytes = Column(BigInteger, nullable=True)
+
+    streamer = relationship("Streamer")
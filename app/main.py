@@ -3,6 +3,9 @@ import dotenv
 dotenv.load_dotenv(override=True)
 
 from app.core import configs, instances, stream_clips_processes
+from app.core.log_writer import writer as log_writer
+from app.core.output_reader import multiplexer
+from app.core.supervisor import supervisor
 
 from contextlib import asynccontextmanager
 from app.core.users import create_admin_user
@@ -20,10 +23,15 @@ async def lifespan(app: FastAPI):
     configs.init()
     instances.register_instance()
     create_admin_user()
+    log_writer.start()
+    multiplexer.start()
     start_scheduler()
     yield
     stop_scheduler()
     stream_clips_processes.stop_instance_processes(instances.get_current_hostname())
+    supervisor.stop()
+    multiplexer.stop()
+    log_writer.stop()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -40,5 +48,8 @@ app.add_middleware(
 app.include_router(router=routers.auth_router)
 app.include_router(router=routers.streamer_router)
 app.include_router(router=routers.stream_clips_router)
+app.include_router(router=routers.logs_router)
+app.include_router(router=routers.metrics_router)
+app.include_router(router=routers.debug_router)
 
 admin.init(app)
\ No newline at end of file
@@ -1,16 +1,26 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
 from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import UUID4
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
-from app.core import auth, logs, streamers, stream_clips_processes
+from app.database import models
+from app.core import auth, events, logs, streamers, stream_clips_processes
+from app.core.log_tail import tail as log_tail
+from app.core.metrics import registry as metrics_registry
+from app.core.profiler import collapse, profiler, slow_ticks
 import app.schemas as schemas
 
 auth_router = APIRouter(prefix="/auth")
 streamer_router = APIRouter(prefix="/streamers", dependencies=[Depends(auth.get_current_user)])
 stream_clips_router = APIRouter(prefix="/stream-clips-processes", dependencies=[Depends(auth.get_current_user)])
 logs_router = APIRouter(prefix="/logs", dependencies=[Depends(auth.get_current_user)])
+metrics_router = APIRouter()
+debug_router = APIRouter(prefix="/debug", dependencies=[Depends(auth.get_current_admin)])
 
 @auth_router.post("/login", response_model=schemas.Token)
 def login(
@@ -54,6 +64,15 @@ def get_streamer(
 ):
     return streamers.get(db, id)
 
+@streamer_router.get("/{id}/stats", response_model=list[schemas.StreamEventStat])
+def get_streamer_stats(
+    id: UUID4,
+    hours: int = Query(24, ge=1, le=24 * 90),
+    db: Session = Depends(get_db)
+):
+    since = datetime.now(tz=timezone.utc) - timedelta(hours=hours)
+    return events.stats(db, id, since)
+
 # Stream Clips Process Routes
 @stream_clips_router.get("/", response_model=list[schemas.StreamClipsProcess])
 def list_stream_clips_processes(
@@ -76,12 +95,71 @@ def stop_stream_clips_process(
 ):
     stream_clips_processes.stop_process(db, id)
 
-@logs_router.get("/")
+@logs_router.get("/", response_model=schemas.LogPage)
 def get_logs(
     source: Optional[str] = Query(None),
-    level: Optional[str] = Query(None),
-    offset: int = 0,
-    limit: int = 100
+    level: Optional[models.LogLevel] = Query(None),
+    after: Optional[str] = Query(None, description="Cursor returned as `next` by the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    items, next_cursor = logs.list(db, source=source, level=level, after=after, limit=limit)
+    return {"items": items, "next": next_cursor}
+
+@logs_router.get("/search", response_model=list[schemas.LogSearchResult])
+def search_logs(
+    q: str = Query(..., min_length=1),
+    source: Optional[str] = Query(None, description="Exact source, or a prefix ending in * such as streamclips-*"),
+    level: Optional[models.LogLevel] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    results = logs.search(db, q, source=source, level=level, since=since, until=until, limit=limit)
+    return [{**schemas.Log.model_validate(log, from_attributes=True).model_dump(), "rank": rank} for log, rank in results]
+
+@logs_router.get("/tail")
+async def tail_logs(
+    request: Request,
+    source: Optional[str] = Query(None, description="Source to follow, all sources when omitted")
+):
+    """Server-Sent Events stream of live output, starting with the buffered backlog"""
+    subscription = log_tail.subscribe(source)
+
+    async def events():
+        try:
+            for record in subscription.backlog:
+                yield f"data: {json.dumps(record)}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    record = await asyncio.wait_for(subscription.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(record)}\n\n"
+        finally:
+            log_tail.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@debug_router.get("/profile", response_class=PlainTextResponse)
+def profile(
+    seconds: float = Query(10.0, gt=0, le=60),
+    interval: float = Query(0.01, ge=0.001, le=1.0)
 ):
-    return logs.list(source=source, level=level, offset=offset, limit=limit)
+    """Sample the stacks of all threads, returns collapsed stacks for flamegraph tools"""
+    counts = profiler.profile(seconds, interval)
+    if counts is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return PlainTextResponse(collapse(counts))
 
+@debug_router.get("/slow-ticks")
+def get_slow_ticks():
+    """Stacks of the latest scheduler job runs that went past the slow threshold"""
+    return slow_ticks.captures()
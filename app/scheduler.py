@@ -1,74 +1,378 @@
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime
 import os
-import signal
-import subprocess
+import threading
+import time
+from typing import Callable
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from app.core import stream_clips_processes, instances
+from app.core import autoscale, stream_clips_processes, instances, liveness, logs, placement, rollout, telemetry
+from app.core.claim_trigger import trigger as claim_trigger, listener as claim_listener
+from app.core.heartbeats import aggregator as heartbeats, HEARTBEAT_FLUSH_SECONDS
+from app.core.leader import election
+from app.core.log_limits import limiter as log_limiter, LOG_SUPPRESSION_SUMMARY_SECONDS
+from app.core.log_writer import writer as log_writer
+from app.core.metrics import JOB_OUTCOMES, JOB_SECONDS
+from app.core.profiler import slow_ticks
 from app.database.connection import get_db
 from app.database import models
 
+INSTANCE_HEARTBEAT_SECONDS = int(os.getenv("INSTANCE_HEARTBEAT_SECONDS", "30"))
+INACTIVITY_CHECK_SECONDS = int(os.getenv("INACTIVITY_CHECK_SECONDS", "30"))
+CLAIM_INTERVAL_SECONDS = int(os.getenv("CLAIM_INTERVAL_SECONDS", "60"))
+DEAD_INSTANCE_CHECK_SECONDS = int(os.getenv("DEAD_INSTANCE_CHECK_SECONDS", "60"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "30"))
 
 scheduler = AsyncIOScheduler()
 
-async def process_active_streamers():
-    """Start processes for active streamers on this instance"""
+# One lock per job body, a run that outlived its timeout keeps the next one from overlapping it
+_job_locks = {}
+
+
+async def run_job(name: str, func: Callable[[], None], timeout: float = JOB_TIMEOUT_SECONDS) -> bool:
+    """Run a blocking job body in a worker thread so one slow job can't hold up the others"""
+    lock = _job_locks.setdefault(name, threading.Lock())
+    if not lock.acquire(blocking=False):
+        print(f"Skipping {name}, previous run still in progress")
+        JOB_OUTCOMES.inc(job=name, outcome="skipped")
+        return False
+
+    def body():
+        # Timed in the worker so a run that outlives its timeout is still measured in full
+        try:
+            with JOB_SECONDS.time(job=name), slow_ticks.watch(name):
+                func()
+        finally:
+            lock.release()
+
+    outcome = "ok"
+    try:
+        await asyncio.wait_for(asyncio.to_thread(body), timeout)
+    except asyncio.TimeoutError:
+        print(f"Job {name} timed out after {timeout:.0f}s")
+        outcome = "timeout"
+    except Exception as e:
+        print(f"Error in {name}: {e}")
+        outcome = "error"
+    JOB_OUTCOMES.inc(job=name, outcome=outcome)
+    return True
+
+
+def _update_instance_heartbeat():
     db = next(get_db())
     try:
-        hostname = instances.get_current_hostname()
-        
-        # Register/update instance and heartbeat
-        instances.update_heartbeat(db, hostname)
-        
-        # Clean up dead instances
-        dead_instances = instances.get_dead_instances(db)
-        for dead_instance in dead_instances:
+        instances.update_heartbeat(db, instances.get_current_hostname())
+    except Exception as e:
+        print(f"Error updating instance heartbeat: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _reap_dead_instances():
+    if not election.is_leader():
+        return
+    db = next(get_db())
+    try:
+        for dead_instance in instances.get_dead_instances(db):
             cleaned_count = instances.cleanup_dead_instance_processes(db, dead_instance.hostname)
             if cleaned_count > 0:
                 print(f"Cleaned up {cleaned_count} processes from dead instance {dead_instance.hostname}")
+    except Exception as e:
+        print(f"Error reaping dead instances: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _stop_inactive_processes():
+    db = next(get_db())
+    try:
+        stream_clips_processes.stop_inactive_instance_processes(db, instances.get_current_hostname())
+    except Exception as e:
+        print(f"Error stopping inactive processes: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
 
-        # Stop inactive processes
-        stream_clips_processes.stop_inactive_instance_processes(db, hostname)
-        
-        # Check capacity for this instance
-        available_capacity = instances.get_available_capacity(db, hostname)
-        if available_capacity <= 0:
-            print(f"Instance {hostname} at capacity")
+def _claim_streamers():
+    db = next(get_db())
+    try:
+        hostname = instances.get_current_hostname()
+
+        # Least loaded instances claim first and each takes its share of the waiting streamers
+        delay, budget = placement.plan(db, hostname)
+        db.commit()
+        if budget is not None and budget <= 0:
             return
-        
-        # Claim available streamers with locking
-        claimed_streamers = instances.claim_available_streamers(db, hostname, available_capacity)
-        
+        if delay:
+            time.sleep(delay)
+
+        # Reserve streamers up to this instance's capacity in one statement
+        claimed = instances.claim_streamers(db, hostname, max_cost=budget)
+        if not claimed:
+            return
+
         # Start processes for claimed streamers
-        for streamer in claimed_streamers:
-            try:
-                proc = stream_clips_processes.start_process(db=db, streamer=streamer, instance_hostname=hostname)
-                print(f"Started process for {streamer.name} on {hostname} (PID: {proc.pid})")
-            except Exception as e:
-                print(f"Failed to start process for {streamer.name}: {e}")
-                db.rollback()
-                
+        started = stream_clips_processes.start_processes(db, claimed)
+        print(f"Started {len(started)}/{len(claimed)} claimed processes on {hostname}")
+    except Exception as e:
+        print(f"Error claiming streamers: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _restart_stale_processes():
+    db = next(get_db())
+    try:
+        rollout.coordinator.run_wave(db, instances.get_current_hostname())
+    except Exception as e:
+        print(f"Error restarting processes on the new config: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _check_liveness():
+    db = next(get_db())
+    try:
+        if election.is_leader():
+            went_live, went_offline = liveness.refresh(db, liveness.prober)
+            if went_live or went_offline:
+                print(f"Channels went live: {went_live}, offline: {went_offline}")
+        stream_clips_processes.stop_offline_instance_processes(db, instances.get_current_hostname())
+    except Exception as e:
+        print(f"Error checking channel liveness: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _tune_capacity():
+    db = next(get_db())
+    try:
+        autoscale.tune(db, instances.get_current_hostname())
+    except Exception as e:
+        print(f"Error tuning instance capacity: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _collect_telemetry():
+    db = next(get_db())
+    try:
+        telemetry.collect(db, instances.get_current_hostname())
+    except Exception as e:
+        print(f"Error collecting process telemetry: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _rollup_telemetry():
+    if not election.is_leader():
+        return
+    db = next(get_db())
+    try:
+        telemetry.rollup(db)
+    except Exception as e:
+        print(f"Error rolling up process telemetry: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _flush_process_heartbeats():
+    db = next(get_db())
+    try:
+        heartbeats.flush(db)
+    except Exception as e:
+        print(f"Error flushing process heartbeats: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _maintain_log_partitions():
+    if not election.is_leader():
+        return
+    db = next(get_db())
+    try:
+        created, dropped = logs.maintain_partitions(db)
+        if created or dropped:
+            print(f"Log partitions created: {created}, dropped: {dropped}")
     except Exception as e:
-        print(f"Error in scheduler: {e}")
-        db.rollback()   
+        print(f"Error maintaining log partitions: {e}")
+        db.rollback()
     finally:
         db.close()
 
 
+async def update_instance_heartbeat():
+    """Tell the cluster this instance is alive"""
+    await run_job("update_instance_heartbeat", _update_instance_heartbeat)
+
+
+async def reap_dead_instances():
+    """Leader only, free the streamers of instances that stopped heartbeating"""
+    await run_job("reap_dead_instances", _reap_dead_instances)
+
+
+async def stop_inactive_processes():
+    """Stop local processes that went quiet"""
+    await run_job("stop_inactive_processes", _stop_inactive_processes)
+
+
+async def claim_streamers():
+    """Claim streamers up to this instance's capacity and start their processes"""
+    if not await run_job("claim_streamers", _claim_streamers):
+        # Another round is still running and may have missed the change that woke us
+        claim_trigger.notify(delay=1.0)
+
+
+async def restart_stale_processes():
+    """Restart the next wave of local processes still running on an older config"""
+    await run_job("restart_stale_processes", _restart_stale_processes, timeout=120)
+
+
+async def check_liveness():
+    """Probe which channels are live (leader only) and stop local processes of channels that went offline"""
+    await run_job("check_liveness", _check_liveness, timeout=120)
+
+
+async def tune_capacity():
+    """Adjust this instance's capacity to measured usage when autoscaling is on"""
+    await run_job("tune_capacity", _tune_capacity)
+
+
+async def collect_telemetry():
+    """Sample the resource use of every local process tree"""
+    await run_job("collect_telemetry", _collect_telemetry)
+
+
+async def rollup_telemetry():
+    """Leader only, roll telemetry up into minute and hour buckets and expire old samples"""
+    await run_job("rollup_telemetry", _rollup_telemetry)
+
+
+async def flush_process_heartbeats():
+    """Write buffered process activity timestamps in one statement"""
+    await run_job("flush_process_heartbeats", _flush_process_heartbeats)
+
+
+async def maintain_log_partitions():
+    """Leader only, create upcoming log partitions and drop the ones past retention"""
+    await run_job("maintain_log_partitions", _maintain_log_partitions, timeout=300)
+
+
+async def summarise_suppressed_logs():
+    """Replace rate-limited output with one summary line per source"""
+    for source, count, window in log_limiter.summaries():
+        log_writer.write(
+            source=source,
+            message=f"suppressed {count:,} lines in last {window:.0f}s",
+            level=models.LogLevel.WARNING
+        )
+
+
 def start_scheduler():
     """Start the scheduler"""
+    global scheduler
+    # A fresh scheduler binds to the loop that is running now
+    scheduler = AsyncIOScheduler()
+    scheduler.add_job(
+        update_instance_heartbeat,
+        trigger='interval',
+        seconds=INSTANCE_HEARTBEAT_SECONDS,
+        id='update_instance_heartbeat',
+        next_run_time=datetime.now()
+    )
+    scheduler.add_job(
+        reap_dead_instances,
+        trigger='interval',
+        seconds=DEAD_INSTANCE_CHECK_SECONDS,
+        id='reap_dead_instances',
+        next_run_time=datetime.now()
+    )
     scheduler.add_job(
-        process_active_streamers,
+        stop_inactive_processes,
         trigger='interval',
-        minutes=1,
-        id='process_active_streamers',
+        seconds=INACTIVITY_CHECK_SECONDS,
+        id='stop_inactive_processes'
+    )
+    scheduler.add_job(
+        claim_streamers,
+        trigger='interval',
+        seconds=CLAIM_INTERVAL_SECONDS,
+        id='claim_streamers',
         next_run_time=datetime.now()
     )
+    scheduler.add_job(
+        restart_stale_processes,
+        trigger='interval',
+        seconds=rollout.ROLLING_RESTART_INTERVAL_SECONDS,
+        id='restart_stale_processes'
+    )
+    if liveness.LIVENESS_PROBE_ENABLED:
+        scheduler.add_job(
+            check_liveness,
+            trigger='interval',
+            seconds=liveness.LIVENESS_PROBE_INTERVAL_SECONDS,
+            id='check_liveness',
+            next_run_time=datetime.now()
+        )
+    scheduler.add_job(
+        tune_capacity,
+        trigger='interval',
+        seconds=autoscale.AUTOSCALE_INTERVAL_SECONDS,
+        id='tune_capacity'
+    )
+    scheduler.add_job(
+        collect_telemetry,
+        trigger='interval',
+        seconds=telemetry.TELEMETRY_INTERVAL_SECONDS,
+        id='collect_telemetry'
+    )
+    scheduler.add_job(
+        rollup_telemetry,
+        trigger='interval',
+        seconds=telemetry.TELEMETRY_ROLLUP_SECONDS,
+        id='rollup_telemetry'
+    )
+    scheduler.add_job(
+        flush_process_heartbeats,
+        trigger='interval',
+        seconds=HEARTBEAT_FLUSH_SECONDS,
+        id='flush_process_heartbeats'
+    )
+    scheduler.add_job(
+        maintain_log_partitions,
+        trigger='interval',
+        hours=1,
+        id='maintain_log_partitions',
+        next_run_time=datetime.now()
+    )
+    scheduler.add_job(
+        summarise_suppressed_logs,
+        trigger='interval',
+        seconds=LOG_SUPPRESSION_SUMMARY_SECONDS,
+        id='summarise_suppressed_logs'
+    )
     scheduler.start()
+    # Streamer and process changes wake the claim loop right away, the interval job is the safety net
+    claim_trigger.start(claim_streamers)
+    claim_listener.start()
+    slow_ticks.start()
     print("Scheduler started")
 
 
 def stop_scheduler():
     """Stop the scheduler"""
+    slow_ticks.stop()
+    claim_listener.stop()
+    claim_trigger.stop()
     scheduler.shutdown()
-    print("Scheduler stopped")
\ No newline at end of file
+    election.resign()
+    print("Scheduler stopped")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, UUID4
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 class UserLogin(BaseModel):
     username: str
@@ -24,5 +24,26 @@ class Streamer(BaseModel):
 class StreamClipsProcess(BaseModel):
     id: UUID4
     streamer_id: UUID4
-    pid: int
-    created_at: datetime
\ No newline at end of file
+    pid: Optional[int]
+    created_at: datetime
+
+class Log(BaseModel):
+    id: UUID4
+    source: str
+    message: str
+    level: str
+    created_at: datetime
+
+class LogPage(BaseModel):
+    items: List[Log]
+    next: Optional[str] = None
+
+class LogSearchResult(Log):
+    rank: float
+
+class StreamEventStat(BaseModel):
+    event_type: str
+    count: int
+    total: Optional[float] = None
+    max: Optional[float] = None
+    last_at: Optional[datetime] = None
\ No newline at end of file
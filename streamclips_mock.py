@@ -1,20 +1,48 @@
+import json
 import sys
+import threading
 from time import sleep
 from datetime import datetime
 
+config = {}
+config_version = None
+output_lock = threading.Lock()
+
+
+def emit(line: str):
+    """Write one whole line, the control thread and the main loop must not interleave"""
+    with output_lock:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def read_control():
+    """Apply config pushed by the manager as JSON lines on stdin and acknowledge each version"""
+    global config_version
+    for line in sys.stdin:
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if message.get("type") == "config":
+            config.update(message.get("config", {}))
+            config_version = message["version"]
+            emit(json.dumps({"type": "config_ack", "version": config_version}))
+
 
 def main():
     if len(sys.argv) != 2:
         print("Usage: python streamclips_mock.py <streamer_id>")
         sys.exit(1)
-    
+
     streamer_id = sys.argv[1]
-    print(f"Starting stream clips process for streamer {streamer_id}")
-    
+    emit(f"Starting stream clips process for streamer {streamer_id}")
+    threading.Thread(target=read_control, daemon=True).start()
+
     while True:
-        print(f"Processing clips for streamer {streamer_id} at {datetime.now()}")
+        emit(f"Processing clips for streamer {streamer_id} at {datetime.now()} (config version {config_version})")
         sleep(1)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -3,7 +3,12 @@ import dotenv
 dotenv.load_dotenv(override=True)
 
 import os
-from sqlalchemy import StaticPool, create_engine
+import uuid
+
+# The app's scheduler must not probe the real Kick and Twitch APIs, the liveness tests run their own server
+os.environ.setdefault("LIVENESS_PROBE_ENABLED", "false")
+
+from sqlalchemy import StaticPool, create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from app.database.connection import Base
@@ -33,6 +38,42 @@ def setup_test_database():
     Base.metadata.drop_all(bind=engine)
     connection.SessionLocal = None
 
+# Postgres-only behaviour (row locks, SKIP LOCKED, LIMIT checks) is tested there, the tests skip without it
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+@pytest.fixture
+def pg_engine():
+    """Engine on a throwaway schema of the TEST_POSTGRES_URL database"""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(TEST_POSTGRES_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    engine = create_engine(TEST_POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    try:
+        Base.metadata.create_all(bind=engine)
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA "{schema}" CASCADE'))
+        admin.dispose()
+
+@pytest.fixture
+def sqlite_engine(tmp_path):
+    """Engine on a fresh SQLite file, unlike the shared in-memory one it can be used from other threads"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(sqlite_engine):
+    session = sessionmaker(bind=sqlite_engine)()
+    yield session
+    session.close()
+
 @pytest.fixture(scope="module")
 def client():
     with TestClient(app) as c:
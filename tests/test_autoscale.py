@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import time
+import psutil
+import pytest
+from app.core import autoscale, instances
+from app.core.autoscale import CapacityTuner
+from app.core.resources import ProcessTreeSampler
+from app.database import models
+
+GIB = 1024 ** 3
+
+
+def children(count, cpu_percent, rss):
+    return [{"cpu_percent": cpu_percent, "rss": rss, "processes": 2}] * count
+
+
+def test_estimate_uses_the_tighter_of_cpu_and_memory():
+    tuner = CapacityTuner(target_cpu=80, target_memory=80)
+    # 4 children at 50% of one core on 8 cores (6.25% of the host each), 1 GiB each of 16 GiB
+    estimate = tuner.estimate(host_cpu=35, host_memory=40, cpu_count=8, total_memory=16 * GIB,
+                              children=children(4, 50, GIB))
+    # CPU allows (80 - 10) / 6.25 = 11.2, memory (80 - 15) / 6.25 = 10.4
+    assert estimate == pytest.approx(10.4)
+    assert tuner.estimate(host_cpu=35, host_memory=40, cpu_count=8, total_memory=16 * GIB, children=[]) is None
+    # The same children worth 8 cost units leave room for twice as many units
+    assert tuner.estimate(host_cpu=35, host_memory=40, cpu_count=8, total_memory=16 * GIB,
+                          children=children(4, 50, GIB), units=8) == pytest.approx(20.8)
+    # Children reading no CPU weren't measured, memory alone would size the host past its CPU target
+    assert tuner.estimate(host_cpu=35, host_memory=40, cpu_count=8, total_memory=16 * GIB,
+                          children=children(4, 0, GIB)) is None
+
+
+def test_capacity_moves_with_hysteresis():
+    tuner = CapacityTuner(min_processes=2, max_processes=40, hysteresis=2, max_step_up=3, smoothing=1.0)
+    assert tuner.update(10, 11.5) == 10  # Inside the band, no flapping
+    assert tuner.update(10, 30) == 13  # Grows a few processes at a time
+    assert tuner.update(13, 6) == 6  # Shrinks at once
+    assert tuner.update(6, 0) == 2  # Never below the configured bounds
+    assert tuner.update(6, None) == 6
+
+
+def test_claims_use_the_tuned_capacity(db):
+    db.add(models.Instance(hostname="node", max_processes=1, autoscale=True, tuned_max_processes=3))
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(5))
+    db.commit()
+
+    assert len(instances.claim_streamers(db, "node")) == 3
+    assert instances.get_available_capacity(db, "node") == 0
+
+
+def test_tuning_counts_cost_units_and_never_drops_below_the_load(db, monkeypatch):
+    db.add(models.Instance(hostname="node", max_processes=10, autoscale=True, cpu_percent=90, memory_percent=20))
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}", cost=2.0) for i in range(3))
+    db.commit()
+    claimed = instances.claim_streamers(db, "node")
+    for pid, process in enumerate(claimed, start=100):
+        process.pid = pid
+    db.commit()
+
+    # The host is over its CPU target, the estimate alone would shrink capacity to 4 units below the load of 6
+    monkeypatch.setattr(autoscale, "tuner", CapacityTuner(max_processes=40, smoothing=1.0))
+    monkeypatch.setattr(autoscale.sampler, "sample",
+                        lambda pids: {pid: {"cpu_percent": 120, "rss": GIB, "processes": 1} for pid in pids})
+    monkeypatch.setattr(autoscale.psutil, "cpu_count", lambda: 8)
+    assert autoscale.tune(db, "node") == 6
+    assert instances.get_available_capacity(db, "node") == 0
+    assert instances.claim_streamers(db, "node") == []
+
+
+def test_sampler_sums_the_process_tree():
+    child = "import subprocess, sys, time; subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(5)']); time.sleep(5)"
+    proc = subprocess.Popen([sys.executable, "-c", child])
+    try:
+        sampler = ProcessTreeSampler()
+        for _ in range(50):
+            usage = sampler.sample([proc.pid, 999999999])
+            if usage[proc.pid]["processes"] == 2:
+                break
+            time.sleep(0.1)
+        assert list(usage) == [proc.pid]
+        assert usage[proc.pid]["processes"] == 2 and usage[proc.pid]["rss"] > 0
+    finally:
+        for grandchild in psutil.Process(proc.pid).children(recursive=True):
+            grandchild.kill()
+        proc.kill()
+        proc.wait()
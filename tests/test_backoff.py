@@ -0,0 +1,116 @@
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import sessionmaker
+from app.core import backoff, instances, stream_clips_processes
+from app.database import models
+from app.database import connection
+
+
+def test_delay_grows_exponentially_within_bounds():
+    rng = random.Random(1)
+    for failures in range(1, 12):
+        ceiling = min(backoff.RESTART_BACKOFF_BASE_SECONDS * 2 ** (failures - 1), backoff.RESTART_BACKOFF_MAX_SECONDS)
+        for _ in range(20):
+            delay = backoff.backoff_delay(failures, rng)
+            assert ceiling / 2 <= delay <= ceiling
+
+
+def test_quick_failures_back_off_and_quarantine_and_healthy_runs_reset(db, monkeypatch):
+    monkeypatch.setattr(backoff, "RESTART_QUARANTINE_FAILURES", 3)
+    streamer = models.Streamer(name="flaky", url="https://kick.com/flaky")
+    db.add(streamer)
+    db.commit()
+
+    assert backoff.record_exit(db, streamer.id, "exited with code 1", 2.0, requested=False)
+    assert streamer.consecutive_failures == 1 and streamer.next_start_at and not streamer.quarantined
+    # Our own stops are not crashes
+    assert backoff.record_exit(db, streamer.id, "killed by SIGTERM", 2.0, requested=True) is None
+    assert streamer.consecutive_failures == 1
+
+    backoff.record_exit(db, streamer.id, "exited with code 1", 2.0, requested=False)
+    backoff.record_exit(db, streamer.id, "exited with code 1", 2.0, requested=False)
+    assert streamer.consecutive_failures == 3 and streamer.quarantined
+
+    backoff.release(db, [streamer.id])
+    db.refresh(streamer)
+    assert not streamer.quarantined and streamer.consecutive_failures == 0
+
+    backoff.record_exit(db, streamer.id, "exited with code 1", 2.0, requested=False)
+    assert backoff.record_exit(db, streamer.id, "exited with code 0", 600.0, requested=False) is None
+    assert streamer.consecutive_failures == 0 and streamer.next_start_at is None
+    assert streamer.last_exit_reason == "exited with code 0" and streamer.last_uptime_seconds == 600.0
+
+
+def test_claims_skip_backed_off_and_quarantined_streamers(db):
+    now = datetime.now(tz=timezone.utc)
+    db.add(models.Instance(hostname="node", max_processes=10))
+    db.add_all([
+        models.Streamer(name="fine", url="https://kick.com/fine"),
+        models.Streamer(name="waited", url="https://kick.com/waited", next_start_at=now - timedelta(seconds=1)),
+        models.Streamer(name="waiting", url="https://kick.com/waiting", next_start_at=now + timedelta(hours=1)),
+        models.Streamer(name="quarantined", url="https://kick.com/quarantined", quarantined=True),
+    ])
+    db.commit()
+
+    claimed = instances.claim_streamers(db, "node")
+    assert {process.streamer.name for process in claimed} == {"fine", "waited"}
+
+
+def test_crashing_child_counts_as_a_failure_every_time(sqlite_engine, db, monkeypatch):
+    monkeypatch.setattr(backoff, "RESTART_QUARANTINE_FAILURES", 3)
+    # The exit and output handlers open their own sessions
+    monkeypatch.setattr(connection, "SessionLocal", sessionmaker(bind=sqlite_engine))
+    monkeypatch.setattr(stream_clips_processes, "build_command",
+                        lambda streamer, config: [sys.executable, "-c", "import sys; print('starting'); sys.exit(1)"])
+    db.add(models.StreamConfig())
+    db.add(models.Instance(hostname="node", max_processes=10))
+    db.add(models.Streamer(name="crashy", url="https://kick.com/crashy"))
+    db.commit()
+
+    for round in range(1, 4):
+        # Skip the backoff and the cooldown, the crash itself is what's under test
+        db.query(models.Streamer).update({models.Streamer.next_start_at: None,
+                                          models.Streamer.last_processed_at: None})
+        db.commit()
+        started = stream_clips_processes.start_processes(db, instances.claim_streamers(db, "node"))
+        assert len(started) == 1
+
+        # Both the multiplexer and the supervisor see the exit, neither may count it as our own stop
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            db.expire_all()
+            streamer = db.query(models.Streamer).one()
+            if streamer.consecutive_failures >= round and not db.query(models.StreamClipsProcess).count():
+                break
+            db.commit()
+            time.sleep(0.05)
+        assert streamer.consecutive_failures == round
+        assert streamer.last_exit_reason == "exited with code 1"
+    assert streamer.quarantined
+
+
+def test_child_that_closes_its_output_is_stopped_and_counted(sqlite_engine, db, monkeypatch):
+    monkeypatch.setattr(connection, "SessionLocal", sessionmaker(bind=sqlite_engine))
+    monkeypatch.setattr(stream_clips_processes, "build_command",
+                        lambda streamer, config: [sys.executable, "-c",
+                                                  "import os, time; os.close(1); os.close(2); time.sleep(30)"])
+    db.add(models.StreamConfig())
+    db.add(models.Instance(hostname="node", max_processes=10))
+    db.add(models.Streamer(name="mute", url="https://kick.com/mute"))
+    db.commit()
+    started = stream_clips_processes.start_processes(db, instances.claim_streamers(db, "node"))
+    assert len(started) == 1
+
+    # The row stays, keeping the streamer claimed, until the supervisor reaped the child
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        db.expire_all()
+        streamer = db.query(models.Streamer).one()
+        if streamer.last_exit_reason and not db.query(models.StreamClipsProcess).count():
+            break
+        db.commit()
+        time.sleep(0.05)
+    assert streamer.last_exit_reason == "killed by SIGTERM"
+    assert streamer.consecutive_failures == 1
@@ -0,0 +1,33 @@
+import asyncio
+import threading
+from app.core.claim_trigger import ClaimTrigger
+
+
+def test_burst_of_notifications_runs_one_round():
+    rounds = []
+
+    async def scenario():
+        trigger = ClaimTrigger(debounce=0.05)
+
+        async def claim():
+            rounds.append(asyncio.get_running_loop().time())
+
+        trigger.start(claim)
+        # Notifications come from reader and listener threads
+        threads = [threading.Thread(target=trigger.notify) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        await asyncio.sleep(0.2)
+        assert len(rounds) == 1
+
+        trigger.notify(delay=0.1)
+        await asyncio.sleep(0.05)
+        assert len(rounds) == 1
+        await asyncio.sleep(0.2)
+        assert len(rounds) == 2
+        trigger.stop()
+        trigger.notify()
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+import threading
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app.core import instances
+from app.database import models
+
+INSTANCES = 8
+CAPACITY = 3
+STREAMERS = 20
+
+
+def test_concurrent_claimers_never_share_a_streamer_or_exceed_capacity(pg_engine):
+    # Postgres only, SQLite serializes writers and has no FOR UPDATE SKIP LOCKED to race on
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=pg_engine)
+
+    db = Session()
+    recently = datetime.now(tz=timezone.utc) - timedelta(seconds=10)
+    db.add_all(models.Instance(hostname=f"node-{i}", max_processes=CAPACITY) for i in range(INSTANCES))
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(STREAMERS))
+    # Inactive or cooling down streamers are never claimed
+    db.add(models.Streamer(name="off", url="https://kick.com/off", is_active=False))
+    db.add(models.Streamer(name="cooling", url="https://kick.com/cooling", last_processed_at=recently))
+    db.commit()
+    db.close()
+
+    claims = {}
+    start = threading.Barrier(INSTANCES)
+
+    def claimer(hostname):
+        session = Session()
+        try:
+            start.wait()
+            claims[hostname] = [process.streamer.name for process in instances.claim_streamers(session, hostname)]
+            # A second round finds nothing left for this instance
+            claims[hostname] += [process.streamer.name for process in instances.claim_streamers(session, hostname)]
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=claimer, args=(f"node-{i}",)) for i in range(INSTANCES)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [name for names in claims.values() for name in names]
+    assert len(claims) == INSTANCES
+    assert sorted(claimed) == sorted(f"s{i}" for i in range(STREAMERS))
+    assert all(len(names) <= CAPACITY for names in claims.values())
+
+    db = Session()
+    assert db.query(models.StreamClipsProcess).filter(models.StreamClipsProcess.pid.is_(None)).count() == STREAMERS
+    db.close()
+
+
+def test_claims_respect_max_count(db):
+    db.add(models.Instance(hostname="node", max_processes=10))
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(5))
+    db.commit()
+
+    assert len(instances.claim_streamers(db, "node", max_count=2)) == 2
+    assert len(instances.claim_streamers(db, "node")) == 3
+    assert instances.claim_streamers(db, "missing") == []
+
+
+def test_admin_shows_the_load_in_cost_units(db):
+    from app.admin import InstanceAdmin
+
+    db.add(models.Instance(hostname="node", max_processes=10))
+    db.add_all([models.Streamer(name="heavy", url="https://kick.com/heavy", cost=2.5),
+                models.Streamer(name="plain", url="https://kick.com/plain")])
+    db.commit()
+    assert len(instances.claim_streamers(db, "node")) == 2
+
+    instance = db.query(models.Instance).one()
+    assert instances.get_instance_load(db, "node") == 3.5
+    assert InstanceAdmin.current_load(None, instance) == "3.5/10"
+
+
+def test_load_above_lowered_capacity_claims_nothing(pg_engine):
+    db = sessionmaker(bind=pg_engine)()
+    instance = models.Instance(hostname="node", max_processes=4)
+    db.add(instance)
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}", cost=1.5) for i in range(5))
+    db.commit()
+    assert len(instances.claim_streamers(db, "node")) == 2
+
+    # Capacity lowered below the 3.0 units already running, free capacity is negative
+    instance.max_processes = 0
+    db.commit()
+    assert instances.claim_streamers(db, "node") == []
+    assert instances.claim_streamers(db, "node", max_count=2, max_cost=5.0) == []
+    db.close()
+
+
+def test_zero_cost_streamers_are_rejected(pg_engine):
+    db = sessionmaker(bind=pg_engine)()
+    db.add(models.Instance(hostname="node", max_processes=2))
+    db.commit()
+    db.add(models.Streamer(name="free", url="https://kick.com/free", cost=0))
+    with pytest.raises(IntegrityError):
+        db.commit()
+    db.rollback()
+
+    db.add(models.Streamer(name="cheap", url="https://kick.com/cheap", cost=0.5))
+    db.commit()
+    assert [process.streamer.name for process in instances.claim_streamers(db, "node")] == ["cheap"]
+    db.close()
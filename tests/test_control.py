@@ -0,0 +1,95 @@
+import os
+import sys
+import threading
+import time
+from app.core import control, instances, rollout, stream_clips_processes
+from app.core.control import ControlChannel, parse_ack
+from app.database import models
+
+MOCK = os.path.join(os.path.dirname(__file__), "..", "streamclips_mock.py")
+
+
+def _wait_for_ack(proc, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = proc.stdout.readline().decode()
+        version = parse_ack(line.rstrip("\n"))
+        if version is not None:
+            return version
+    return None
+
+
+def test_mock_child_acknowledges_pushed_config():
+    channel = ControlChannel()
+    proc = stream_clips_processes.spawn([sys.executable, MOCK, "xqc"])
+    try:
+        channel.register("p1", proc)
+        config = models.StreamConfig(clip_duration=30.0, window_timespan=30.0, sample_interval=1,
+                                     baseline_duration=180, surge_threshold=2.5, version=7)
+        assert channel.push("p1", control.config_message(config))
+        assert channel.awaiting("p1", 7)
+
+        assert _wait_for_ack(proc) == 7
+        channel.acknowledge("p1", 7)
+        assert not channel.awaiting("p1", 7)
+        assert channel.acked(7) == ["p1"]
+    finally:
+        channel.forget("p1")
+        proc.kill()
+        proc.wait()
+
+
+def test_config_change_is_applied_live_and_falls_back_to_restart(db, monkeypatch):
+    db.add(models.StreamConfig())
+    db.add(models.Instance(hostname="node", max_processes=2))
+    db.add(models.Streamer(name="live", url="https://kick.com/live"))
+    db.add(models.Streamer(name="legacy", url="https://kick.com/legacy"))
+    db.commit()
+
+    def build_command(streamer, config):
+        if streamer.name == "live":
+            return [sys.executable, MOCK, streamer.name]
+        return [sys.executable, "-c", "import time; time.sleep(30)"]
+
+    spawned = []
+
+    def monitor(proc, key):
+        # Stand-in for the output multiplexer, only acks matter here
+        def read():
+            for raw in proc.stdout:
+                version = parse_ack(raw.decode().rstrip("\n"))
+                if version is not None:
+                    control.channel.acknowledge(key[0], version)
+        spawned.append(proc)
+        threading.Thread(target=read, daemon=True).start()
+
+    monkeypatch.setattr(control.channel, "ack_timeout", 1.0)
+    monkeypatch.setattr(stream_clips_processes, "build_command", build_command)
+    monkeypatch.setattr(stream_clips_processes, "monitor_process_output", monitor)
+    try:
+        stream_clips_processes.start_processes(db, instances.claim_streamers(db, "node"))
+        pids = {row.streamer.name: row.pid for row in db.query(models.StreamClipsProcess)}
+        config = db.query(models.StreamConfig).one()
+        config.surge_threshold = 3.0
+        db.commit()
+
+        coordinator = rollout.RollingRestart(batch_size=2)
+        # First run only pushes, nothing is restarted while acks may still arrive
+        pushed_at = time.monotonic()
+        assert coordinator.run_wave(db, "node") == []
+        while not control.channel.acked(2) and time.monotonic() < pushed_at + 5:
+            time.sleep(0.05)
+        time.sleep(max(0.0, pushed_at + 1.1 - time.monotonic()))
+        started = coordinator.run_wave(db, "node")
+
+        rows = {row.streamer.name: row for row in db.query(models.StreamClipsProcess)}
+        assert {row.config_version for row in rows.values()} == {2}
+        # The mock kept its process and baseline, the child without the protocol was restarted
+        assert rows["live"].pid == pids["live"]
+        assert [row.streamer.name for row in started] == ["legacy"]
+        assert rows["legacy"].pid != pids["legacy"]
+        assert coordinator.status()["applied"] == 1
+    finally:
+        for proc in spawned:
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,67 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from app.core import events
+from app.database import models
+from tests.conftest import TestingSessionLocal
+
+
+def test_parse_known_streamclips_lines():
+    assert events.parse("Surge detected: 3.5x above baseline") == (models.StreamEventType.SURGE_DETECTED, 3.5)
+    assert events.parse("Clip created clips/xqc/clip_001.mp4 (60.0s)") == (models.StreamEventType.CLIP_CREATED, 60.0)
+    assert events.parse("Upload finished clip_001.mp4 in 4.2s") == (models.StreamEventType.UPLOAD_FINISHED, 4.2)
+    assert events.parse("Upload failed: connection refused") == (models.StreamEventType.UPLOAD_FAILED, None)
+    assert events.parse('{"event": "clip_created", "value": 30}') == (models.StreamEventType.CLIP_CREATED, 30.0)
+    assert events.parse("Processing chat messages") is None
+    assert events.parse('{"event": "unknown"}') is None
+
+
+def test_chatter_and_multi_line_records_are_not_events():
+    assert events.parse("Waiting for the uploaded clip list to refresh") is None
+    assert events.parse("Chat says the clip saved them") is None
+    assert events.parse("Retrying after upload failed") is None
+    traceback = (
+        "Traceback (most recent call last):\n"
+        "  File \"streamclips/upload.py\", line 12, in send\n"
+        "Upload failed: connection refused"
+    )
+    assert events.parse(traceback) is None
+
+
+def test_failure_events_also_reach_the_logs(monkeypatch):
+    from app.core import stream_clips_processes
+    written, recorded = [], []
+    monkeypatch.setattr(stream_clips_processes.log_writer, "write", lambda **kwargs: written.append(kwargs) or True)
+    monkeypatch.setattr(stream_clips_processes.log_writer, "write_event",
+                        lambda *args, **kwargs: recorded.append(args[1]) or True)
+    key = ("process", uuid.uuid4(), "xqc")
+
+    stream_clips_processes.handle_output_line(key, "stdout", "Clip created clips/xqc/clip_001.mp4 (60.0s)")
+    stream_clips_processes.handle_output_line(key, "stdout", "Upload failed: connection refused")
+    stream_clips_processes.handle_output_line(key, "stderr", "Upload failed: connection refused")
+
+    assert recorded == [models.StreamEventType.CLIP_CREATED, models.StreamEventType.UPLOAD_FAILED]
+    assert [(w["message"], w["level"]) for w in written] == [
+        ("Upload failed: connection refused", models.LogLevel.WARNING),
+        ("Upload failed: connection refused", models.LogLevel.ERROR),
+    ]
+
+
+def test_streamer_stats_aggregate_events(client: TestClient, admin_token: str, created_streamer):
+    streamer_id = uuid.UUID(created_streamer["id"])
+    db = TestingSessionLocal()
+    try:
+        now = datetime.now(tz=timezone.utc)
+        db.add_all([
+            models.StreamEvent(streamer_id=streamer_id, event_type=models.StreamEventType.CLIP_CREATED, value=60, created_at=now),
+            models.StreamEvent(streamer_id=streamer_id, event_type=models.StreamEventType.CLIP_CREATED, value=30, created_at=now),
+            models.StreamEvent(streamer_id=streamer_id, event_type=models.StreamEventType.CLIP_CREATED, value=90, created_at=now - timedelta(days=3)),
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get(f"/streamers/{created_streamer['id']}/stats", headers=headers)
+    assert response.status_code == 200
+    assert [(s["event_type"], s["count"], s["total"], s["max"]) for s in response.json()] == [("CLIP_CREATED", 2, 90.0, 60.0)]
@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta, timezone
+from app.core.heartbeats import HeartbeatAggregator
+from app.database import models
+from tests.conftest import TestingSessionLocal
+
+
+def test_heartbeats_flush_latest_timestamp_in_one_statement():
+    db = TestingSessionLocal()
+    try:
+        streamer = models.Streamer(name="heartbeat", url="https://kick.com/heartbeat")
+        db.add_all([streamer, models.Instance(hostname="heartbeat-host")])
+        db.flush()
+        process = models.StreamClipsProcess(streamer_id=streamer.id, instance_hostname="heartbeat-host", pid=1)
+        db.add(process)
+        db.commit()
+
+        aggregator = HeartbeatAggregator()
+        first = datetime.now(tz=timezone.utc)
+        latest = first + timedelta(seconds=3)
+        aggregator.beat(process.id, first)
+        aggregator.beat(process.id, latest)
+        assert aggregator.last_activity(process.id) == latest
+
+        assert aggregator.flush(db) == 1
+        assert aggregator.flush(db) == 0
+
+        db.refresh(process)
+        assert process.last_activity.replace(tzinfo=timezone.utc) == latest
+
+        aggregator.forget(process.id)
+        assert aggregator.last_activity(process.id) is None
+    finally:
+        db.close()
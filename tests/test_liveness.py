@@ -0,0 +1,124 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.core import instances, liveness, stream_clips_processes
+from app.core.control import channel as control_channel
+from app.database import models
+
+
+class MockKick(ThreadingHTTPServer):
+    """Stands in for the Kick channel API, answering slowly to let probes overlap"""
+    daemon_threads = True
+
+    def __init__(self, live: set, delay: float = 0.1):
+        super().__init__(("127.0.0.1", 0), _KickHandler)
+        self.live = live
+        self.delay = delay
+        self.requests = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _KickHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        channel = self.path.rsplit("/", 1)[-1]
+        with server.lock:
+            server.requests.append(channel)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            if channel == "broken":
+                self.send_response(500)
+                self.end_headers()
+                return
+            body = json.dumps({"slug": channel, "livestream": {"id": 1} if channel in server.live else None}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve(live: set, delay: float = 0.1) -> MockKick:
+    server = MockKick(live, delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_probes_run_concurrently_within_the_pool_and_are_cached():
+    server = _serve({"s0", "s3"})
+    clock = [0.0]
+    prober = liveness.LivenessProber(backends={"kick.com": liveness.KickBackend(server.url)},
+                                     concurrency=3, ttl=60, clock=lambda: clock[0])
+    urls = [f"https://kick.com/s{i}" for i in range(9)] + ["https://kick.com/broken", "https://example.com/x"]
+    try:
+        results = asyncio.run(prober.probe(urls))
+        assert {url for url, live in results.items() if live} == {"https://kick.com/s0", "https://kick.com/s3"}
+        # Errors and unknown platforms give no answer instead of marking the channel offline
+        assert results["https://kick.com/broken"] is None and results["https://example.com/x"] is None
+        assert 1 < server.max_in_flight <= 3
+        assert len(server.requests) == 10
+
+        # Fresh answers come from the cache, failed ones are asked again
+        asyncio.run(prober.probe(urls))
+        assert len(server.requests) == 11
+        clock[0] = 61
+        asyncio.run(prober.probe(urls))
+        assert len(server.requests) == 21
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_offline_channels_are_not_claimed_and_their_processes_stop(db, monkeypatch):
+    server = _serve({"s0", "s1"}, delay=0)
+    spawned = []
+    try:
+        db.add(models.StreamConfig())
+        db.add(models.Instance(hostname="node", max_processes=10))
+        db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(4))
+        db.add(models.Streamer(name="stale", url="https://kick.com/stale", is_live=False,
+                               live_checked_at=datetime.now(tz=timezone.utc) - timedelta(hours=1)))
+        db.commit()
+        monkeypatch.setattr(control_channel, "ack_timeout", 0)
+        monkeypatch.setattr(stream_clips_processes, "build_command",
+                            lambda streamer, config: [sys.executable, "-c", "import time; time.sleep(30)"])
+        monkeypatch.setattr(stream_clips_processes, "monitor_process_output", lambda proc, key: spawned.append(proc))
+        # Nothing probed yet and the stale answer is outdated, every channel counts as live
+        started = stream_clips_processes.start_processes(db, instances.claim_streamers(db, "node"))
+        assert len(started) == 5
+
+        server.live.add("stale")
+        prober = liveness.LivenessProber(backends={"kick.com": liveness.KickBackend(server.url)})
+        assert liveness.refresh(db, prober) == (3, 2)
+
+        assert stream_clips_processes.stop_offline_instance_processes(db, "node") == 2
+        running = {row.streamer.name for row in db.query(models.StreamClipsProcess)}
+        assert running == {"s0", "s1", "stale"}
+
+        # Offline channels stay unclaimed once their cooldown is over
+        db.query(models.Streamer).update({models.Streamer.last_processed_at: None})
+        db.commit()
+        assert instances.claim_streamers(db, "node") == []
+    finally:
+        for proc in spawned:
+            proc.kill()
+            proc.wait()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import threading
+from app.core.log_coalescer import LineCoalescer
+from app.core.output_reader import OutputMultiplexer
+
+TRACEBACK = [
+    "Traceback (most recent call last):",
+    '  File "streamclips.py", line 10, in <module>',
+    "    main()",
+    "KeyError: 'x'",
+    "",
+    "During handling of the above exception, another exception occurred:",
+    "Traceback (most recent call last):",
+    '  File "streamclips.py", line 12, in <module>',
+    "ValueError: boom",
+]
+
+
+def feed_all(coalescer, lines, now=0.0):
+    records = []
+    for line in lines:
+        if line:
+            records.extend(coalescer.feed(line, now))
+    return records
+
+
+def test_chained_traceback_is_one_record():
+    coalescer = LineCoalescer(gap=1.0)
+    records = feed_all(coalescer, TRACEBACK + ["clip created 30s"])
+    assert records == ["\n".join(line for line in TRACEBACK if line)]
+    assert coalescer.flush() == "clip created 30s"
+
+
+def test_ffmpeg_blocks_and_repeated_diagnostics():
+    coalescer = LineCoalescer(gap=1.0)
+    records = feed_all(coalescer, [
+        "Input #0, flv, from 'pipe:':",
+        "  Metadata:",
+        "    encoder         : obs-output module",
+        "[h264 @ 0x55d0c8a3e2c0] error while decoding MB 1 2",
+        "[h264 @ 0x55d0c8a3e2c0] error while decoding MB 3 4",
+        "[aac @ 0x55d0c8a3f000] Queue input is backward in time",
+    ])
+    assert [record.count("\n") + 1 for record in records] == [3, 2]
+    assert coalescer.flush() == "[aac @ 0x55d0c8a3f000] Queue input is backward in time"
+
+
+def test_records_are_bounded_and_closed_after_gap():
+    coalescer = LineCoalescer(gap=0.5, max_lines=3)
+    assert feed_all(coalescer, ["head"] + ["  line"] * 4) == ["head\n  line\n  line"]
+    assert coalescer.flush_due(now=0.4) is None
+    assert coalescer.flush_due(now=0.6) == "line\n  line"
+
+    coalescer.feed("late", now=10.0)
+    assert coalescer.feed("  indented after the gap", now=20.0) == ["late"]
+
+
+def test_multiplexer_delivers_traceback_as_one_line():
+    multiplexer = OutputMultiplexer()
+    lines = []
+    done = threading.Event()
+    proc = subprocess.Popen([sys.executable, "-c", "print('ok'); 1/0"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    multiplexer.watch(proc, 1, lambda key, stream, line: lines.append((stream, line)), lambda key: done.set())
+    assert done.wait(10)
+    proc.wait()
+    multiplexer.stop()
+
+    stderr = [line for stream, line in lines if stream == "stderr"]
+    assert len(stderr) == 1
+    assert stderr[0].startswith("Traceback") and stderr[0].endswith("ZeroDivisionError: division by zero")
+    assert ("stdout", "ok") in lines
@@ -0,0 +1,30 @@
+from app.core.log_limits import LogLimiter
+from app.database import models
+
+
+def test_limiter_suppresses_bursts_and_gives_errors_their_own_bucket():
+    limiter = LogLimiter(limits={models.LogLevel.INFO: (0.001, 5)}, info_sample_rate=1.0)
+    allowed = [limiter.allow("streamclips-loud", models.LogLevel.INFO) for _ in range(100)]
+    assert allowed.count(True) == 5
+    assert all(limiter.allow("streamclips-loud", models.LogLevel.ERROR) for _ in range(100))
+    assert limiter.allow("streamclips-quiet", models.LogLevel.INFO)
+
+    summaries = limiter.summaries()
+    assert [(source, count) for source, count, _ in summaries] == [("streamclips-loud", 95)]
+    assert limiter.summaries() == []
+    assert limiter.status()["suppressed_total"] == {"streamclips-loud": 95}
+
+    # stderr is all ERROR, a noisy child is still limited, just later
+    limiter = LogLimiter(limits={models.LogLevel.INFO: (0.001, 5), models.LogLevel.ERROR: (0.001, 50)})
+    allowed = [limiter.allow("streamclips-stderr", models.LogLevel.ERROR) for _ in range(100)]
+    assert allowed.count(True) == 50
+
+
+def test_limiter_samples_info_and_sheds_under_backpressure():
+    limiter = LogLimiter(limits={}, info_sample_rate=0.25, backpressure_threshold=0.8, error_backpressure_threshold=0.95)
+    allowed = [limiter.allow("streamclips-sampled", models.LogLevel.INFO) for _ in range(100)]
+    assert allowed.count(True) == 25
+
+    assert not limiter.allow("streamclips-busy", models.LogLevel.WARNING, pressure=0.9)
+    assert limiter.allow("streamclips-busy", models.LogLevel.ERROR, pressure=0.9)
+    assert not limiter.allow("streamclips-busy", models.LogLevel.ERROR, pressure=0.97)
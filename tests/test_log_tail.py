@@ -0,0 +1,31 @@
+import asyncio
+import threading
+from app.core.log_tail import LogTail
+from app.database import models
+
+
+def test_log_tail_replays_backlog_then_streams_live_lines():
+    tail = LogTail(maxlen=3)
+    for i in range(5):
+        tail.publish("streamclips-xqc", f"line {i}", models.LogLevel.INFO)
+    tail.publish("streamclips-other", "ignored", models.LogLevel.INFO)
+
+    async def follow():
+        subscription = tail.subscribe("streamclips-xqc")
+        assert [r["message"] for r in subscription.backlog] == ["line 2", "line 3", "line 4"]
+
+        publisher = threading.Thread(target=lambda: [
+            tail.publish("streamclips-other", "still ignored", models.LogLevel.INFO),
+            tail.publish("streamclips-xqc", "live", models.LogLevel.ERROR),
+        ])
+        publisher.start()
+        record = await asyncio.wait_for(subscription.get(), timeout=5)
+        publisher.join()
+        tail.unsubscribe(subscription)
+        return record
+
+    record = asyncio.run(follow())
+    assert record["message"] == "live"
+    assert record["level"] == "ERROR"
+    assert len(tail.backlog()) == 5
+    assert tail.sources() == ["streamclips-other", "streamclips-xqc"]
@@ -0,0 +1,50 @@
+from app.core.log_writer import LogWriter
+from app.database import models
+from tests.conftest import TestingSessionLocal
+
+
+def test_log_writer_bulk_inserts_on_size_threshold():
+    writer = LogWriter(flush_size=10, flush_interval=60)
+    writer.start()
+    for i in range(25):
+        assert writer.write(source="streamclips-writer-test", message=f"line {i}", level=models.LogLevel.INFO)
+    writer.stop()
+
+    db = TestingSessionLocal()
+    try:
+        count = db.query(models.Log).filter(models.Log.source == "streamclips-writer-test").count()
+    finally:
+        db.close()
+    assert count == 25
+
+    stats = writer.stats()
+    assert stats["rows_written"] == 25
+    assert stats["max_flush_size"] <= 10
+    assert stats["flushes"] >= 3
+    assert stats["max_flush_seconds"] >= stats["last_flush_seconds"] >= 0
+
+
+def test_log_writer_drops_when_queue_full():
+    writer = LogWriter(max_queue=2, flush_size=10, flush_interval=60)
+    assert writer.write(source="streamclips-full", message="a", level=models.LogLevel.INFO)
+    assert writer.write(source="streamclips-full", message="b", level=models.LogLevel.INFO)
+    assert not writer.write(source="streamclips-full", message="c", level=models.LogLevel.INFO)
+    assert writer.stats()["rows_dropped"] == 1
+
+
+def test_failing_event_rows_dont_take_the_logs_with_them():
+    writer = LogWriter(flush_size=10, flush_interval=60)
+    writer.start()
+    writer.write(source="streamclips-mixed", message="kept", level=models.LogLevel.INFO)
+    # Stands in for an event whose streamer was deleted while it was queued
+    writer.write_event(None, models.StreamEventType.CLIP_CREATED)
+    writer.stop()
+
+    db = TestingSessionLocal()
+    try:
+        count = db.query(models.Log).filter(models.Log.source == "streamclips-mixed").count()
+    finally:
+        db.close()
+    assert count == 1
+    stats = writer.stats()
+    assert stats["rows_written"] == 1 and stats["rows_dropped"] == 1
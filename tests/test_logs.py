@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from app.database import models
+from tests.conftest import TestingSessionLocal
+
+
+def seed_logs(source: str, count: int):
+    db = TestingSessionLocal()
+    try:
+        start = datetime.now(tz=timezone.utc) - timedelta(hours=1)
+        db.add_all([
+            models.Log(source=source, message=f"line {i}", level=models.LogLevel.INFO, created_at=start + timedelta(seconds=i))
+            for i in range(count)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_list_logs_pages_with_cursor(client: TestClient, admin_token: str):
+    seed_logs("streamclips-paging", 25)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    messages = []
+    after = None
+    pages = 0
+    while True:
+        params = {"source": "streamclips-paging", "limit": 10}
+        if after:
+            params["after"] = after
+        response = client.get("/logs", params=params, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        messages += [item["message"] for item in data["items"]]
+        pages += 1
+        after = data["next"]
+        if not after:
+            break
+
+    assert pages == 3
+    assert messages == [f"line {i}" for i in reversed(range(25))]
+
+
+def test_list_logs_invalid_cursor(client: TestClient, admin_token: str):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get("/logs", params={"after": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_list_logs_unauthorized(client: TestClient):
+    response = client.get("/logs")
+    assert response.status_code == 401
+
+
+def test_search_logs_by_message_and_source_prefix(client: TestClient, admin_token: str):
+    seed_logs("streamclips-search", 5)
+    db = TestingSessionLocal()
+    try:
+        db.add(models.Log(source="streamclips-search", message="HTTP error 404 Not Found", level=models.LogLevel.ERROR))
+        db.add(models.Log(source="other-search", message="HTTP error 404 Not Found", level=models.LogLevel.ERROR))
+        db.commit()
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get("/logs/search", params={"q": "404 not found", "source": "streamclips-*"}, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["source"] for item in data] == ["streamclips-search"]
+    assert "rank" in data[0]
@@ -0,0 +1,47 @@
+import threading
+from fastapi.testclient import TestClient
+from app.core.metrics import Registry
+
+
+def test_counter_sums_the_shards_of_all_threads_including_finished_ones():
+    registry = Registry()
+    lines = registry.counter("lines_total", "Lines", ["stream"])
+
+    def work():
+        for _ in range(1000):
+            lines.inc(stream="stdout")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lines.inc(5, stream="stderr")
+
+    assert lines.collect() == {("stdout",): 8000, ("stderr",): 5}
+    # Shards of exited threads are folded once and not counted twice
+    assert lines.collect() == {("stdout",): 8000, ("stderr",): 5}
+    assert 'lines_total{stream="stdout"} 8000' in registry.render()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("commit_seconds", "Commits", ["writer"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, writer="logs")
+
+    text = registry.render()
+    assert "# TYPE commit_seconds histogram" in text
+    assert 'commit_seconds_bucket{writer="logs",le="0.1"} 1' in text
+    assert 'commit_seconds_bucket{writer="logs",le="1"} 3' in text
+    assert 'commit_seconds_bucket{writer="logs",le="+Inf"} 4' in text
+    assert 'commit_seconds_sum{writer="logs"} 4.05' in text
+    assert 'commit_seconds_count{writer="logs"} 4' in text
+
+
+def test_metrics_endpoint(client: TestClient):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE streamclips_db_pool_checkouts_total counter" in response.text
+    assert "streamclips_log_queue_depth" in response.text
@@ -0,0 +1,70 @@
+import subprocess
+import sys
+import threading
+from app.core.output_reader import OutputMultiplexer
+
+CHILD = (
+    "import sys\n"
+    "print('hello'); print(); sys.stderr.write('boom\\n'); sys.stdout.write('no newline')\n"
+)
+
+
+def test_multiplexer_reads_many_processes_from_one_thread():
+    multiplexer = OutputMultiplexer()
+    lines = []
+    closed = []
+    done = threading.Event()
+
+    def on_line(key, stream_name, line):
+        lines.append((key, stream_name, line))
+
+    def on_close(key):
+        closed.append(key)
+        if len(closed) == 5:
+            done.set()
+
+    threads_before = threading.active_count()
+    procs = []
+    for i in range(5):
+        proc = subprocess.Popen([sys.executable, "-c", CHILD], stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+        multiplexer.watch(proc, i, on_line, on_close)
+        procs.append(proc)
+
+    assert threading.active_count() == threads_before + 1
+    assert done.wait(10)
+    for proc in procs:
+        proc.wait()
+    multiplexer.stop()
+
+    assert sorted(closed) == list(range(5))
+    for i in range(5):
+        assert sorted((s, l) for k, s, l in lines if k == i) == [
+            ("stderr", "boom"), ("stdout", "hello"), ("stdout", "no newline")
+        ]
+
+
+def test_slow_close_callback_does_not_stall_other_pipes():
+    multiplexer = OutputMultiplexer()
+    release = threading.Event()
+    got_line = threading.Event()
+
+    def on_close(key):
+        if key == "quick":
+            release.wait(10)  # Stands in for a locked database
+
+    def on_line(key, stream_name, line):
+        if key == "chatty":
+            got_line.set()
+
+    quick = subprocess.Popen([sys.executable, "-c", "pass"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    multiplexer.watch(quick, "quick", on_line, on_close)
+    quick.wait()
+    chatty = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.5); print('still read', flush=True)"],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    multiplexer.watch(chatty, "chatty", on_line, on_close)
+    try:
+        assert got_line.wait(5)
+    finally:
+        release.set()
+        chatty.wait()
+        multiplexer.stop()
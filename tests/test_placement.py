@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.core import instances, placement
+from app.database import models
+
+
+def test_least_loaded_instance_claims_first_and_takes_the_largest_share(db, monkeypatch):
+    monkeypatch.setattr(placement, "PLACEMENT_MAX_DELAY_SECONDS", 2.0)
+    now = datetime.now(tz=timezone.utc)
+    db.add_all([
+        models.Instance(hostname="busy", cpu_percent=95, memory_percent=40, last_heartbeat=now),
+        models.Instance(hostname="idle", cpu_percent=20, memory_percent=10, last_heartbeat=now),
+        models.Instance(hostname="half", cpu_percent=30, memory_percent=60, last_heartbeat=now),
+    ])
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(6))
+    db.commit()
+
+    assert placement.plan(db, "busy") == (0.0, 0.0)
+    idle_delay, idle_budget = placement.plan(db, "idle")
+    half_delay, half_budget = placement.plan(db, "half")
+    assert (idle_delay, half_delay) == (0.0, 2.0)
+    assert idle_budget == pytest.approx(4.0) and half_budget == pytest.approx(2.0)
+
+
+def test_claims_are_weighted_by_streamer_cost(db):
+    # Streamers are claimed longest-waiting first
+    waited = lambda minutes: datetime.now(tz=timezone.utc) - timedelta(minutes=minutes)
+    db.add(models.Instance(hostname="node", max_processes=5))
+    db.add(models.Streamer(name="heavy-1", url="https://kick.com/h1", cost=2.5, last_processed_at=waited(30)))
+    db.add(models.Streamer(name="heavy-2", url="https://kick.com/h2", cost=2.5, last_processed_at=waited(20)))
+    db.add(models.Streamer(name="light", url="https://kick.com/l", cost=0.5, last_processed_at=waited(10)))
+    db.commit()
+
+    assert len(instances.claim_streamers(db, "node", max_cost=3)) == 1
+    # 2.5 of 5 units used, the other heavy streamer still fits but then nothing else does
+    assert [process.streamer.name for process in instances.claim_streamers(db, "node")] == ["heavy-2"]
+    assert instances.claim_streamers(db, "node") == []
+    assert instances.claimable_cost(db) == pytest.approx(0.5)
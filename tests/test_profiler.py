@@ -0,0 +1,56 @@
+import threading
+import time
+from fastapi.testclient import TestClient
+from app.core.profiler import SamplingProfiler, SlowTickRecorder
+
+
+def _busy_wait(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_counts_stacks_of_other_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_wait, args=(stop,), name="busy worker")
+    worker.start()
+    try:
+        counts = SamplingProfiler().profile(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    busy = {stack: count for stack, count in counts.items() if stack.startswith("busy_worker;")}
+    assert busy and all("_busy_wait (tests/test_profiler.py:" in stack for stack in busy)
+    assert sum(busy.values()) > 5
+
+
+def test_slow_run_is_captured_once_with_its_stack():
+    recorder = SlowTickRecorder(threshold=0.05)
+    release = threading.Event()
+
+    def job():
+        with recorder.watch("claim_streamers"):
+            release.wait(2)
+
+    thread = threading.Thread(target=job)
+    thread.start()
+    time.sleep(0.1)
+    recorder.check()
+    recorder.check()
+    release.set()
+    thread.join()
+
+    captures = recorder.captures()
+    assert len(captures) == 1
+    assert captures[0]["job"] == "claim_streamers"
+    assert captures[0]["finished"]
+    assert "job (tests/test_profiler.py:" in captures[0]["stack"]
+
+
+def test_profile_endpoint_requires_an_admin(client: TestClient, admin_token: str):
+    assert client.get("/debug/profile").status_code == 401
+
+    response = client.get("/debug/profile", params={"seconds": 0.1},
+                          headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
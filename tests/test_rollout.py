@@ -0,0 +1,101 @@
+import sys
+import threading
+from sqlalchemy.orm import sessionmaker
+from app.core import instances, rollout, stream_clips_processes
+from app.core.control import channel as control_channel
+from app.database import models
+
+
+def _setup(db, monkeypatch, count: int):
+    db.add(models.StreamConfig())
+    db.add(models.Instance(hostname="node", max_processes=count))
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(count))
+    db.commit()
+
+    spawned = []
+    # These children never read their stdin, so they go straight to the restart fallback
+    monkeypatch.setattr(control_channel, "ack_timeout", 0)
+    monkeypatch.setattr(stream_clips_processes, "build_command",
+                        lambda streamer, config: [sys.executable, "-c", "import time; time.sleep(30)"])
+    monkeypatch.setattr(stream_clips_processes, "monitor_process_output", lambda proc, key: spawned.append(proc))
+    stream_clips_processes.start_processes(db, instances.claim_streamers(db, "node"))
+    return spawned
+
+
+def test_config_change_restarts_processes_in_growing_waves(db, monkeypatch):
+    spawned = _setup(db, monkeypatch, 5)
+    try:
+        assert {row.config_version for row in db.query(models.StreamClipsProcess)} == {1}
+        config = db.query(models.StreamConfig).one()
+        config.clip_duration = 90.0
+        db.commit()
+        assert config.version == 2
+
+        coordinator = rollout.RollingRestart(batch_size=2)
+        waves = []
+        while True:
+            started = coordinator.run_wave(db, "node")
+            if not started:
+                break
+            waves.append(len(started))
+            assert rollout.progress(db)["stale"] == 5 - sum(waves)
+
+        assert waves == [1, 2, 2]
+        rows = db.query(models.StreamClipsProcess).all()
+        # Every streamer stayed claimed by the instance and runs on the new settings
+        assert len(rows) == 5 and {row.config_version for row in rows} == {2}
+        assert {row.pid for row in rows} == {proc.pid for proc in spawned[5:]}
+        for proc in spawned[:5]:
+            assert proc.wait(5) is not None
+    finally:
+        for proc in spawned:
+            proc.kill()
+            proc.wait()
+
+
+def test_rollout_halts_when_nothing_starts_on_the_new_config(db, monkeypatch):
+    spawned = _setup(db, monkeypatch, 3)
+    try:
+        config = db.query(models.StreamConfig).one()
+        config.surge_threshold = 3.0
+        db.commit()
+        monkeypatch.setattr(stream_clips_processes, "build_command",
+                            lambda streamer, config: ["/nonexistent/streamclips"])
+
+        coordinator = rollout.RollingRestart(batch_size=2)
+        assert coordinator.run_wave(db, "node") == []
+        assert coordinator.status()["halted"]
+        assert coordinator.run_wave(db, "node") == []
+        # Only the first wave was lost, the rest keeps running on the old settings
+        assert db.query(models.StreamClipsProcess).count() == 2
+        assert rollout.progress(db)["halted"] == ["node"]
+    finally:
+        for proc in spawned:
+            proc.kill()
+            proc.wait()
+
+
+def test_concurrent_config_edits_each_bump_the_version(pg_engine):
+    Session = sessionmaker(bind=pg_engine)
+    db = Session()
+    db.add(models.StreamConfig())
+    db.commit()
+    db.close()
+
+    first, second = Session(), Session()
+    first.query(models.StreamConfig).one().clip_duration = 90.0
+    first.flush()  # Holds the row lock until it commits
+    second_config = second.query(models.StreamConfig).one()
+    assert second_config.version == 1
+    second_config.surge_threshold = 3.0
+    editor = threading.Thread(target=second.commit)
+    editor.start()
+    first.commit()
+    editor.join()
+    first.close()
+    second.close()
+
+    db = Session()
+    version = db.query(models.StreamConfig).one().version
+    db.close()
+    assert version == 3
@@ -0,0 +1,23 @@
+import asyncio
+import threading
+from app.scheduler import run_job
+
+
+def test_slow_job_times_out_without_overlapping_its_next_run():
+    release = threading.Event()
+    runs = []
+
+    def slow():
+        runs.append(1)
+        release.wait(5)
+
+    async def scenario():
+        assert await run_job("slow", slow, timeout=0.05)
+        # The first body is still running in its thread, so this run is skipped
+        assert not await run_job("slow", slow, timeout=0.05)
+        release.set()
+        await asyncio.sleep(0.1)
+        assert await run_job("slow", lambda: runs.append(2), timeout=1)
+
+    asyncio.run(scenario())
+    assert runs == [1, 2]
@@ -0,0 +1,41 @@
+import sys
+from sqlalchemy import event
+from app.core import instances, stream_clips_processes
+from app.database import models
+
+
+def test_batch_start_records_every_spawn_in_one_commit(sqlite_engine, db, monkeypatch):
+    db.add(models.StreamConfig())
+    db.add(models.Instance(hostname="node", max_processes=10))
+    db.add_all(models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}") for i in range(5))
+    db.add(models.Streamer(name="broken", url="https://kick.com/broken"))
+    db.commit()
+    claimed = instances.claim_streamers(db, "node")
+
+    def build_command(streamer, config):
+        if streamer.name == "broken":
+            return ["/nonexistent/streamclips"]
+        return [sys.executable, "-c", "import time; time.sleep(5)"]
+
+    watched = []
+    monkeypatch.setattr(stream_clips_processes, "build_command", build_command)
+    monkeypatch.setattr(stream_clips_processes, "monitor_process_output", lambda proc, key: watched.append(proc))
+    commits = []
+    event.listen(sqlite_engine, "commit", lambda conn: commits.append(1))
+
+    started = stream_clips_processes.start_processes(db, claimed)
+    try:
+        assert len(started) == 5
+        assert len(commits) == 1
+        rows = db.query(models.StreamClipsProcess).all()
+        assert len(rows) == 5 and all(row.pid for row in rows)
+        # The failed spawn gave its claim back
+        assert {row.streamer.name for row in rows} == {f"s{i}" for i in range(5)}
+        # and is backed off like a crash instead of being retried every round
+        broken = db.query(models.Streamer).filter(models.Streamer.name == "broken").one()
+        assert broken.consecutive_failures == 1 and broken.next_start_at and broken.last_processed_at
+        assert broken.last_exit_reason.startswith("failed to start")
+    finally:
+        for proc in watched:
+            proc.kill()
+            proc.wait()
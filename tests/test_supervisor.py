@@ -0,0 +1,59 @@
+import signal
+import subprocess
+import sys
+import threading
+import time
+from app.core.supervisor import ProcessSupervisor, describe_exit
+
+
+def _track(supervisor: ProcessSupervisor, proc: subprocess.Popen):
+    exited = threading.Event()
+    result = {}
+
+    def on_exit(key, exit):
+        result["key"], result["returncode"], result["requested"] = key, exit.returncode, exit.requested
+        exited.set()
+
+    supervisor.track(proc, "key", on_exit)
+    return exited, result
+
+
+def test_exit_is_reported_and_reaped_right_away():
+    supervisor = ProcessSupervisor()
+    try:
+        proc = subprocess.Popen([sys.executable, "-c", "import sys; sys.exit(3)"])
+        exited, result = _track(supervisor, proc)
+        assert exited.wait(5)
+        assert result == {"key": "key", "returncode": 3, "requested": False}
+        # Reaped, the pid no longer names a zombie of ours
+        assert proc.returncode == 3 and supervisor.tracked_count() == 0
+        assert supervisor.terminate(proc.pid)
+    finally:
+        supervisor.stop()
+
+
+def test_sigterm_is_escalated_to_sigkill_after_the_grace_period():
+    supervisor = ProcessSupervisor(grace=0.3)
+    proc = subprocess.Popen(
+        [sys.executable, "-c",
+         "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(30)"],
+        stdout=subprocess.PIPE, start_new_session=True
+    )
+    try:
+        assert proc.stdout.readline() == b"ready\n"
+        exited, result = _track(supervisor, proc)
+        started = time.monotonic()
+        assert supervisor.terminate(proc.pid)
+        assert exited.wait(5)
+        assert time.monotonic() - started >= 0.3
+        assert result["returncode"] == -signal.SIGKILL and result["requested"]
+        assert describe_exit(result["returncode"]) == "killed by SIGKILL"
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        supervisor.stop()
+
+
+def test_untracked_pids_are_left_to_the_caller():
+    supervisor = ProcessSupervisor()
+    assert not supervisor.terminate(999999)
@@ -0,0 +1,89 @@
+import subprocess
+import sys
+import uuid
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core import instances, stream_clips_processes
+from app.database import connection, models
+from app.database.connection import Base
+
+
+def _setup(path, monkeypatch, count: int, hostname: str):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(connection, "SessionLocal", Session)
+    db = Session()
+    for i in range(count):
+        streamer = models.Streamer(name=f"s{i}", url=f"https://kick.com/s{i}")
+        db.add(streamer)
+        db.flush()
+        db.add(models.StreamClipsProcess(id=uuid.uuid4(), streamer_id=streamer.id, instance_hostname=hostname))
+    db.commit()
+    db.close()
+    return engine, Session
+
+
+def _count_statements(engine, action) -> int:
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        action()
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+def test_teardown_query_count_does_not_grow_with_the_number_of_processes(tmp_path, monkeypatch):
+    hostname = instances.get_current_hostname()
+    counts = {}
+    for size in (3, 30):
+        engine, Session = _setup(tmp_path / f"cleanup-{size}.db", monkeypatch, size, "dead-node")
+        db = Session()
+        counts[("cleanup", size)] = _count_statements(
+            engine, lambda: instances.cleanup_dead_instance_processes(db, "dead-node")
+        )
+        db.close()
+
+        engine, Session = _setup(tmp_path / f"instance-{size}.db", monkeypatch, size, hostname)
+        counts[("instance", size)] = _count_statements(
+            engine, lambda: stream_clips_processes.stop_instance_processes(hostname)
+        )
+        engine, Session = _setup(tmp_path / f"all-{size}.db", monkeypatch, size, "other-node")
+        counts[("all", size)] = _count_statements(engine, stream_clips_processes.stop_all_processes)
+
+        db = Session()
+        assert db.query(models.StreamClipsProcess).count() == 0
+        assert db.query(models.Streamer).filter(models.Streamer.last_processed_at == None).count() == 0
+        db.close()
+
+    for name in ("cleanup", "instance", "all"):
+        assert counts[(name, 3)] == counts[(name, 30)] == 2
+
+
+def test_only_local_pids_are_signalled(tmp_path, monkeypatch):
+    engine, Session = _setup(tmp_path / "signals.db", monkeypatch, 0, "unused")
+    local = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    unrelated = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        db = Session()
+        for name, hostname, pid in [("local", instances.get_current_hostname(), local.pid),
+                                    ("remote", "other-node", unrelated.pid)]:
+            streamer = models.Streamer(name=name, url=f"https://kick.com/{name}")
+            db.add(streamer)
+            db.flush()
+            db.add(models.StreamClipsProcess(id=uuid.uuid4(), streamer_id=streamer.id,
+                                             instance_hostname=hostname, pid=pid))
+        db.commit()
+        db.close()
+
+        stream_clips_processes.stop_all_processes()
+
+        assert local.wait(5) is not None
+        # The other instance's pid is just a number here, it must not be signalled
+        assert unrelated.poll() is None
+    finally:
+        for proc in (local, unrelated):
+            proc.kill()
+            proc.wait()
@@ -0,0 +1,86 @@
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.core import autoscale, telemetry
+from app.database import models
+
+
+def raw(streamer_id, bucket, cpu, rss):
+    return models.ProcessSample(
+        streamer_id=streamer_id, resolution=telemetry.RAW, bucket=bucket, instance_hostname="node",
+        samples=1, cpu_percent=cpu, cpu_percent_max=cpu, rss=rss, rss_max=rss, processes=2, num_fds=10,
+    )
+
+
+def test_rollup_aggregates_finished_buckets_and_expires_raw_samples(db):
+    streamer_id = uuid.uuid4()
+    now = datetime(2026, 10, 17, 12, 5, 30, tzinfo=timezone.utc)
+    minute = datetime(2026, 10, 17, 12, 3, tzinfo=timezone.utc)
+    db.add_all([
+        raw(streamer_id, minute, 10, 100),
+        raw(streamer_id, minute + timedelta(seconds=15), 30, 300),
+        raw(streamer_id, minute + timedelta(seconds=60), 50, 500),
+        # Still in progress, rolled up by a later run
+        raw(streamer_id, datetime(2026, 10, 17, 12, 5, 15, tzinfo=timezone.utc), 90, 900),
+        # Past the raw retention
+        raw(streamer_id, now - timedelta(hours=telemetry.TELEMETRY_RAW_RETENTION_HOURS, minutes=1), 1, 1),
+    ])
+    db.commit()
+
+    assert telemetry.rollup(db, now=now) == {telemetry.MINUTE: 2, telemetry.HOUR: 0}
+    # Running again is idempotent
+    assert telemetry.rollup(db, now=now) == {telemetry.MINUTE: 2, telemetry.HOUR: 0}
+
+    minutes = db.query(models.ProcessSample).filter_by(resolution=telemetry.MINUTE).order_by(models.ProcessSample.bucket).all()
+    assert [(row.samples, row.cpu_percent, row.cpu_percent_max, row.rss, row.rss_max) for row in minutes] == [
+        (2, 20.0, 30.0, 200, 300), (1, 50.0, 50.0, 500, 500)
+    ]
+    assert db.query(models.ProcessSample).filter_by(resolution=telemetry.RAW).count() == 4
+
+    # An hour later the minutes roll up into one weighted hourly row
+    telemetry.rollup(db, now=now + timedelta(hours=1))
+    hour = db.query(models.ProcessSample).filter_by(resolution=telemetry.HOUR).one()
+    assert (hour.samples, hour.cpu_percent, hour.cpu_percent_max) == (3, 30.0, 50.0)
+
+
+def test_collect_samples_every_local_process(db):
+    streamer = models.Streamer(name="s", url="https://kick.com/s")
+    db.add_all([models.Instance(hostname="node"), streamer])
+    db.commit()
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+    try:
+        db.add(models.StreamClipsProcess(streamer_id=streamer.id, instance_hostname="node", pid=proc.pid))
+        db.commit()
+        assert telemetry.collect(db, "node") == 1
+        sample = db.query(models.ProcessSample).one()
+        assert sample.resolution == telemetry.RAW and sample.rss > 0 and sample.processes == 1
+        assert telemetry.series(db, streamer.id, hours=1) == (telemetry.RAW, [sample])
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_telemetry_and_autoscale_measure_cpu_independently():
+    proc = subprocess.Popen([sys.executable, "-c", "while True: pass"])
+    try:
+        telemetry.sampler.sample([proc.pid])
+        autoscale.sampler.sample([proc.pid])
+        time.sleep(0.5)
+        # Both jobs fire together, the second one must not read the CPU used since the first one's sample
+        first = autoscale.sampler.sample([proc.pid])[proc.pid]["cpu_percent"]
+        second = telemetry.sampler.sample([proc.pid])[proc.pid]["cpu_percent"]
+        assert first > 20 and second > 20
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def test_chart_range_falls_back_and_stays_within_retention():
+    from app.admin import TelemetryView
+    assert TelemetryView.parse_hours(None) == 6
+    assert TelemetryView.parse_hours("abc") == 6
+    assert TelemetryView.parse_hours("24") == 24
+    assert TelemetryView.parse_hours("-5") == 1
+    assert TelemetryView.parse_hours("999999") == telemetry.TELEMETRY_HOUR_RETENTION_DAYS * 24